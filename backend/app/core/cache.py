@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+from app.core import metrics
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache with per-entry expiry and hit/miss counters.
+    Process-local: each uvicorn worker has its own copy.
+    """
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 60.0, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING or item[0] < now:
+                if item is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+_registry: Dict[str, TTLCache] = {}
+
+def register_cache(cache: TTLCache) -> TTLCache:
+    """Make a cache visible to the admin cache-stats endpoint."""
+    _registry[cache.name] = cache
+    return cache
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: c.stats() for name, c in _registry.items()}
+
+_hits = metrics.counter("cache_hits_total", "Cache hits since start")
+_misses = metrics.counter("cache_misses_total", "Cache misses since start")
+_hit_ratio = metrics.gauge("cache_hit_ratio", "Cache hits / lookups since start")
+_entries = metrics.gauge("cache_entries", "Entries currently cached")
+
+@metrics.register_collector
+def _collect() -> None:
+    for name, s in cache_stats().items():
+        _hits.set(s["hits"], cache=name)
+        _misses.set(s["misses"], cache=name)
+        _hit_ratio.set(s["hit_rate"], cache=name)
+        _entries.set(s["size"], cache=name)
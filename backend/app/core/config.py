@@ -5,6 +5,70 @@ class Settings(BaseSettings):
     jwt_secret: str = "CHANGE_ME_IN_ENV"
     jwt_algorithm: str = "HS256"
     jwt_exp_minutes: int = 60 * 24
+    # lifetime of the per-stream tokens in /events URLs (EventSource cannot send headers)
+    stream_token_seconds: int = 120
+
     database_url: str = "sqlite:///./trading_bot.db"
 
+    # "full" serves every router; "core" leaves out /agent (and never imports its
+    # agent/LLM modules), for workers that only serve backtests
+    worker_profile: str = "full"
+
+    # debug dumps of prepared frames / signals (app.trace logger); PUT /admin/tracing toggles it per worker
+    verbose_tracing: bool = False
+
+    # dedicated thread pools for CPU-heavy request work (see app.core.executors)
+    backtest_workers: int = 4
+    password_workers: int = 4
+    serialization_workers: int = 4
+    # concurrent report (LLM) calls of a batch agent run
+    report_workers: int = 4
+
+    # background runs: "local" (this process's backtest pool) | "db" (queued in the
+    # database for scripts/worker.py processes, see app.services.job_queue)
+    job_queue: str = "local"
+    # a claimed job whose worker stops renewing its lease for this long is reclaimed
+    job_lease_seconds: float = 60.0
+    job_poll_seconds: float = 1.0
+    # claims per job before a run that keeps losing its worker is marked failed
+    job_max_attempts: int = 3
+
+    # market data: "yfinance" | "csv" (recorded bars in data_path/{symbol}.csv) | "synthetic"
+    data_provider: str = "yfinance"
+    data_path: str = "data"
+    synthetic_seed: int = 42
+
+    # comma-separated modules imported on first strategy lookup; they add strategies
+    # with app.services.strategies.register_strategy
+    strategy_plugins: str = ""
+
+    # retention: runs beyond the newest N that are also older than D days move their
+    # trades/equity (agent: output/trace) to compressed files under archive_path
+    retention_keep_runs: int = 200
+    retention_keep_days: int = 90
+    archive_path: str = "data/archive"
+
+    # report model for the agent: "openai" | "stub" (deterministic, offline)
+    llm_provider: str = "openai"
+    # simulated per-report latency of the stub model, to benchmark the agent path offline
+    llm_stub_latency_ms: float = 0.0
+
+    # the report prompt is compacted to about this many tokens (0 = no limit)
+    agent_payload_token_budget: int = 6000
+
+    # per-process cache of authenticated users (get_current_user). A user change is
+    # invalidated only in the process that committed it; other uvicorn workers keep
+    # serving the old role / account for up to the TTL, so keep it short with several
+    # API processes
+    user_cache_size: int = 10_000
+    user_cache_ttl_seconds: float = 60.0
+
+    # reports keyed by a canonical hash of the report payload + model (app.services.agent_runner)
+    report_cache_size: int = 256
+    report_cache_ttl_seconds: float = 3600.0
+
+    # rolling risk series per (run, window, symbol) (GET /backtests/{id}/rolling)
+    rolling_cache_size: int = 128
+    rolling_cache_ttl_seconds: float = 600.0
+
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,72 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from app.core import metrics
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class _PoolStats:
+    """Name, size and waiting jobs of a pool, as submitted through run_in / submit."""
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.submitted = 0
+        self.started = 0
+        self._lock = threading.Lock()
+
+    def wrap(self, fn: Callable[[], T]) -> Callable[[], T]:
+        with self._lock:
+            self.submitted += 1
+
+        def job() -> T:
+            with self._lock:
+                self.started += 1
+            return fn()
+        return job
+
+    def waiting(self) -> int:
+        with self._lock:
+            return self.submitted - self.started
+
+
+_stats: Dict[ThreadPoolExecutor, _PoolStats] = {}
+
+def _pool(name: str, workers: int) -> ThreadPoolExecutor:
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+    _stats[pool] = _PoolStats(name, workers)
+    return pool
+
+# Separately sized pools so heavy work only saturates its own pool; cheap sync
+# endpoints keep using Starlette's default threadpool.
+backtest_pool = _pool("backtest", settings.backtest_workers)
+password_pool = _pool("password", settings.password_workers)
+serialization_pool = _pool("serialize", settings.serialization_workers)
+# I/O-bound model calls fanned out by batch agent runs (bounds their concurrency)
+report_pool = _pool("report", settings.report_workers)
+
+async def run_in(pool: ThreadPoolExecutor, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await fn(*args, **kwargs) on the given pool from an async endpoint."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, _stats[pool].wrap(functools.partial(fn, *args, **kwargs)))
+
+def submit(pool: ThreadPoolExecutor, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+    """pool.submit, counted in the pool's queue depth like run_in."""
+    return pool.submit(_stats[pool].wrap(functools.partial(fn, *args, **kwargs)))
+
+_queue_depth = metrics.gauge("executor_queue_depth", "Jobs waiting for a worker thread, per pool")
+_workers = metrics.gauge("executor_workers", "Worker threads per pool")
+
+@metrics.register_collector
+def _collect() -> None:
+    for stats in _stats.values():
+        _queue_depth.set(stats.waiting(), pool=stats.name)
+        _workers.set(stats.workers, pool=stats.name)
+
+def shutdown_executors() -> None:
+    for pool in _stats:
+        pool.shutdown(wait=False, cancel_futures=True)
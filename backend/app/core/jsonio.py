@@ -0,0 +1,86 @@
+import json
+import math
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+try:  # optional: much faster encode/decode, native numpy support, NaN/Inf -> null
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+_ORJSON_OPTS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def sanitize(v: Any) -> Any:
+    """Recursive numpy-scalar -> python and NaN/Inf -> None (stdlib fallback path only)."""
+    if isinstance(v, dict):
+        return {k: sanitize(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [sanitize(x) for x in v]
+    if isinstance(v, np.ndarray):
+        return sanitize(v.tolist())
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float) and not math.isfinite(v):
+        return None
+    return v
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=_ORJSON_OPTS)
+    return json.dumps(sanitize(obj), allow_nan=False, separators=(",", ":")).encode()
+
+
+def dumps(obj: Any) -> str:
+    """Compact JSON text; NaN/Inf become null. Used for the *_json DB columns."""
+    return dumps_bytes(obj).decode()
+
+
+def loads(s: Any) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            pass  # legacy rows written by json.dumps may contain NaN/Infinity literals
+    return json.loads(s)
+
+
+def column_values(s: pd.Series) -> List[Any]:
+    """Column -> list with NaN/Inf replaced by None, decided column-wise in NumPy."""
+    arr = s.to_numpy()
+    if arr.dtype.kind == "f":
+        finite = np.isfinite(arr)
+        if finite.all():
+            return arr.tolist()
+        out = arr.astype(object)
+        out[~finite] = None
+        return out.tolist()
+    if arr.dtype.kind in "iub":
+        return arr.tolist()
+    return [sanitize(x) for x in arr.tolist()]
+
+
+def frame_columns(df: pd.DataFrame) -> Dict[str, List[Any]]:
+    """Columnar payload: {column: [values...]}."""
+    return {c: column_values(df[c]) for c in df.columns}
+
+
+def columns_to_records(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """{column: [values...]} -> [{column: value}, ...] without per-cell checks."""
+    cols = list(columns)
+    return [dict(zip(cols, row)) for row in zip(*columns.values())]
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Row payload: [{column: value}, ...] built from sanitized columns."""
+    return columns_to_records(frame_columns(df))
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps_bytes (orjson when available, NaN/Inf -> null)."""
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
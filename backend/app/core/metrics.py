@@ -0,0 +1,193 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Minimal Prometheus text-format registry (no client library needed): counters,
+# gauges and histograms with labels, rendered by GET /metrics. Values that already
+# live elsewhere (cache counters, executor queues) are read by collectors at scrape time.
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v != v:
+        return "NaN"
+    if v in (float("inf"), float("-inf")):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        k = _key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def set(self, value: float, **labels: str) -> None:
+        """For collectors mirroring a count kept elsewhere (a counter's value must never decrease)."""
+        with self._lock:
+            self._values[_key(labels)] = float(value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return self.header() + [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelKey, List[float]] = {}  # bucket counts..., +Inf count, sum
+
+    def observe(self, value: float, **labels: str) -> None:
+        k = _key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            v = self._values.get(k)
+            if v is None:
+                v = self._values[k] = [0.0] * (len(self.buckets) + 2)
+            v[i] += 1
+            v[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def render(self) -> List[str]:
+        out = self.header()
+        with self._lock:
+            for k, v in self._values.items():
+                cum = 0.0
+                for b, n in zip(self.buckets, v):
+                    cum += n
+                    out.append(f"{self.name}_bucket{_fmt_labels(k, ('le', _fmt_value(b)))} {_fmt_value(cum)}")
+                cum += v[len(self.buckets)]
+                out.append(f"{self.name}_bucket{_fmt_labels(k, ('le', '+Inf'))} {_fmt_value(cum)}")
+                out.append(f"{self.name}_sum{_fmt_labels(k)} {_fmt_value(v[-1])}")
+                out.append(f"{self.name}_count{_fmt_labels(k)} {_fmt_value(cum)}")
+        return out
+
+
+_metrics: Dict[str, _Metric] = {}
+_collectors: List[Callable[[], None]] = []
+_reg_lock = threading.Lock()
+
+
+def _register(metric: _Metric) -> _Metric:
+    with _reg_lock:
+        return _metrics.setdefault(metric.name, metric)
+
+
+def counter(name: str, help: str) -> Counter:
+    return _register(Counter(name, help))
+
+
+def gauge(name: str, help: str) -> Gauge:
+    return _register(Gauge(name, help))
+
+
+def histogram(name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, buckets))
+
+
+def register_collector(fn: Callable[[], None]) -> Callable[[], None]:
+    """fn() runs before every scrape, to refresh gauges from state kept elsewhere."""
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    for fn in _collectors:
+        fn()
+    lines: List[str] = []
+    for m in list(_metrics.values()):
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---- HTTP request latency ----
+
+REQUEST_SECONDS = histogram("http_request_duration_seconds", "Request latency by method, route and status")
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request under its route template (not the raw path)."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        status = [500]
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, method=scope["method"], route=route, status=str(status[0]))
+
+
+# ---- verbose tracing (replaces the old print() dumps; switchable at runtime) ----
+
+trace_log = logging.getLogger("app.trace")
+
+
+def set_verbose_tracing(enabled: bool) -> None:
+    trace_log.setLevel(logging.DEBUG if enabled else logging.WARNING)
+    if enabled and not trace_log.handlers and not logging.getLogger().handlers:
+        logging.basicConfig()
+
+
+def verbose_tracing() -> bool:
+    return trace_log.isEnabledFor(logging.DEBUG)
@@ -22,6 +22,20 @@ def create_access_token(subject: str) -> str:
 def decode_access_token(token: str) -> Optional[str]:
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        return payload.get("sub")
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    # stream tokens are only good for the one URL they were issued for
+    return None if "scope" in payload else payload.get("sub")
+
+def create_stream_token(subject: str, path: str) -> str:
+    """Short-lived token that authenticates GET `path` only (SSE URLs, where it ends up in logs)."""
+    exp = datetime.now(timezone.utc) + timedelta(seconds=settings.stream_token_seconds)
+    payload = {"sub": subject, "exp": exp, "scope": path}
+    return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+
+def decode_stream_token(token: str, path: str) -> Optional[str]:
+    try:
+        payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+    except JWTError:
+        return None
+    return payload.get("sub") if payload.get("scope") == path else None
\ No newline at end of file
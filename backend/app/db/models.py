@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Boolean, String, Integer, DateTime, ForeignKey, Text, Float
+from sqlalchemy import BigInteger, Boolean, String, Integer, DateTime, ForeignKey, Text, Float, Index, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
@@ -12,6 +12,10 @@ class User(Base):
 
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False)  # <-- ADD
 
+    # per-user retention policy (app.services.retention); NULL falls back to settings
+    retention_keep_runs: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    retention_keep_days: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
     configs: Mapped[list["Config"]] = relationship(back_populates="user", cascade="all, delete-orphan")
     runs: Mapped[list["BacktestRun"]] = relationship(back_populates="user", cascade="all, delete-orphan")
 
@@ -35,19 +39,54 @@ class Config(Base):
 
 class BacktestRun(Base):
     __tablename__ = "backtest_runs"
+    # keyset pagination: (user_id, sort column, id)
+    __table_args__ = tuple(
+        Index(f"ix_backtest_runs_user_{c}", "user_id", c, "id")
+        for c in ("avg_total_return", "avg_sharpe", "avg_max_drawdown", "num_trades")
+    ) + (Index("ix_backtest_runs_status_id", "status", "id"),)  # job queue scan
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     config_id: Mapped[int] = mapped_column(ForeignKey("configs.id"), index=True)
 
-    status: Mapped[str] = mapped_column(String(30), default="completed")
+    status: Mapped[str] = mapped_column(String(30), default="completed")  # queued|running|completed|failed
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     metrics_json: Mapped[str] = mapped_column(Text)  # JSON string
-    equity_json: Mapped[str] = mapped_column(Text, default="[]")  # <--- ADD THIS
+    # legacy text curves {symbol: [{"t": ..., "equity": float}]}; new runs use equity_blob
+    equity_json: Mapped[str] = mapped_column(Text, default="[]", deferred=True)
+    # compressed columnar curves (app.services.equity_store); deferred so listings never load it
+    equity_blob: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True, deferred=True)
+
+    # headline metrics denormalized from metrics_json at completion time (for listing/sorting)
+    avg_total_return: Mapped[float | None] = mapped_column(Float, nullable=True)
+    avg_sharpe: Mapped[float | None] = mapped_column(Float, nullable=True)
+    avg_max_drawdown: Mapped[float | None] = mapped_column(Float, nullable=True)
+    num_trades: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # content-addressed result cache: hash of strategy/params/risk/market/interval/symbols + input bars
+    result_key: Mapped[str | None] = mapped_column(String(64), index=True, nullable=True)
+    # set when this run reuses an identical earlier run's stored trades/equity instead of recomputing
+    source_run_id: Mapped[int | None] = mapped_column(ForeignKey("backtest_runs.id"), nullable=True)
+    # set once trades/equity were moved to the run's archive file (app.services.retention)
+    archived_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # NULL = batch backtest; "paper" = paper-trading session (app.services.paper)
+    run_type: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    # paper session that drives a run_type="paper" run (its lease_* columns say which
+    # process holds it and until when)
+    paper_session_id: Mapped[str | None] = mapped_column(String(32), index=True, nullable=True)
+    # per-phase seconds of the run (fetch, indicators, loop, metrics, db_write) and bars/s
+    timings_json: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # job queue lease (app.services.job_queue; paper sessions hold one too): the worker
+    # running it and until when; NULL owner = run by the API process itself
+    lease_owner: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    attempts: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     user: Mapped["User"] = relationship(back_populates="runs")
     config: Mapped["Config"] = relationship(back_populates="runs")
     trades: Mapped[list["Trade"]] = relationship(back_populates="run", cascade="all, delete-orphan")
+    bar_snapshots: Mapped[list["BarSnapshot"]] = relationship(back_populates="run", cascade="all, delete-orphan")
 
 class Trade(Base):
     __tablename__ = "trades"
@@ -55,7 +94,7 @@ class Trade(Base):
     run_id: Mapped[int] = mapped_column(ForeignKey("backtest_runs.id"), index=True)
 
     symbol: Mapped[str] = mapped_column(String(20))
-    timestamp: Mapped[str] = mapped_column(String(30))  # ISO or date
+    timestamp: Mapped[int] = mapped_column(BigInteger)  # epoch ms (UTC); legacy rows may hold ISO strings
     side: Mapped[str] = mapped_column(String(4))        # BUY/SELL
     qty: Mapped[float] = mapped_column(Float)
     price: Mapped[float] = mapped_column(Float)
@@ -65,4 +104,17 @@ class Trade(Base):
 
     decision_trace_json: Mapped[str] = mapped_column(Text)  # JSON string
 
-    run: Mapped["BacktestRun"] = relationship(back_populates="trades")
\ No newline at end of file
+    run: Mapped["BacktestRun"] = relationship(back_populates="trades")
+
+class BarSnapshot(Base):
+    """Bars + indicator columns a run consumed for one symbol (app.services.bar_store)."""
+    __tablename__ = "bar_snapshots"
+    __table_args__ = (Index("ix_bar_snapshots_run_symbol", "run_id", "symbol", unique=True),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("backtest_runs.id"))
+
+    symbol: Mapped[str] = mapped_column(String(20))
+    n_bars: Mapped[int] = mapped_column(Integer)
+    blob: Mapped[bytes] = mapped_column(LargeBinary, deferred=True)
+
+    run: Mapped["BacktestRun"] = relationship(back_populates="bar_snapshots")
\ No newline at end of file
@@ -1,19 +1,27 @@
 # app/db/models.py (or a new file imported by models __init__)
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Text
 from sqlalchemy.sql import func
 from app.db.session import Base
 
 class AgentRun(Base):
     __tablename__ = "agent_runs"
+    __table_args__ = (Index("ix_agent_runs_status_id", "status", "id"),)  # job queue scan
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     config_id = Column(Integer, ForeignKey("configs.id"), nullable=False, index=True)
 
-    status = Column(String(32), nullable=False, default="running")  # running|completed|failed
+    status = Column(String(32), nullable=False, default="running")  # queued|running|completed|failed
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     input_json = Column(Text, nullable=False, default="{}")
     output_json = Column(Text, nullable=True)      # final report
+    summary = Column(Text, nullable=True)          # report summary, denormalized for listing
     trace_json = Column(Text, nullable=True)       # tool calls + intermediate summaries
-    error = Column(Text, nullable=True)
\ No newline at end of file
+    error = Column(Text, nullable=True)
+    archived_at = Column(DateTime, nullable=True)  # output/trace moved to the archive file
+
+    # job queue lease (app.services.job_queue); NULL owner = run by the API process itself
+    lease_owner = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=True)
\ No newline at end of file
@@ -8,6 +8,23 @@ class AgentRunOut(BaseModel):
     config_id: int
     output: Optional[Dict[str, Any]] = None
 
+class AgentBatchIn(BaseModel):
+    config_ids: List[int] = Field(min_length=1, max_length=100)
+
+class AgentBatchRunOut(BaseModel):
+    id: int
+    config_id: int
+    status: str
+    error: Optional[str] = None
+
+class AgentBatchOut(BaseModel):
+    runs: List[AgentBatchRunOut]
+    tool_memo: Optional[Dict[str, int]] = None  # shared fetch/backtest reuse (not set for background=true)
+
+class PaperSessionIn(BaseModel):
+    config_ids: List[int] = Field(min_length=1, max_length=1000)
+    speed: float = Field(0.0, ge=0.0)  # x real time; 0 = as fast as possible
+
 class AgentRunDetailOut(BaseModel):
     id: int
     status: str
@@ -57,6 +74,8 @@ class BacktestRunOut(BaseModel):
     status: str
     config_id: int
     metrics: Dict[str, Any]
+    source_run_id: Optional[int] = None  # set when results were reused from an identical run
+    timings: Optional[Dict[str, Any]] = None  # per-phase seconds (backtest_jobs._record_timings)
 
 class TradeOut(BaseModel):
     id: int
@@ -74,6 +93,19 @@ class MeOut(BaseModel):
     email: EmailStr
     is_admin: bool
 
+class RetentionPolicyIn(BaseModel):
+    keep_runs: Optional[int] = Field(None, ge=0)   # None -> server default
+    keep_days: Optional[int] = Field(None, ge=0)
+
+class RetentionPolicyOut(BaseModel):
+    keep_runs: Optional[int] = None
+    keep_days: Optional[int] = None
+    effective_keep_runs: int
+    effective_keep_days: int
+
+class TracingIn(BaseModel):
+    verbose: bool
+
 class AdminUserOut(BaseModel):
     id: int
     email: EmailStr
@@ -84,4 +116,7 @@ class BacktestRunListOut(BaseModel):
     status: str
     config_id: int
     created_at: str
-    metrics: Dict[str, Any]
\ No newline at end of file
+    metrics: Dict[str, Any]
+    run_type: str = "backtest"
+    # queued / running runs: GET it with EventSource for live progress
+    events_url: Optional[str] = None
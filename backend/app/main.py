@@ -1,15 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.db import models
-from app.db.session import Base, engine
+from app.db.session import SessionLocal, ensure_schema
 from app.routers import auth, configs, backtests
 from app.routers import me as me_router
 from app.routers import admin as admin_router
-from app.routers import agent
+from app.routers import paper
+from app.routers import metrics as metrics_router
+from app.services.run_summary import backfill_summaries
+from app.core.config import settings
+from app.core.executors import shutdown_executors
+from app.core.metrics import MetricsMiddleware, set_verbose_tracing
+from app.services.paper import fail_orphaned_runs, shutdown_sessions
+from app.core.jsonio import FastJSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await shutdown_sessions()
+    shutdown_executors()
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Trading Bot MVP")
+    app = FastAPI(title="Trading Bot MVP", lifespan=lifespan, default_response_class=FastJSONResponse)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=[
@@ -19,8 +34,15 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
-    Base.metadata.create_all(bind=engine)
+    app.add_middleware(MetricsMiddleware)
+    set_verbose_tracing(settings.verbose_tracing)
+    ensure_schema()
+    with SessionLocal() as db:
+        backfill_summaries(db)
+        fail_orphaned_runs(db)
+        db.commit()
 
     app.include_router(auth.router)
     app.include_router(configs.router)
@@ -28,7 +50,15 @@ def create_app() -> FastAPI:
     app.include_router(me_router.router)
     app.include_router(admin_router.router)
 
-    app.include_router(agent.router)
+    profile = (settings.worker_profile or "").lower()
+    if profile == "full":
+        # imported here so a core worker never loads the agent stack
+        from app.routers import agent
+        app.include_router(agent.router)
+    elif profile != "core":
+        raise ValueError(f"Unknown worker profile: {settings.worker_profile}")
+    app.include_router(paper.router)
+    app.include_router(metrics_router.router)
     return app
 
 app = create_app()
\ No newline at end of file
@@ -1,23 +1,98 @@
-from fastapi import Depends, HTTPException
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 
-from app.core.security import decode_access_token
+from app.core.cache import TTLCache, register_cache
+from app.core.config import settings
+from app.core.security import create_stream_token, decode_access_token, decode_stream_token
 from app.db.session import get_db
 from app.db import models
 
 bearer = HTTPBearer(auto_error=False)
 
-def get_current_user(
-    creds: HTTPAuthorizationCredentials = Depends(bearer),
-    db: Session = Depends(get_db),
-) -> models.User:
-    if not creds:
+@dataclass(frozen=True)
+class CurrentUser:
+    """Detached snapshot of the authenticated user; safe to share across requests."""
+    id: int
+    email: str
+    is_admin: bool
+
+# keyed by token subject (user id); entries are dropped whenever the User row changes
+user_cache = register_cache(TTLCache(
+    maxsize=settings.user_cache_size,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+    name="user",
+))
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.invalidate(str(user_id))
+
+# after_update / after_delete fire at flush, while other requests still read the old
+# row: invalidating there lets one re-cache it for a full TTL. The ids are collected on
+# the session and dropped once the change is committed.
+_CHANGED_USERS = "changed_user_ids"
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _note_change(mapper, connection, target):
+    db = object_session(target)
+    if db is not None:
+        db.info.setdefault(_CHANGED_USERS, set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(db):
+    for user_id in db.info.pop(_CHANGED_USERS, ()):
+        invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(db):
+    db.info.pop(_CHANGED_USERS, None)
+
+def _user_from_token(token: Optional[str], db: Session) -> CurrentUser:
+    if not token:
         raise HTTPException(status_code=401, detail="Missing bearer token")
-    user_id = decode_access_token(creds.credentials)
+    return _user_from_id(decode_access_token(token), db)
+
+def _user_from_id(user_id: Optional[str], db: Session) -> CurrentUser:
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
     user = db.query(models.User).filter(models.User.id == int(user_id)).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
\ No newline at end of file
+    current = CurrentUser(id=user.id, email=user.email, is_admin=bool(user.is_admin))
+    user_cache.set(user_id, current)
+    return current
+
+def get_current_user(
+    creds: HTTPAuthorizationCredentials = Depends(bearer),
+    db: Session = Depends(get_db),
+) -> CurrentUser:
+    return _user_from_token(creds.credentials if creds else None, db)
+
+def get_current_user_sse(
+    request: Request,
+    stream_token: Optional[str] = Query(None),
+    creds: HTTPAuthorizationCredentials = Depends(bearer),
+    db: Session = Depends(get_db),
+) -> CurrentUser:
+    # EventSource cannot send headers: browsers follow the events_url of a run listing,
+    # whose ?stream_token= is short-lived and valid for that path only (see stream_url)
+    if creds:
+        return _user_from_token(creds.credentials, db)
+    if not stream_token:
+        raise HTTPException(status_code=401, detail="Missing bearer token")
+    return _user_from_id(decode_stream_token(stream_token, request.url.path), db)
+
+def stream_url(request: Request, route: str, user_id: int, **path_params) -> str:
+    """Absolute URL of an SSE route, on the host the client reached, carrying a stream token."""
+    url = request.url_for(route, **path_params)
+    return str(url.include_query_params(stream_token=create_stream_token(str(user_id), url.path)))
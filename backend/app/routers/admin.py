@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import engine, get_db
 from app.db import models
-from app.db.schemas import AdminUserOut
+from app.core.cache import cache_stats
+from app.core.metrics import set_verbose_tracing, verbose_tracing
+from app.core.executors import run_in, backtest_pool
+from app.services.retention import apply_retention, compact_database
+from app.db.schemas import AdminUserOut, TracingIn
 from app.routers._deps import get_current_user
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -16,4 +21,43 @@ def require_admin(user):
 def list_users(db: Session = Depends(get_db), user=Depends(get_current_user)):
     require_admin(user)
     rows = db.query(models.User).order_by(models.User.id.asc()).all()
-    return [AdminUserOut(id=u.id, email=u.email, is_admin=u.is_admin) for u in rows]
\ No newline at end of file
+    return [AdminUserOut(id=u.id, email=u.email, is_admin=u.is_admin) for u in rows]
+
+@router.get("/cache-stats")
+def get_cache_stats(user=Depends(get_current_user)):
+    require_admin(user)
+    return cache_stats()
+
+@router.get("/tracing")
+def get_tracing(user=Depends(get_current_user)):
+    require_admin(user)
+    return {"verbose": verbose_tracing()}
+
+@router.put("/tracing")
+def set_tracing(payload: TracingIn, user=Depends(get_current_user)):
+    """Per-bar / per-fetch debug dumps on the app.trace logger; applies to the worker serving the request."""
+    require_admin(user)
+    set_verbose_tracing(payload.verbose)
+    return {"verbose": verbose_tracing()}
+
+@router.post("/retention")
+async def run_retention(
+    user_id: Optional[int] = None,
+    keep_runs: Optional[int] = Query(None, ge=0),
+    keep_days: Optional[int] = Query(None, ge=0),
+    vacuum: bool = True,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Archive expired runs for one user or everyone, then reclaim the freed pages.
+    keep_runs / keep_days override every user's own policy for this pass.
+    """
+    require_admin(user)
+    return await run_in(backtest_pool, _run_retention, user_id, keep_runs, keep_days, vacuum, db)
+
+def _run_retention(user_id, keep_runs, keep_days, vacuum: bool, db: Session) -> dict:
+    out = {"archived": apply_retention(db, user_id=user_id, keep_runs=keep_runs, keep_days=keep_days)}
+    if vacuum:
+        out["vacuum"] = compact_database(engine)
+    return out
@@ -1,14 +1,26 @@
-import json
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_db
 from app.db import models, models_agent
-from app.routers._deps import get_current_user
-from app.db.schemas import AgentRunOut, AgentRunDetailOut
-from app.services.agent_runner import run_agent_v1
+from app.routers._deps import get_current_user, get_current_user_sse, stream_url
+from app.core.executors import run_in, submit, backtest_pool
+from app.core import jsonio
+from app.db.schemas import AgentRunOut, AgentRunDetailOut, AgentBatchIn, AgentBatchOut, AgentBatchRunOut
+from app.services.agent_jobs import (
+    EMPTY_REPORT_ERROR, EmptyReportError, create_agent_run, execute_agent_batch, execute_agent_run, progress_key,
+)
+from app.services.progress import stream_events
+from app.services import job_queue
+from app.services.retention import archived_agent_detail
+
+log = logging.getLogger("app.jobs")
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
@@ -19,71 +31,132 @@ class AgentRunListOut(BaseModel):
     created_at: str
     summary: Optional[str] = None
     error: Optional[str] = None
+    # queued / running runs: GET it with EventSource for live progress
+    events_url: Optional[str] = None
 
 @router.post("/run", response_model=AgentRunOut)
-def run_agent(config_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+async def run_agent(
+    config_id: int,
+    background: bool = False,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    background=true returns immediately with status=running (status=queued with
+    JOB_QUEUE=db: a job worker runs it); follow GET /agent/{id}/events for progress
+    and the final report.
+    """
+    queued = background and job_queue.enabled()
+    agent_run_id = await run_in_threadpool(_start_agent, config_id, db, user, "queued" if queued else "running")
+    if queued:
+        return AgentRunOut(id=agent_run_id, status="queued", config_id=config_id, output=None)
+    if background:
+        submit(backtest_pool, _execute_agent_detached, agent_run_id)
+        return AgentRunOut(id=agent_run_id, status="running", config_id=config_id, output=None)
+    return await run_in(backtest_pool, _execute_agent, agent_run_id, config_id, db)
+
+def _start_agent(config_id: int, db: Session, user, status: str = "running") -> int:
     cfg = db.query(models.Config).filter(models.Config.id == config_id, models.Config.user_id == user.id).first()
     if not cfg:
         raise HTTPException(status_code=404, detail="Config not found")
+    return create_agent_run(db, cfg, user.id, status).id
 
-    params = json.loads(cfg.params_json)
-    risk = json.loads(cfg.risk_json)
-    symbols = [s.strip() for s in cfg.symbols_csv.split(",") if s.strip()]
-
-    agent_run = models_agent.AgentRun(
-        user_id=user.id,
-        config_id=cfg.id,
-        status="running",
-        input_json=json.dumps({
-            "symbols": symbols,
-            "market": cfg.market,
-            "interval": cfg.interval,
-            "start_date": cfg.start_date,
-            "end_date": cfg.end_date,
-            "strategy": cfg.strategy,
-            "params": params,
-            "risk": risk,
-        }),
-    )
-    db.add(agent_run)
-    db.commit()
-    db.refresh(agent_run)
-
+def _execute_agent(agent_run_id: int, config_id: int, db: Session) -> AgentRunOut:
     try:
-        report_json, trace_json = run_agent_v1(
-            run_id=agent_run.id,
-            config_id=cfg.id,
-            symbols=symbols,
-            market=cfg.market,
-            interval=cfg.interval,
-            start_date=cfg.start_date,
-            end_date=cfg.end_date,
-            strategy=cfg.strategy,
-            params=params,
-            risk=risk,
-            model="gpt-4.1-mini",
-        )
-
-        recs = report_json.get("recommendations", [])
-        if not isinstance(recs, list) or len(recs) == 0:
-            agent_run.status = "failed"
-            agent_run.error = "Agent produced empty recommendations."
-            agent_run.trace_json = json.dumps(trace_json)
-            db.commit()
-            raise HTTPException(status_code=500, detail="Agent produced empty recommendations.")
+        report_json = execute_agent_run(db, agent_run_id)
+    except EmptyReportError:
+        raise HTTPException(status_code=500, detail=EMPTY_REPORT_ERROR)
+    return AgentRunOut(id=agent_run_id, status="completed", config_id=config_id, output=report_json)
+
+def _execute_agent_detached(agent_run_id: int) -> None:
+    # the request's session is gone by now; failures are recorded on the run
+    with SessionLocal() as db:
+        try:
+            execute_agent_run(db, agent_run_id)
+        except Exception:
+            log.exception("background agent run %d failed", agent_run_id)
+
+@router.post("/run-batch", response_model=AgentBatchOut)
+async def run_agent_batch(
+    payload: AgentBatchIn,
+    background: bool = False,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    One AgentRun per config; fetches and backtests shared between the configs run once
+    and the report calls run concurrently (REPORT_WORKERS). background=true returns
+    the run ids immediately; each run has its own /agent/{id}/events stream. With
+    JOB_QUEUE=db a background batch is queued run by run for the job workers.
+    """
+    config_ids = list(dict.fromkeys(payload.config_ids))
+    queued = background and job_queue.enabled()
+    runs = await run_in_threadpool(_start_agent_batch, config_ids, db, user, "queued" if queued else "running")
+    ids = [r.id for r in runs]
+    if queued:
+        return AgentBatchOut(runs=runs)
+    if background:
+        submit(backtest_pool, _execute_agent_batch_detached, ids)
+        return AgentBatchOut(runs=runs)
+    return await run_in(backtest_pool, _execute_agent_batch, ids, db)
+
+def _start_agent_batch(config_ids: List[int], db: Session, user, status: str = "running") -> List[AgentBatchRunOut]:
+    cfgs = {
+        c.id: c for c in
+        db.query(models.Config).filter(models.Config.id.in_(config_ids), models.Config.user_id == user.id).all()
+    }
+    missing = [i for i in config_ids if i not in cfgs]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Configs not found: {missing}")
+    out = []
+    for cid in config_ids:
+        r = create_agent_run(db, cfgs[cid], user.id, status)
+        out.append(AgentBatchRunOut(id=r.id, config_id=cid, status=r.status))
+    return out
+
+def _execute_agent_batch(agent_run_ids: List[int], db: Session) -> AgentBatchOut:
+    return AgentBatchOut(**execute_agent_batch(db, agent_run_ids))
+
+def _execute_agent_batch_detached(agent_run_ids: List[int]) -> None:
+    with SessionLocal() as db:
+        try:
+            execute_agent_batch(db, agent_run_ids)
+        except Exception:
+            log.exception("background agent batch %s failed", agent_run_ids)
+
+@router.get("/{agent_run_id}/events")
+async def agent_events(agent_run_id: int, db: Session = Depends(get_db), user=Depends(get_current_user_sse)):
+    """
+    Server-sent events: status, tool, symbol_done (per-symbol metrics + partial
+    aggregate), report, then completed (with the report) or failed.
+    """
+    A = models_agent.AgentRun
+    exists = await run_in_threadpool(
+        lambda: db.query(A.id).filter(A.id == agent_run_id, A.user_id == user.id).first()
+    )
+    if not exists:
+        raise HTTPException(status_code=404, detail="Agent run not found")
 
-        agent_run.status = "completed"
-        agent_run.output_json = json.dumps(report_json)
-        agent_run.trace_json = json.dumps(trace_json)
-        db.commit()
+    async def poll_final():
+        return await run_in_threadpool(_final_event, agent_run_id)
 
-        return AgentRunOut(id=agent_run.id, status=agent_run.status, config_id=agent_run.config_id, output=report_json)
+    return StreamingResponse(
+        stream_events(progress_key(agent_run_id), poll_final),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    except Exception as e:
-        agent_run.status = "failed"
-        agent_run.error = str(e)
-        db.commit()
-        raise
+def _final_event(agent_run_id: int):
+    with SessionLocal() as db:
+        r = db.query(models_agent.AgentRun).filter(models_agent.AgentRun.id == agent_run_id).first()
+        if r is None or r.status == "failed":
+            return {"type": "failed", "agent_run_id": agent_run_id, "error": r.error if r else "Agent run not found"}
+        if r.status != "completed":
+            return None
+        return {
+            "type": "completed", "agent_run_id": r.id, "percent": 100.0,
+            "result": jsonio.loads(r.output_json) if r.output_json else None,
+        }
 
 @router.get("/{agent_run_id}", response_model=AgentRunDetailOut)
 def get_agent_run(agent_run_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
@@ -91,43 +164,63 @@ def get_agent_run(agent_run_id: int, db: Session = Depends(get_db), user=Depends
     if not r:
         raise HTTPException(status_code=404, detail="Agent run not found")
 
+    output, trace = _output_and_trace(r)
     return AgentRunDetailOut(
         id=r.id,
         status=r.status,
         config_id=r.config_id,
-        input=json.loads(r.input_json or "{}"),
-        output=json.loads(r.output_json) if r.output_json else None,
-        trace=json.loads(r.trace_json) if r.trace_json else None,
+        input=jsonio.loads(r.input_json or "{}"),
+        output=output,
+        trace=trace,
         error=r.error,
     )
 
+def _output_and_trace(r: models_agent.AgentRun):
+    if r.archived_at is not None:
+        try:
+            detail = archived_agent_detail(r.id)
+        except LookupError:
+            raise HTTPException(status_code=410, detail="Archived run data is no longer available")
+        return detail.get("output"), detail.get("trace")
+    return (
+        jsonio.loads(r.output_json) if r.output_json else None,
+        jsonio.loads(r.trace_json) if r.trace_json else None,
+    )
+
 @router.get("", response_model=List[AgentRunListOut])
 @router.get("/", response_model=List[AgentRunListOut])  # supports trailing slash too
-def list_agent_runs(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    runs = (
-        db.query(models_agent.AgentRun)
-        .filter(models_agent.AgentRun.user_id == user.id)
-        .order_by(models_agent.AgentRun.id.desc())
-        .limit(200)
-        .all()
+def list_agent_runs(
+    request: Request,
+    response: Response,
+    limit: int = Query(200, ge=1, le=500),
+    cursor: Optional[int] = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """Keyset-paginated by id (newest first); reads the summary column, not output_json."""
+    A = models_agent.AgentRun
+    q = (
+        db.query(A.id, A.status, A.config_id, A.created_at, A.summary, A.error)
+        .filter(A.user_id == user.id)
     )
-
-    out = []
-    for r in runs:
-        summary = None
-        if r.output_json:
-            try:
-                summary = json.loads(r.output_json).get("summary")
-            except Exception:
-                summary = None
-
-        out.append(AgentRunListOut(
+    if cursor is not None:
+        q = q.filter(A.id < cursor)
+    runs = q.order_by(A.id.desc()).limit(limit).all()
+    if len(runs) == limit:
+        response.headers["X-Next-Cursor"] = str(runs[-1].id)
+
+    return [
+        AgentRunListOut(
             id=r.id,
             status=r.status,
             config_id=r.config_id,
             created_at=r.created_at.isoformat() if r.created_at else "",
-            summary=summary,
+            summary=r.summary,
             error=r.error,
-        ))
-
-    return out
\ No newline at end of file
+            events_url=(
+                stream_url(request, "agent_events", user.id, agent_run_id=r.id)
+                if r.status in ("queued", "running") else None
+            ),
+        )
+        for r in runs
+    ]
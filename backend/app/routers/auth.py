@@ -6,11 +6,18 @@ from app.db.session import get_db
 from app.db import models
 from app.db.schemas import RegisterIn, LoginIn, TokenOut
 from app.core.security import hash_password, verify_password, create_access_token
+from app.core.executors import run_in, password_pool
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# bcrypt is deliberately slow; keep it on its own pool so logins don't queue behind
+# (or starve) other request work
+
 @router.post("/register", response_model=TokenOut)
-def register(payload: RegisterIn, db: Session = Depends(get_db)):
+async def register(payload: RegisterIn, db: Session = Depends(get_db)):
+    return await run_in(password_pool, _register, payload, db)
+
+def _register(payload: RegisterIn, db: Session) -> TokenOut:
     existing = db.query(models.User).filter(models.User.email == payload.email).first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -30,7 +37,10 @@ def register(payload: RegisterIn, db: Session = Depends(get_db)):
     return TokenOut(access_token=token)
 
 @router.post("/login", response_model=TokenOut)
-def login(payload: LoginIn, db: Session = Depends(get_db)):
+async def login(payload: LoginIn, db: Session = Depends(get_db)):
+    return await run_in(password_pool, _login, payload, db)
+
+def _login(payload: LoginIn, db: Session) -> TokenOut:
     user = db.query(models.User).filter(models.User.email == payload.email).first()
     if not user or not verify_password(payload.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
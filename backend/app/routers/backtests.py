@@ -1,100 +1,153 @@
 import json
-import math
+import re
+import logging
+from types import SimpleNamespace
+from typing import Optional
 import pandas as pd
-import numpy as np
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_db
 from app.db import models
 from app.db.schemas import BacktestRunOut, TradeOut, BacktestRunListOut
-from app.routers._deps import get_current_user
-from app.services.data_provider import CsvDataProvider
-from app.services.yfinance_provider import YFinanceDataProvider
-from app.services.backtester import run_backtest_for_symbol, aggregate_metrics
-from app.services.strategies import get_strategy
-
+from app.routers._deps import get_current_user, get_current_user_sse, stream_url
+from app.core.cache import TTLCache, register_cache
+from app.core.config import settings
+from app.core.executors import run_in, submit, backtest_pool, serialization_pool
+from app.core import jsonio
+from app.core.jsonio import FastJSONResponse
+from app.services.backtester import annualization_factor
+from app.services.data_provider import get_data_provider
+from app.services.strategies import get_strategy, prepare_frame
+from app.services.backtest_jobs import create_backtest_run, execute_backtest_run, progress_key
+from app.services import job_queue
+from app.services.progress import stream_events
+from app.services.run_summary import SUMMARY_SORT_COLUMNS
+from app.services.timeutils import MS_PER_DAY, epoch_ms_to_iso, format_timestamps, date_to_epoch_ms
+from app.services.equity_store import read_run_curves
+from app.services.retention import archived_curves, archived_snapshot, archived_trades
+from app.services.compare import align_runs, metrics_diff, portfolio_curve
+from app.services.bar_store import FrameBlob
+from app.services.rolling import rolling_risk
+
+
+# background runs record their own failure on the row; this catches what that misses
+log = logging.getLogger("app.jobs")
 
 router = APIRouter(prefix="/backtests", tags=["backtests"])
 
+MAX_COMPARE_RUNS = 20
 
-def _json_safe(v):
-    # Convert numpy scalar to python scalar
-    if isinstance(v, (np.generic,)):
-        v = v.item()
+# rolling series of finished runs never change; keyed by (data run id, window, symbol)
+rolling_cache = register_cache(TTLCache(
+    maxsize=settings.rolling_cache_size,
+    ttl_seconds=settings.rolling_cache_ttl_seconds,
+    name="rolling",
+))
 
-    # Replace NaN / Inf
-    if isinstance(v, float):
-        if math.isnan(v) or math.isinf(v):
-            return None
 
-    return v
+_DATE_ONLY = re.compile(r"\d{4}-\d{2}-\d{2}")
 
-def _records_json_safe(records: list[dict]) -> list[dict]:
-    out = []
-    for r in records:
-        out.append({k: _json_safe(v) for k, v in r.items()})
-    return out
+def _data_run_id(run: models.BacktestRun) -> int:
+    # runs deduplicated by the result cache keep their trades/equity on the source run
+    return run.source_run_id or run.id
+
+def _data_archived(run: models.BacktestRun, db: Session) -> bool:
+    # trades/equity of the data run were moved to its archive file by retention
+    if run.source_run_id is None:
+        return run.archived_at is not None
+    return db.query(models.BacktestRun.archived_at).filter(models.BacktestRun.id == run.source_run_id).scalar() is not None
+
+def _archived(fn, *args):
+    try:
+        return fn(*args)
+    except LookupError:
+        raise HTTPException(status_code=410, detail="Archived run data is no longer available")
 
 
 @router.post("/run", response_model=BacktestRunOut)
-def run_backtest(config_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+async def run_backtest(
+    config_id: int,
+    background: bool = False,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    background=true returns immediately with status=running (status=queued with
+    JOB_QUEUE=db: a job worker runs it); follow GET /backtests/{id}/events for
+    progress and the final result.
+    """
+    queued = background and job_queue.enabled()
+    run_id = await run_in_threadpool(_start_backtest, config_id, db, user, "queued" if queued else "running")
+    if queued:
+        return BacktestRunOut(id=run_id, status="queued", config_id=config_id, metrics={})
+    if background:
+        submit(backtest_pool, _execute_backtest_detached, run_id)
+        return BacktestRunOut(id=run_id, status="running", config_id=config_id, metrics={})
+    return await run_in(backtest_pool, _execute_backtest, run_id, db)
+
+def _start_backtest(config_id: int, db: Session, user, status: str = "running") -> int:
     cfg = db.query(models.Config).filter(models.Config.id == config_id, models.Config.user_id == user.id).first()
     if not cfg:
         raise HTTPException(status_code=404, detail="Config not found")
+    return create_backtest_run(db, cfg, user.id, status).id
 
-    params = json.loads(cfg.params_json)
-    risk = json.loads(cfg.risk_json)
-    symbols = [s.strip() for s in cfg.symbols_csv.split(",") if s.strip()]
-
-    #provider = CsvDataProvider(base_path="data")  # MVP: put CSVs in backend/data/
-    provider = YFinanceDataProvider()
-
-    per_symbol_metrics = []
-    all_trades = []
-    curves = {}  # symbol -> curve
-
-    for sym in symbols:
-        #md = provider.get_ohlcv(sym, cfg.start_date, cfg.end_date)
-        md = provider.get_ohlcv(sym, cfg.start_date, cfg.end_date, interval=cfg.interval)
-        #metrics, trades, curve = run_backtest_for_symbol(sym, md.df, cfg.strategy, params, risk)
-        metrics, trades, curve = run_backtest_for_symbol(
-            sym, md.df, cfg.strategy, params, risk, market=cfg.market, interval=cfg.interval
-        )
-        per_symbol_metrics.append(metrics)
-        all_trades.extend(trades)
-        curves[sym] = curve
-
-    metrics = aggregate_metrics(per_symbol_metrics)
-
-    run = models.BacktestRun(
-        user_id=user.id,
-        config_id=cfg.id,
-        status="completed",
-        metrics_json=json.dumps(metrics),
-        equity_json=json.dumps(curves),
+def _execute_backtest(run_id: int, db: Session) -> BacktestRunOut:
+    run = execute_backtest_run(db, run_id)
+    return BacktestRunOut(
+        id=run.id, status=run.status, config_id=run.config_id,
+        metrics=jsonio.loads(run.metrics_json), source_run_id=run.source_run_id,
+        timings=jsonio.loads(run.timings_json) if run.timings_json else None,
+    )
+
+def _execute_backtest_detached(run_id: int) -> None:
+    # the request's session is gone by now; failures are recorded on the run
+    with SessionLocal() as db:
+        try:
+            execute_backtest_run(db, run_id)
+        except Exception:
+            log.exception("background backtest %d failed", run_id)
+
+@router.get("/{run_id}/events")
+async def backtest_events(run_id: int, db: Session = Depends(get_db), user=Depends(get_current_user_sse)):
+    """
+    Server-sent events: status, fetched, progress (bars_processed / percent),
+    symbol_done (per-symbol metrics + partial aggregate), then completed or failed.
+    """
+    exists = await run_in_threadpool(
+        lambda: db.query(models.BacktestRun.id)
+        .filter(models.BacktestRun.id == run_id, models.BacktestRun.user_id == user.id)
+        .first()
     )
-    db.add(run)
-    db.commit()
-    db.refresh(run)
-
-    # store trades
-    for t in all_trades:
-        db.add(models.Trade(
-            run_id=run.id,
-            symbol=t.symbol,
-            timestamp=t.timestamp,
-            side=t.side,
-            qty=t.qty,
-            price=t.price,
-            fee=t.fee,
-            slippage=t.slippage,
-            pnl=t.pnl,
-            decision_trace_json=json.dumps(t.decision_trace),
-        ))
-    db.commit()
-
-    return BacktestRunOut(id=run.id, status=run.status, config_id=run.config_id, metrics=metrics)
+    if not exists:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    async def poll_final():
+        return await run_in_threadpool(_final_event, run_id)
+
+    return StreamingResponse(
+        stream_events(progress_key(run_id), poll_final),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _final_event(run_id: int):
+    with SessionLocal() as db:
+        run = db.query(models.BacktestRun).filter(models.BacktestRun.id == run_id).first()
+        if run is None or run.status == "failed":
+            return {"type": "failed", "run_id": run_id, "error": run.error if run else "Run not found"}
+        if run.status != "completed":
+            return None
+        return {
+            "type": "completed", "run_id": run.id, "percent": 100.0,
+            "result": {
+                "id": run.id, "status": run.status, "config_id": run.config_id,
+                "metrics": jsonio.loads(run.metrics_json), "source_run_id": run.source_run_id,
+            },
+        }
 
 @router.get("/{run_id}/results", response_model=BacktestRunOut)
 def get_results(run_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
@@ -102,100 +155,354 @@ def get_results(run_id: int, db: Session = Depends(get_db), user=Depends(get_cur
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     return BacktestRunOut(
-        id=run.id, status=run.status, config_id=run.config_id, metrics=json.loads(run.metrics_json)
+        id=run.id, status=run.status, config_id=run.config_id, metrics=jsonio.loads(run.metrics_json),
+        source_run_id=run.source_run_id, timings=jsonio.loads(run.timings_json) if run.timings_json else None,
     )
 
 @router.get("/{run_id}/trades", response_model=list[TradeOut])
-def get_trades(run_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+async def get_trades(run_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    return await run_in(serialization_pool, _get_trades, run_id, db, user)
+
+def _get_trades(run_id: int, db: Session, user) -> FastJSONResponse:
     run = db.query(models.BacktestRun).filter(models.BacktestRun.id == run_id, models.BacktestRun.user_id == user.id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
-    trades = db.query(models.Trade).filter(models.Trade.run_id == run.id).order_by(models.Trade.id.asc()).all()
-    return [TradeOut(
-        id=t.id, symbol=t.symbol, timestamp=t.timestamp, side=t.side, qty=t.qty, price=t.price,
-        fee=t.fee, slippage=t.slippage, pnl=t.pnl
-    ) for t in trades]
+    if _data_archived(run, db):
+        trades = [SimpleNamespace(**t) for t in _archived(archived_trades, _data_run_id(run))]
+    else:
+        trades = db.query(models.Trade).filter(models.Trade.run_id == _data_run_id(run)).order_by(models.Trade.id.asc()).all()
+    timestamps = format_timestamps([t.timestamp for t in trades])
+    # encoded here, on the serialization pool, rather than by FastAPI on the event loop
+    return FastJSONResponse([{
+        "id": t.id, "symbol": t.symbol, "timestamp": ts, "side": t.side, "qty": t.qty, "price": t.price,
+        "fee": t.fee, "slippage": t.slippage, "pnl": t.pnl,
+    } for t, ts in zip(trades, timestamps)])
 
 @router.get("/{run_id}/explain/{trade_id}")
 def explain_trade(run_id: int, trade_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
     run = db.query(models.BacktestRun).filter(models.BacktestRun.id == run_id, models.BacktestRun.user_id == user.id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
-    trade = db.query(models.Trade).filter(models.Trade.id == trade_id, models.Trade.run_id == run.id).first()
+    if _data_archived(run, db):
+        trade = next(
+            (SimpleNamespace(**t) for t in _archived(archived_trades, _data_run_id(run)) if t["id"] == trade_id), None
+        )
+    else:
+        trade = db.query(models.Trade).filter(models.Trade.id == trade_id, models.Trade.run_id == _data_run_id(run)).first()
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found")
-    return {"trade_id": trade.id, "decision_trace": json.loads(trade.decision_trace_json)}
+    return {"trade_id": trade.id, "decision_trace": jsonio.loads(trade.decision_trace_json)}
 
 @router.get("/{run_id}/equity")
-def get_equity(run_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+async def get_equity(
+    run_id: int,
+    symbol: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    format: str = Query("records", pattern="^(records|columns)$"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    symbol / start / end (ISO date or datetime, inclusive) restrict what gets decoded;
+    format=columns returns {symbol: {"t": [...], "equity": [...]}}.
+    """
+    return await run_in(serialization_pool, _get_equity, run_id, symbol, start, end, format, db, user)
+
+def _get_equity(
+    run_id: int, symbol: Optional[str], start: Optional[str], end: Optional[str], format: str, db: Session, user
+) -> FastJSONResponse:
     run = db.query(models.BacktestRun).filter(models.BacktestRun.id == run_id, models.BacktestRun.user_id == user.id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
-    return {"run_id": run.id, "equity": json.loads(run.equity_json)}
+    start_ms, end_ms = _parse_range(start, end)
+    curves = _run_curves(run, db, [symbol] if symbol else None, start_ms, end_ms)
+
+    out = {}
+    for sym, (ts, eq) in curves.items():
+        columns = {"t": epoch_ms_to_iso(ts), "equity": eq.tolist()}
+        out[sym] = columns if format == "columns" else jsonio.columns_to_records(columns)
+    return FastJSONResponse({"run_id": run.id, "equity": out})
+
+def _parse_range(start: Optional[str], end: Optional[str]):
+    """Inclusive epoch-ms bounds; a date-only end covers that whole day (up to the next midnight)."""
+    try:
+        start_ms = date_to_epoch_ms(start) if start else None
+        end_ms = None
+        if end:
+            end_ms = date_to_epoch_ms(end)
+            if _DATE_ONLY.fullmatch(end.strip()):
+                end_ms += MS_PER_DAY - 1
+        return start_ms, end_ms
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start/end must be ISO dates or datetimes")
+
+def _run_curves(run: models.BacktestRun, db: Session, symbols, start_ms, end_ms):
+    """{symbol: (epoch ms, equity)} from the run holding the data: live blob/json or its archive file."""
+    run_data = run
+    if run.source_run_id:
+        run_data = db.query(models.BacktestRun).filter(models.BacktestRun.id == run.source_run_id).first()
+    if run_data is None:
+        return {}
+    if run_data.archived_at is not None:
+        return _archived(archived_curves, run_data.id, symbols, start_ms, end_ms)
+    return read_run_curves(run_data.equity_blob, run_data.equity_json, symbols=symbols, start_ms=start_ms, end_ms=end_ms)
+
+@router.get("/{run_id}/rolling")
+async def get_rolling(
+    run_id: int,
+    window: int = Query(..., ge=2, le=100_000, description="window length in bars"),
+    symbol: Optional[str] = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Rolling Sharpe, volatility (annualized for the run's market/interval), drawdown
+    against the window's peak and underwater duration (days since the last high) per
+    symbol, as columns {symbol: {"t": [...], "sharpe": [...], ...}}; null until the
+    window is full.
+    """
+    return await run_in(serialization_pool, _get_rolling, run_id, window, symbol, db, user)
+
+def _get_rolling(run_id: int, window: int, symbol: Optional[str], db: Session, user) -> FastJSONResponse:
+    run = db.query(models.BacktestRun).filter(models.BacktestRun.id == run_id, models.BacktestRun.user_id == user.id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    cfg = db.query(models.Config).filter(models.Config.id == run.config_id).first()
+    if not cfg:
+        raise HTTPException(status_code=404, detail="Config not found")
+
+    symbols = [symbol] if symbol else [s.strip() for s in cfg.symbols_csv.split(",") if s.strip()]
+    cacheable = run.status == "completed"
+    key = lambda sym: (_data_run_id(run), window, sym)
+    out = {sym: rolling_cache.get(key(sym)) for sym in symbols} if cacheable else {sym: None for sym in symbols}
+
+    missing = [sym for sym, v in out.items() if v is None]
+    if missing:
+        ann = annualization_factor(cfg.market, cfg.interval)
+        rf = float(jsonio.loads(cfg.risk_json or "{}").get("risk_free_rate_annual", 0.0) or 0.0)
+        for sym, (ts, eq) in _run_curves(run, db, missing, None, None).items():
+            series = rolling_risk(ts, eq, window, ann, rf)
+            out[sym] = {"t": epoch_ms_to_iso(ts), **{k: v.tolist() for k, v in series.items()}}
+            if cacheable:
+                rolling_cache.set(key(sym), out[sym])
+
+    return FastJSONResponse({
+        "run_id": run.id,
+        "window": window,
+        "rolling": {sym: v for sym, v in out.items() if v is not None},
+    })
+
+@router.get("/compare")
+async def compare_runs(
+    ids: str = Query(..., description="comma-separated run ids; the first one is the baseline"),
+    points: int = Query(500, ge=10, le=5000),
+    symbol: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Aligns the runs' portfolio equity on a common time axis (as-of join over the period
+    all runs cover) and returns, bucketed to at most `points`, columnar series
+    {"t": [...], "return" | "spread" | "drawdown": {run_id: [...]}} plus a metrics diff
+    table against the baseline. symbol restricts every run to that symbol's curve.
+    """
+    try:
+        run_ids = list(dict.fromkeys(int(x) for x in ids.split(",") if x.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not 2 <= len(run_ids) <= MAX_COMPARE_RUNS:
+        raise HTTPException(status_code=400, detail=f"Compare between 2 and {MAX_COMPARE_RUNS} runs")
+    return await run_in(serialization_pool, _compare_runs, run_ids, points, symbol, start, end, db, user)
+
+def _compare_runs(
+    run_ids: list[int], points: int, symbol: Optional[str], start: Optional[str], end: Optional[str], db: Session, user
+) -> FastJSONResponse:
+    R = models.BacktestRun
+    runs = {r.id: r for r in db.query(R).filter(R.id.in_(run_ids), R.user_id == user.id).all()}
+    missing = [i for i in run_ids if i not in runs]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Runs not found: {missing}")
+    start_ms, end_ms = _parse_range(start, end)
+
+    baseline = run_ids[0]
+    curves = {
+        rid: portfolio_curve(_run_curves(runs[rid], db, [symbol] if symbol else None, start_ms, end_ms))
+        for rid in run_ids
+    }
+    aligned = align_runs(curves, baseline, points)
+
+    metrics = {}
+    for rid in run_ids:
+        m = jsonio.loads(runs[rid].metrics_json or "{}")
+        if symbol:
+            m = next((s for s in m.get("symbols", []) if s.get("symbol") == symbol), {})
+        metrics[rid] = {k: v for k, v in m.items() if k != "symbols"}
+
+    return FastJSONResponse({
+        "baseline_id": baseline,
+        "runs": [
+            {"id": r.id, "config_id": r.config_id, "status": r.status, "created_at": r.created_at.isoformat() if r.created_at else ""}
+            for r in (runs[i] for i in run_ids)
+        ],
+        "t": epoch_ms_to_iso(aligned["t"]),
+        "series": {
+            name: {str(rid): v for rid, v in aligned[name].items()}
+            for name in ("return", "spread", "drawdown")
+        },
+        "metrics": metrics_diff(metrics, baseline),
+    })
 
 @router.get("", response_model=list[BacktestRunListOut])
-def list_runs(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    runs = (
-        db.query(models.BacktestRun)
-        .filter(models.BacktestRun.user_id == user.id)
-        .order_by(models.BacktestRun.id.desc())
-        .limit(200)
-        .all()
-    )
+def list_runs(
+    request: Request,
+    response: Response,
+    limit: int = Query(200, ge=1, le=500),
+    sort: str = Query("id"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Keyset-paginated listing from the summary columns only (metrics_json is not loaded).
+    Pass the X-Next-Cursor response header back as ?cursor= for the next page.
+    Sorting by a metric skips runs that have no value for it.
+    """
+    if sort not in SUMMARY_SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {list(SUMMARY_SORT_COLUMNS)}")
+
+    R = models.BacktestRun
+    col = getattr(R, sort)
+    desc = order == "desc"
+
+    q = db.query(
+        R.id, R.status, R.config_id, R.created_at,
+        R.avg_total_return, R.avg_sharpe, R.avg_max_drawdown, R.num_trades, R.run_type,
+    ).filter(R.user_id == user.id)
+    if sort != "id":
+        q = q.filter(col.isnot(None))
+
+    if cursor:
+        try:
+            if sort == "id":
+                cur_id = int(cursor)
+            else:
+                raw_val, raw_id = cursor.rsplit(":", 1)
+                cur_val, cur_id = (int(raw_val) if sort == "num_trades" else float(raw_val)), int(raw_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if sort == "id":
+            q = q.filter(R.id < cur_id if desc else R.id > cur_id)
+        elif desc:
+            q = q.filter(or_(col < cur_val, and_(col == cur_val, R.id < cur_id)))
+        else:
+            q = q.filter(or_(col > cur_val, and_(col == cur_val, R.id > cur_id)))
+
+    if sort == "id":
+        q = q.order_by(R.id.desc() if desc else R.id.asc())
+    else:
+        q = q.order_by(*((col.desc(), R.id.desc()) if desc else (col.asc(), R.id.asc())))
+
+    rows = q.limit(limit).all()
+    if len(rows) == limit:
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = str(last.id) if sort == "id" else f"{getattr(last, sort)!r}:{last.id}"
+
     out = []
-    for r in runs:
+    for r in rows:
+        metrics = {
+            k: getattr(r, k)
+            for k in ("avg_total_return", "avg_sharpe", "avg_max_drawdown", "num_trades")
+            if getattr(r, k) is not None
+        }
         out.append({
             "id": r.id,
             "status": r.status,
             "config_id": r.config_id,
             "created_at": r.created_at.isoformat() if r.created_at else "",
-            "metrics": json.loads(r.metrics_json) if r.metrics_json else {},
+            "metrics": metrics,
+            "run_type": r.run_type or "backtest",
+            "events_url": (
+                stream_url(request, "backtest_events", user.id, run_id=r.id)
+                if r.status in ("queued", "running") and r.run_type is None else None
+            ),
         })
     return out
 
 @router.get("/{run_id}/ohlcv")
-def get_ohlcv_for_run(
+async def get_ohlcv_for_run(
     run_id: int,
     symbol: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    format: str = Query("records", pattern="^(records|columns)$"),
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
+    """
+    Bars and indicators exactly as the run consumed them (stored snapshot), optionally
+    restricted to start / end (inclusive). format=columns returns {column: [values...]}
+    instead of one object per bar.
+    """
+    return await run_in(serialization_pool, _get_ohlcv_for_run, run_id, symbol, start, end, format, db, user)
+
+def _get_ohlcv_for_run(
+    run_id: int, symbol: str, start: Optional[str], end: Optional[str], format: str, db: Session, user
+) -> FastJSONResponse:
     run = db.query(models.BacktestRun).filter(
         models.BacktestRun.id == run_id,
         models.BacktestRun.user_id == user.id
     ).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
-
+    start_ms, end_ms = _parse_range(start, end)
+
+    if _data_archived(run, db):
+        snap = _archived(archived_snapshot, _data_run_id(run), symbol)
+    else:
+        snap = db.query(models.BarSnapshot.blob).filter(
+            models.BarSnapshot.run_id == _data_run_id(run),
+            models.BarSnapshot.symbol == symbol,
+        ).scalar()
+    if snap is not None:
+        frame = FrameBlob(snap).read(start_ms, end_ms)
+        ts = frame.pop("timestamp")
+        columns = {"timestamp": epoch_ms_to_iso(ts)}
+        columns.update({c: jsonio.column_values(pd.Series(v)) for c, v in frame.items()})
+    else:
+        columns = _recompute_ohlcv(run, symbol, start_ms, end_ms, db)
+
+    ohlcv = columns if format == "columns" else jsonio.columns_to_records(columns)
+    return FastJSONResponse({"run_id": run.id, "symbol": symbol, "ohlcv": ohlcv})
+
+def _recompute_ohlcv(run: models.BacktestRun, symbol: str, start_ms, end_ms, db: Session) -> dict:
+    # runs stored (or archived) before bar snapshots existed: refetch and re-prepare
     cfg = db.query(models.Config).filter(models.Config.id == run.config_id).first()
     if not cfg:
         raise HTTPException(status_code=404, detail="Config not found")
 
-    provider = YFinanceDataProvider()
+    provider = get_data_provider()
     md = provider.get_ohlcv(symbol, cfg.start_date, cfg.end_date, interval=cfg.interval)
 
     params = json.loads(cfg.params_json)
     strat = get_strategy(cfg.strategy)
-    df = strat.prepare(md.df.copy(), params)
+    df = prepare_frame(strat, md.df.copy(), params, cfg.interval)
+    if start_ms is not None:
+        df = df[df["timestamp"] >= start_ms]
+    if end_ms is not None:
+        df = df[df["timestamp"] <= end_ms]
 
     cols = ["timestamp", "open", "high", "low", "close"]
     if "volume" in df.columns:
         cols.append("volume")
-    for c in ["sma_fast", "sma_slow", "rsi"]:
+    for c in ["sma_fast", "sma_slow", "rsi", "htf_sma_trend"]:
         if c in df.columns:
             cols.append(c)
 
-    out = df[cols].copy()
-    out["timestamp"] = out["timestamp"].apply(lambda x: pd.to_datetime(x).isoformat())
-
-    records = out.to_dict(orient="records")
-    records = _records_json_safe(records)
-
-    return {"run_id": run.id, "symbol": symbol, "ohlcv": records}
-
-    # print("Prepared OHLCV data for run_id=", run_id, "symbol=", symbol)
-    # print(out.head(5))
-
-    # print({"run_id": run.id, "symbol": symbol, "ohlcv": out.to_dict(orient="records")})
-
-    # return {"run_id": run.id, "symbol": symbol, "ohlcv": out.to_dict(orient="records")}
\ No newline at end of file
+    # NaN/Inf handled column-wise; timestamps converted in one bulk call
+    columns = {"timestamp": epoch_ms_to_iso(df["timestamp"].to_numpy())}
+    columns.update(jsonio.frame_columns(df[cols[1:]]))
+    return columns
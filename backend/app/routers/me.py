@@ -1,9 +1,34 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.db import models
 from app.routers._deps import get_current_user
-from app.db.schemas import MeOut
+from app.db.schemas import MeOut, RetentionPolicyIn, RetentionPolicyOut
+from app.services.retention import effective_policy
 
 router = APIRouter(prefix="", tags=["me"])
 
 @router.get("/me", response_model=MeOut)
 def me(user=Depends(get_current_user)):
-    return MeOut(id=user.id, email=user.email, is_admin=user.is_admin)
\ No newline at end of file
+    return MeOut(id=user.id, email=user.email, is_admin=user.is_admin)
+
+def _policy_out(u: models.User) -> RetentionPolicyOut:
+    keep_runs, keep_days = effective_policy(u)
+    return RetentionPolicyOut(
+        keep_runs=u.retention_keep_runs, keep_days=u.retention_keep_days,
+        effective_keep_runs=keep_runs, effective_keep_days=keep_days,
+    )
+
+@router.get("/me/retention", response_model=RetentionPolicyOut)
+def get_retention(db: Session = Depends(get_db), user=Depends(get_current_user)):
+    return _policy_out(db.get(models.User, user.id))
+
+@router.put("/me/retention", response_model=RetentionPolicyOut)
+def set_retention(payload: RetentionPolicyIn, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """Runs outside both windows (newest keep_runs, last keep_days) get archived by the next retention pass."""
+    u = db.get(models.User, user.id)
+    u.retention_keep_runs = payload.keep_runs
+    u.retention_keep_days = payload.keep_days
+    db.commit()
+    return _policy_out(u)
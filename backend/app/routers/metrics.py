@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.db.session import get_db
+from app.db import models, models_agent
+
+router = APIRouter(tags=["metrics"])
+
+_jobs = metrics.gauge("jobs", "Backtest / agent runs by status (running and queued only)")
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(db: Session = Depends(get_db)):
+    """Prometheus text exposition of this worker's metrics (each uvicorn worker reports its own)."""
+    for kind, model in (("backtest", models.BacktestRun), ("agent", models_agent.AgentRun)):
+        counts = dict(
+            db.query(model.status, func.count(model.id))
+            .filter(model.status.in_(("running", "queued")))
+            .group_by(model.status)
+            .all()
+        )
+        for status in ("running", "queued"):
+            _jobs.set(counts.get(status, 0), kind=kind, status=status)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,88 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.db import models
+from app.db.schemas import PaperSessionIn
+from app.routers._deps import get_current_user
+from app.core.jsonio import FastJSONResponse
+from app.services.data_provider import get_data_provider
+from app.services.paper import (
+    PaperSession, ReplayFeed, check_config, create_paper_run, get_session, list_sessions, series_key, stored_session_summary,
+)
+
+router = APIRouter(prefix="/paper", tags=["paper"])
+
+@router.post("/sessions")
+async def start_session(payload: PaperSessionIn, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """
+    Replays the configs' stored bars through the paper-trading engine at `speed` x real
+    time. Each config gets a BacktestRun with run_type="paper" whose trades and equity
+    use the usual /backtests endpoints; poll GET /paper/sessions/{id} for progress and
+    per-bar decision latency.
+    """
+    config_ids = list(dict.fromkeys(payload.config_ids))
+    session = await run_in_threadpool(_build_session, config_ids, payload.speed, db, user)
+    session.start()
+    return FastJSONResponse(session.summary())
+
+def _build_session(config_ids: List[int], speed: float, db: Session, user) -> PaperSession:
+    cfgs = {
+        c.id: c for c in
+        db.query(models.Config).filter(models.Config.id.in_(config_ids), models.Config.user_id == user.id).all()
+    }
+    missing = [i for i in config_ids if i not in cfgs]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Configs not found: {missing}")
+    try:
+        for cfg in cfgs.values():
+            check_config(cfg)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # one replayed series per distinct (symbol, interval, range); configs sharing one share its indicators
+    keys = {series_key(sym, cfg) for cfg in cfgs.values() for sym in (x.strip() for x in cfg.symbols_csv.split(",")) if sym}
+    provider = get_data_provider()
+    bars = {k: provider.get_ohlcv(k[0], k[2], k[3], interval=k[1]).df for k in keys}
+
+    session = PaperSession(user.id, ReplayFeed(bars, speed=speed))
+    for cid in config_ids:
+        session.add_config(create_paper_run(db, cfgs[cid], user.id, session.id).id, cfgs[cid])
+    return session
+
+def _owned(session_id: str, user, db: Session) -> PaperSession:
+    session = get_session(session_id)
+    if session is not None and session.user_id == user.id:
+        return session
+    # sessions live in the process that started them: another worker's (or a dead
+    # process's) session is only known through its runs
+    if stored_session_summary(db, session_id, user.id) is not None:
+        raise HTTPException(status_code=409, detail="Session is not running in this worker process")
+    raise HTTPException(status_code=404, detail="Session not found")
+
+@router.get("/sessions")
+def list_paper_sessions(user=Depends(get_current_user)):
+    return FastJSONResponse([
+        {k: v for k, v in s.summary().items() if k not in ("equity", "latency")}
+        for s in list_sessions(user.id)
+    ])
+
+@router.get("/sessions/{session_id}")
+def get_paper_session(session_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """Live progress from the process running the session; elsewhere, the state of its runs."""
+    session = get_session(session_id)
+    if session is not None and session.user_id == user.id:
+        return FastJSONResponse(session.summary())
+    stored = stored_session_summary(db, session_id, user.id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return FastJSONResponse(stored)
+
+@router.post("/sessions/{session_id}/stop")
+def stop_paper_session(session_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """Stops after the current tick; the runs are finalized with what was traded so far."""
+    session = _owned(session_id, user, db)
+    session.stop()
+    return FastJSONResponse(session.summary())
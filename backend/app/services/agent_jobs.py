@@ -0,0 +1,159 @@
+import json
+from concurrent.futures import as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core import jsonio
+from app.db import models, models_agent
+from app.core.executors import report_pool, submit
+from app.services.agent_runner import ToolMemo, build_agent, gather_tool_results, generate_report, plan_indicators
+from app.services.progress import open_channel, get_channel
+
+EMPTY_REPORT_ERROR = "Agent produced empty recommendations."
+
+
+class EmptyReportError(RuntimeError):
+    pass
+
+
+def progress_key(agent_run_id: int) -> str:
+    return f"agent:{agent_run_id}"
+
+
+def create_agent_run(db: Session, cfg: models.Config, user_id: int, status: str = "running") -> models_agent.AgentRun:
+    """
+    Insert the agent run row up front so clients can follow its progress. status="queued"
+    leaves it to a job worker (app.services.job_queue); such a run gets no channel
+    here, since the worker publishes in its own process and /events polls the row.
+    """
+    agent_run = models_agent.AgentRun(
+        user_id=user_id,
+        config_id=cfg.id,
+        status=status,
+        input_json=json.dumps({
+            "symbols": [s.strip() for s in cfg.symbols_csv.split(",") if s.strip()],
+            "market": cfg.market,
+            "interval": cfg.interval,
+            "start_date": cfg.start_date,
+            "end_date": cfg.end_date,
+            "strategy": cfg.strategy,
+            "params": json.loads(cfg.params_json),
+            "risk": json.loads(cfg.risk_json),
+        }),
+    )
+    db.add(agent_run)
+    db.commit()
+    db.refresh(agent_run)
+    if status != "queued":
+        open_channel(progress_key(agent_run.id)).publish(
+            {"type": "status", "agent_run_id": agent_run.id, "status": status}
+        )
+    return agent_run
+
+
+def _publisher(agent_run_id: int) -> Callable[[Dict[str, Any]], None]:
+    ch = get_channel(progress_key(agent_run_id)) or open_channel(progress_key(agent_run_id))
+
+    def publish(event: Dict[str, Any]) -> None:
+        ch.publish({**event, "agent_run_id": agent_run_id})
+    return publish
+
+
+def _inputs(agent_run: models_agent.AgentRun) -> Dict[str, Any]:
+    return {"run_id": agent_run.id, "config_id": agent_run.config_id, **jsonio.loads(agent_run.input_json)}
+
+
+def _complete(db: Session, agent_run: models_agent.AgentRun, report_json: Dict[str, Any], trace_json: Dict[str, Any]) -> None:
+    recs = report_json.get("recommendations", [])
+    if not isinstance(recs, list) or len(recs) == 0:
+        raise EmptyReportError(EMPTY_REPORT_ERROR)
+    agent_run.status = "completed"
+    agent_run.output_json = jsonio.dumps(report_json)
+    agent_run.summary = report_json.get("summary") or ""
+    agent_run.trace_json = jsonio.dumps(trace_json)
+    db.commit()
+
+
+def _fail(db: Session, agent_run: models_agent.AgentRun, e: Exception, trace_json: Optional[Dict[str, Any]], publish) -> None:
+    db.rollback()
+    agent_run.status = "failed"
+    agent_run.error = str(e)
+    if trace_json is not None:
+        agent_run.trace_json = jsonio.dumps(trace_json)
+    db.commit()
+    publish({"type": "failed", "error": str(e)})
+
+
+def execute_agent_run(db: Session, agent_run_id: int, model: str = "gpt-4.1-mini") -> Dict[str, Any]:
+    """
+    Run the agent for a row created by create_agent_run and return its report.
+    Publishes progress events; marks the run failed (and re-raises) on error.
+    """
+    publish = _publisher(agent_run_id)
+    agent_run = db.query(models_agent.AgentRun).filter(models_agent.AgentRun.id == agent_run_id).first()
+    agent = build_agent(model=model)
+    trace_json: Optional[Dict[str, Any]] = None
+    try:
+        inputs = _inputs(agent_run)
+        per_symbol, trace_json = gather_tool_results(agent, inputs, publish)
+        report_json = generate_report(agent, inputs, per_symbol, trace_json, model, publish)
+        _complete(db, agent_run, report_json, trace_json)
+    except Exception as e:
+        _fail(db, agent_run, e, trace_json, publish)
+        raise
+
+    publish({"type": "completed", "percent": 100.0, "result": report_json})
+    return report_json
+
+
+def execute_agent_batch(db: Session, agent_run_ids: List[int], model: str = "gpt-4.1-mini") -> Dict[str, Any]:
+    """
+    Run many agent rows as one batch: the tool phase goes config by config through one
+    shared ToolMemo, so every (symbol, range, interval) is fetched once and every
+    identical backtest runs once; the report calls then run concurrently on report_pool.
+    Before that, each bar frame's indicators are computed once from the plan of every
+    config's declarations. Each row still completes or fails on its own.
+    """
+    memo = ToolMemo()
+    agent = build_agent(model=model, memo=memo)
+    rows = {r.id: r for r in db.query(models_agent.AgentRun).filter(models_agent.AgentRun.id.in_(agent_run_ids)).all()}
+    batch = {}
+    for rid in agent_run_ids:
+        try:
+            batch[rid] = _inputs(rows[rid])
+        except ValueError:
+            pass  # failed below, with the row's other errors
+    plan_indicators(agent, list(batch.values()))
+
+    futures = {}
+    for rid in agent_run_ids:
+        agent_run, publish = rows[rid], _publisher(rid)
+        trace_json: Optional[Dict[str, Any]] = None
+        try:
+            inputs = batch[rid] if rid in batch else _inputs(agent_run)
+            per_symbol, trace_json = gather_tool_results(agent, inputs, publish)
+        except Exception as e:
+            _fail(db, agent_run, e, trace_json, publish)
+            continue
+        fut = submit(report_pool, generate_report, agent, inputs, per_symbol, trace_json, model, publish)
+        futures[fut] = (agent_run, trace_json, publish)
+
+    # DB writes stay on this thread: the session is not shared with the report threads
+    for fut in as_completed(futures):
+        agent_run, trace_json, publish = futures[fut]
+        try:
+            report_json = fut.result()
+            _complete(db, agent_run, report_json, trace_json)
+        except Exception as e:
+            _fail(db, agent_run, e, trace_json, publish)
+            continue
+        publish({"type": "completed", "percent": 100.0, "result": report_json})
+
+    return {
+        "runs": [
+            {"id": rid, "config_id": rows[rid].config_id, "status": rows[rid].status, "error": rows[rid].error}
+            for rid in agent_run_ids
+        ],
+        "tool_memo": memo.stats(),
+    }
@@ -0,0 +1,111 @@
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+# Compaction of the report payload sent to the LLM: project metrics to what an
+# AgentReport cites, round numbers, hoist values every symbol shares, and keep the
+# prompt under a token budget by summarizing the least informative symbols.
+
+# metrics the report cites as evidence; everything else in the backtest metrics is dropped
+REPORT_METRICS = (
+    "total_return", "cagr", "sharpe", "sortino", "max_drawdown", "volatility",
+    "num_trades", "round_trips", "win_rate", "profit_factor", "final_equity",
+)
+# what a summarized (over-budget) symbol keeps
+SUMMARY_METRICS = ("total_return", "sharpe", "max_drawdown", "num_trades")
+SIGNIFICANT_DIGITS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token; close enough for budgeting and needs no tokenizer download."""
+    return math.ceil(len(text) / 4)
+
+
+def payload_text(payload: Dict[str, Any]) -> str:
+    """The exact text sent as the human message."""
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _round(v: Any) -> Any:
+    if isinstance(v, float):
+        if not math.isfinite(v):
+            return None
+        return float(f"{v:.{SIGNIFICANT_DIGITS}g}")
+    if isinstance(v, dict):
+        return {k: _round(x) for k, x in v.items()}
+    if isinstance(v, list):
+        return [_round(x) for x in v]
+    return v
+
+
+def _columnar(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    cols: Dict[str, List[Any]] = {}
+    for r in rows:
+        for k in r:
+            cols.setdefault(k, [])
+    for r in rows:
+        for k in cols:
+            cols[k].append(r.get(k))
+    return cols
+
+
+def _priority(block: Dict[str, Any]) -> float:
+    # strongest evidence first: large |sharpe|, then large |total_return|
+    m = block["backtest"]["metrics"]
+    return abs(m.get("sharpe") or 0.0) + abs(m.get("total_return") or 0.0)
+
+
+def compact_payload(payload: Dict[str, Any], budget_tokens: Optional[int]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    {"inputs", "tool_results"} -> (compact payload, stats for the trace).
+    Per symbol the block keeps the same paths (backtest.metrics, ...), so the stub
+    model and the prompt read it unchanged. Indicator tails become columns and their
+    timestamps are hoisted to "shared" when all symbols have the same ones.
+    """
+    before = estimate_tokens(json.dumps(payload, ensure_ascii=False, default=str))  # previous prompt format
+    inputs = payload.get("inputs", {})
+
+    blocks: Dict[str, Dict[str, Any]] = {}
+    tails: Dict[str, Dict[str, List[Any]]] = {}
+    for sym, block in payload.get("tool_results", {}).items():
+        bt = block.get("backtest") or {}
+        metrics = bt.get("metrics") or {}
+        out_bt: Dict[str, Any] = {"metrics": _round({k: metrics[k] for k in REPORT_METRICS if k in metrics})}
+        if bt.get("last_trade"):
+            out_bt["last_trade"] = _round(bt["last_trade"])
+        if bt.get("equity_tail"):
+            out_bt["equity_tail"] = _round([p.get("equity") for p in bt["equity_tail"]])
+        blocks[sym] = {"backtest": out_bt}
+        tails[sym] = _columnar(block.get("indicators_tail") or [])
+
+    shared: Dict[str, Any] = {}
+    stamps = [t.get("timestamp") for t in tails.values()]
+    if len(stamps) > 1 and all(s == stamps[0] for s in stamps):
+        shared["indicator_timestamps"] = stamps[0]
+        for t in tails.values():
+            t.pop("timestamp", None)
+    for sym, t in tails.items():
+        if t:
+            blocks[sym]["indicators_tail"] = _round(t)
+
+    compact = {"inputs": inputs, "shared": shared, "tool_results": blocks}
+    tokens = estimate_tokens(payload_text(compact))
+
+    summarized: List[str] = []
+    if budget_tokens:
+        for sym in sorted(blocks, key=lambda s: _priority(blocks[s])):
+            if tokens <= budget_tokens:
+                break
+            m = blocks[sym]["backtest"]["metrics"]
+            blocks[sym] = {"backtest": {"metrics": {k: m[k] for k in SUMMARY_METRICS if k in m}}, "summarized": True}
+            summarized.append(sym)
+            tokens = estimate_tokens(payload_text(compact))
+
+    stats = {
+        "before": before,
+        "after": tokens,
+        "budget": budget_tokens,
+        "summarized": summarized,
+        "over_budget": bool(budget_tokens) and tokens > budget_tokens,
+    }
+    return compact, stats
@@ -1,17 +1,31 @@
+import copy
 import json
-from typing import Any, Dict, List, Tuple
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import pandas as pd
 
-from langchain_openai import ChatOpenAI
-from langchain_core.tools import tool
-from langchain_core.messages import SystemMessage
-from langchain_core.runnables import RunnableLambda
-
-from app.services.yfinance_provider import YFinanceDataProvider
-from app.services.backtester import run_backtest_for_symbol
-from app.services.strategies import get_strategy
+from app.core.cache import TTLCache, register_cache
+from app.core.config import settings
+from app.services.data_provider import get_data_provider
+from app.services.backtester import run_backtest_for_symbol, aggregate_metrics
+from app.services.strategies import get_strategy, prepare_frame
+from app.services.indicators import IndicatorCache, build_plan
 from app.services.agent_schemas import AgentReport
-from langchain_core.messages import SystemMessage, HumanMessage
+from app.services.agent_payload import compact_payload, payload_text
+from app.services.agent_stub import stub_report
+from app.services.result_cache import report_cache_key
+from app.services.timeutils import epoch_ms_to_iso
+
+# langchain (and langchain_openai -> openai) are imported inside build_agent: they
+# cost about a second and ~60 MB per process, paid only by workers that run agents
+
+# finished reports by payload hash; process-local like the other caches
+report_cache = register_cache(TTLCache(
+    maxsize=settings.report_cache_size,
+    ttl_seconds=settings.report_cache_ttl_seconds,
+    name="agent_reports",
+))
 
 def _df_tail_snapshot(df: pd.DataFrame, cols: List[str], n: int = 5) -> List[Dict[str, Any]]:
     cols = [c for c in cols if c in df.columns]
@@ -20,18 +34,72 @@ def _df_tail_snapshot(df: pd.DataFrame, cols: List[str], n: int = 5) -> List[Dic
     tail = tail.where(pd.notnull(tail), None)
     return tail.to_dict(orient="records")
 
-def build_agent(model: str = "gpt-4.1-mini", temperature: float = 0.0):
-    llm = ChatOpenAI(model=model, temperature=temperature)
+class ToolMemo:
+    """
+    Tool results keyed by their arguments, shared by every run of a batch (or the
+    tool calls of a single run), so identical fetches and backtests happen once.
+    A caller that asks for a key still being computed waits for that computation.
+    """
+    def __init__(self):
+        self._data: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Tuple, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            fut = self._data.get(key)
+            owner = fut is None
+            if owner:
+                self.misses += 1
+                fut = self._data[key] = Future()
+            else:
+                self.hits += 1
+        if not owner:
+            return fut.result()
+        try:
+            value = fn()
+        except BaseException as e:
+            # failures are not memoized: waiters get the error, later callers retry
+            with self._lock:
+                del self._data[key]
+            fut.set_exception(e)
+            raise
+        fut.set_result(value)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+def build_agent(model: str = "gpt-4.1-mini", temperature: float = 0.0, memo: Optional[ToolMemo] = None):
+    from langchain_core.tools import tool
+    from langchain_core.messages import SystemMessage, HumanMessage
+    from langchain_core.runnables import RunnableLambda
+
+    memo = memo or ToolMemo()
+
+    def bars(symbol: str, start_date: str, end_date: str, interval: str) -> pd.DataFrame:
+        # shared frame: callers that modify it (prepare adds columns) must copy
+        return memo.get_or_compute(
+            ("bars", symbol, start_date, end_date, interval),
+            lambda: get_data_provider().get_ohlcv(symbol, start_date, end_date, interval=interval).df,
+        )
+
+    def indicator_cache(symbol: str, start_date: str, end_date: str, interval: str) -> IndicatorCache:
+        # one per bar frame: indicators and backtests of every config over it share each column
+        return memo.get_or_compute(
+            ("indicator_cache", symbol, start_date, end_date, interval),
+            lambda: IndicatorCache(bars(symbol, start_date, end_date, interval)),
+        )
 
     # ---- Tools ----
 
     @tool
     def fetch_ohlcv(symbol: str, start_date: str, end_date: str, interval: str) -> Dict[str, Any]:
         """Fetch OHLCV data for a symbol."""
-        provider = YFinanceDataProvider()
-        md = provider.get_ohlcv(symbol, start_date, end_date, interval=interval)
-        df = md.df.copy()
-        df["timestamp"] = pd.to_datetime(df["timestamp"]).astype(str)
+        df = bars(symbol, start_date, end_date, interval).copy()
+        df["timestamp"] = epoch_ms_to_iso(df["timestamp"].to_numpy())
         return {
             "symbol": symbol,
             "rows": int(len(df)),
@@ -42,52 +110,63 @@ def build_agent(model: str = "gpt-4.1-mini", temperature: float = 0.0):
     @tool
     def compute_indicators(symbol: str, start_date: str, end_date: str, interval: str, strategy: str, params_json: str) -> Dict[str, Any]:
         """Compute indicators by applying strategy.prepare to OHLCV."""
-        provider = YFinanceDataProvider()
-        md = provider.get_ohlcv(symbol, start_date, end_date, interval=interval)
-        df = md.df.copy()
-        params = json.loads(params_json)
-        strat = get_strategy(strategy)
-        df2 = strat.prepare(df, params)
-        df2["timestamp"] = pd.to_datetime(df2["timestamp"]).astype(str)
-        cols = ["timestamp","close","sma_fast","sma_slow","rsi"]
-        return {
-            "symbol": symbol,
-            "rows": int(len(df2)),
-            "tail": _df_tail_snapshot(df2, cols, n=8),
-        }
+        def compute():
+            df = bars(symbol, start_date, end_date, interval).copy()
+            params = json.loads(params_json)
+            strat = get_strategy(strategy)
+            df2 = prepare_frame(strat, df, params, interval, indicator_cache(symbol, start_date, end_date, interval))
+            df2["timestamp"] = epoch_ms_to_iso(df2["timestamp"].to_numpy())
+            cols = ["timestamp","close","sma_fast","sma_slow","rsi","htf_sma_trend"]
+            return {
+                "symbol": symbol,
+                "rows": int(len(df2)),
+                "tail": _df_tail_snapshot(df2, cols, n=8),
+            }
+        return memo.get_or_compute(("indicators", symbol, start_date, end_date, interval, strategy, params_json), compute)
 
     @tool
     def run_backtest(symbol: str, start_date: str, end_date: str, interval: str, market: str, strategy: str, params_json: str, risk_json: str) -> Dict[str, Any]:
         """Run backtest and return compact metrics and last signals."""
-        provider = YFinanceDataProvider()
-        md = provider.get_ohlcv(symbol, start_date, end_date, interval=interval)
-        params = json.loads(params_json)
-        risk = json.loads(risk_json)
-        metrics, trades, equity_curve = run_backtest_for_symbol(
-            symbol, md.df, strategy, params, risk, market=market, interval=interval
-        )
+        def compute():
+            df = bars(symbol, start_date, end_date, interval).copy()
+            params = json.loads(params_json)
+            risk = json.loads(risk_json)
+            metrics, trades, equity_curve = run_backtest_for_symbol(
+                symbol, df, strategy, params, risk, market=market, interval=interval,
+                curve_points=5,  # only the tail is reported
+                indicators=indicator_cache(symbol, start_date, end_date, interval),
+            )
 
-        # Compact summary
-        sells = [t for t in trades if getattr(t, "side", "") == "SELL"]
-        last_trade = None
-        if trades:
-            t = trades[-1]
-            last_trade = {
-                "timestamp": t.timestamp,
-                "side": t.side,
-                "price": float(t.price),
-                "qty": float(t.qty),
-                "pnl": float(getattr(t, "pnl", 0.0)),
-            }
+            # Compact summary
+            sells = [t for t in trades if getattr(t, "side", "") == "SELL"]
+            last_trade = None
+            if trades:
+                t = trades[-1]
+                last_trade = {
+                    "timestamp": epoch_ms_to_iso([t.timestamp])[0],
+                    "side": t.side,
+                    "price": float(t.price),
+                    "qty": float(t.qty),
+                    "pnl": float(getattr(t, "pnl", 0.0)),
+                }
 
-        return {
-            "symbol": symbol,
-            "metrics": metrics,
-            "num_trades": len(trades),
-            "round_trips": len(sells),
-            "last_trade": last_trade,
-            "equity_tail": equity_curve[-5:] if len(equity_curve) >= 5 else equity_curve,
-        }
+            tail = equity_curve[-5:]
+            equity_tail = [
+                {"t": t, "equity": p["equity"]}
+                for t, p in zip(epoch_ms_to_iso([p["t"] for p in tail]), tail)
+            ]
+
+            return {
+                "symbol": symbol,
+                "metrics": metrics,
+                "num_trades": len(trades),
+                "round_trips": len(sells),
+                "last_trade": last_trade,
+                "equity_tail": equity_tail,
+            }
+        return memo.get_or_compute(
+            ("backtest", symbol, start_date, end_date, interval, market, strategy, params_json, risk_json), compute
+        )
 
     # ---- Orchestrator prompt ----
     system = SystemMessage(content=
@@ -96,6 +175,8 @@ def build_agent(model: str = "gpt-4.1-mini", temperature: float = 0.0):
         "EvidencePoint.value MUST be a JSON scalar (string/number/bool/null). Put any complex detail in EvidencePoint.note as text.\n"
         "Focus on: recommendation (BUY/SELL/HOLD), confidence, evidence (metrics, last indicator state), risks, next steps.\n"
         "Avoid claiming future returns; speak conditionally.\n"
+        "shared.indicator_timestamps (when present) are the timestamps of every symbol's indicators_tail columns. "
+        "Symbols marked summarized only carry headline metrics.\n"
     )
 
     # # We'll orchestrate ourselves (deterministic calls) and ask LLM only to *write the report* from tool results.
@@ -111,13 +192,19 @@ def build_agent(model: str = "gpt-4.1-mini", temperature: float = 0.0):
         # payload is a dict with keys: inputs, tool_results
         return [
             system,
-            HumanMessage(content=json.dumps(payload, ensure_ascii=False)),
+            HumanMessage(content=payload_text(payload)),
         ]
 
-    report_chain = (
-        RunnableLambda(to_messages)
-        | llm.with_structured_output(AgentReport)
-    )
+    if settings.llm_provider == "stub":
+        # offline / load testing: deterministic report straight from the payload
+        report_chain = RunnableLambda(stub_report)
+    else:
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(model=model, temperature=temperature)
+        report_chain = (
+            RunnableLambda(to_messages)
+            | llm.with_structured_output(AgentReport)
+        )
 
     return {
         "tools": {
@@ -125,6 +212,8 @@ def build_agent(model: str = "gpt-4.1-mini", temperature: float = 0.0):
             "compute_indicators": compute_indicators,
             "run_backtest": run_backtest,
         },
+        "memo": memo,
+        "indicator_cache": indicator_cache,
         "system": system,
         "report_chain": report_chain,
     }
@@ -141,64 +230,138 @@ def run_agent_v1(
     params: Dict[str, Any],
     risk: Dict[str, Any],
     model: str = "gpt-4.1-mini",
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    memo: Optional[ToolMemo] = None,
 ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """
     Returns: (report_json, trace_json)
+    progress (optional) receives a "tool" event per tool call, "symbol_done" per symbol
+    and a "report" event before the LLM call. memo shares tool results across runs.
+    """
+    agent = build_agent(model=model, memo=memo)
+    inputs = {
+        "run_id": run_id,
+        "config_id": config_id,
+        "symbols": symbols,
+        "market": market,
+        "interval": interval,
+        "start_date": start_date,
+        "end_date": end_date,
+        "strategy": strategy,
+        "params": params,
+        "risk": risk,
+    }
+    per_symbol, trace = gather_tool_results(agent, inputs, progress)
+    report_json = generate_report(agent, inputs, per_symbol, trace, model, progress)
+    return report_json, trace
+
+def plan_indicators(agent: Dict[str, Any], batch: List[Dict[str, Any]]) -> Dict[Tuple, int]:
     """
-    agent = build_agent(model=model)
+    Computes, per (symbol, range, interval) of a batch, the deduplicated plan of every
+    config's declared indicators into the shared IndicatorCache, before the tool phase
+    reads them. Returns the number of distinct specs per bar frame.
+    """
+    declared: Dict[Tuple, List[Dict[str, Any]]] = {}
+    for inputs in batch:
+        try:
+            decl = get_strategy(inputs["strategy"]).indicators(inputs["params"])
+        except Exception:
+            continue  # the run's own tool phase reports the bad config
+        for sym in inputs["symbols"]:
+            key = (sym, inputs["start_date"], inputs["end_date"], inputs["interval"])
+            declared.setdefault(key, []).append(decl)
+
+    sizes = {}
+    for key, decls in declared.items():
+        plan = build_plan(decls)
+        try:
+            agent["indicator_cache"](*key).compute(plan)
+        except Exception:
+            continue  # e.g. no bars for the symbol: left to the runs that need it to fail
+        sizes[key] = len(plan)
+    return sizes
+
+def gather_tool_results(
+    agent: Dict[str, Any],
+    inputs: Dict[str, Any],
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Tool phase: indicators + backtest per symbol. Returns (tool_results, trace)."""
+    publish = progress or (lambda event: None)
     tools = agent["tools"]
+    symbols = inputs["symbols"]
+    n = max(len(symbols), 1)
+    done_metrics: List[Dict[str, Any]] = []
 
     trace: Dict[str, Any] = {"tool_calls": [], "per_symbol": {}}
     per_symbol = {}
 
-    params_json = json.dumps(params)
-    risk_json = json.dumps(risk)
+    # canonical, so equal params/risk share memoized tool results
+    params_json = json.dumps(inputs["params"], sort_keys=True)
+    risk_json = json.dumps(inputs["risk"], sort_keys=True)
+    rng = {"start_date": inputs["start_date"], "end_date": inputs["end_date"], "interval": inputs["interval"]}
 
-    for sym in symbols:
+    for k, sym in enumerate(symbols):
         sym_block = {"symbol": sym}
 
         ind = tools["compute_indicators"].invoke({
-            "symbol": sym, "start_date": start_date, "end_date": end_date,
-            "interval": interval, "strategy": strategy, "params_json": params_json
+            "symbol": sym, **rng, "strategy": inputs["strategy"], "params_json": params_json
         })
         trace["tool_calls"].append({"tool": "compute_indicators", "symbol": sym})
+        publish({"type": "tool", "tool": "compute_indicators", "symbol": sym, "percent": 90.0 * (k + 0.5) / n})
         sym_block["indicators_tail"] = ind.get("tail", [])
 
         bt = tools["run_backtest"].invoke({
-            "symbol": sym, "start_date": start_date, "end_date": end_date,
-            "interval": interval, "market": market,
-            "strategy": strategy, "params_json": params_json, "risk_json": risk_json
+            "symbol": sym, **rng, "market": inputs["market"],
+            "strategy": inputs["strategy"], "params_json": params_json, "risk_json": risk_json
         })
         trace["tool_calls"].append({"tool": "run_backtest", "symbol": sym})
         sym_block["backtest"] = bt
 
         per_symbol[sym] = sym_block
         trace["per_symbol"][sym] = {"metrics": bt.get("metrics", {}), "ind_tail": sym_block["indicators_tail"]}
+        done_metrics.append(bt.get("metrics", {}))
+        partial = aggregate_metrics(done_metrics)
+        partial.pop("symbols", None)
+        publish({
+            "type": "symbol_done", "symbol": sym, "metrics": bt.get("metrics", {}), "partial": partial,
+            "symbols_done": k + 1, "symbols_total": len(symbols), "percent": 90.0 * (k + 1) / n,
+        })
 
-    inputs = {
-        "run_id": run_id,
-        "config_id": config_id,
-        "symbols": symbols,
-        "market": market,
-        "interval": interval,
-        "start_date": start_date,
-        "end_date": end_date,
-        "strategy": strategy,
-        "params": params,
-        "risk": risk,
-    }
+    return per_symbol, trace
 
-    # Ask the LLM to produce a strict report from the tool results
-    #report = agent["report_chain"].invoke(inputs, tool_results=per_symbol)  # type: ignore
-    payload = {"inputs": inputs, "tool_results": per_symbol}
-    report = agent["report_chain"].invoke(payload)
+def generate_report(
+    agent: Dict[str, Any],
+    inputs: Dict[str, Any],
+    per_symbol: Dict[str, Any],
+    trace: Dict[str, Any],
+    model: str,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Report phase: compact the payload and ask the model (or the report cache). Updates trace."""
+    publish = progress or (lambda event: None)
+    payload, trace["payload_tokens"] = compact_payload(
+        {"inputs": inputs, "tool_results": per_symbol}, settings.agent_payload_token_budget
+    )
+    publish({"type": "report", "status": "generating", "percent": 90.0})
 
-    if hasattr(report, "model_dump"):
-        report_json = report.model_dump()
+    # identical payload + model -> reuse the earlier report (relabelled with this run's ids)
+    cache_key = report_cache_key(payload, model, settings.llm_provider)
+    cached = report_cache.get(cache_key)
+    if cached is not None:
+        report_json = {**copy.deepcopy(cached), "run_id": inputs["run_id"], "config_id": inputs["config_id"]}
+        trace["report_cache"] = "hit"
     else:
-        report_json = dict(report)
+        report = agent["report_chain"].invoke(payload)
+        if hasattr(report, "model_dump"):
+            report_json = report.model_dump()
+        else:
+            report_json = dict(report)
+        if report_json.get("recommendations"):
+            report_cache.set(cache_key, copy.deepcopy(report_json))
+        trace["report_cache"] = "miss"
 
     trace["model"] = model
     trace["inputs"] = inputs
 
-    return report_json, trace
\ No newline at end of file
+    return report_json
@@ -0,0 +1,50 @@
+import time
+from typing import Any, Dict
+
+from app.core.config import settings
+from app.services.agent_schemas import AgentReport, EvidencePoint, SymbolRecommendation
+
+def stub_report(payload: Dict[str, Any]) -> AgentReport:
+    """
+    Deterministic stand-in for the LLM report step (settings.llm_provider == "stub").
+    Derives a valid AgentReport purely from backtest metrics in the payload.
+    settings.llm_stub_latency_ms adds a fixed delay to mimic a model round trip.
+    """
+    if settings.llm_stub_latency_ms > 0:
+        time.sleep(settings.llm_stub_latency_ms / 1000.0)
+    inputs = payload.get("inputs", {})
+    tool_results = payload.get("tool_results", {})
+
+    recs = []
+    for sym, block in tool_results.items():
+        m = (block.get("backtest") or {}).get("metrics") or {}
+        total_return = float(m.get("total_return") or 0.0)
+        sharpe = float(m.get("sharpe") or 0.0)
+
+        if total_return > 0 and sharpe > 0:
+            action = "BUY"
+        elif total_return < 0 and sharpe < 0:
+            action = "SELL"
+        else:
+            action = "HOLD"
+
+        recs.append(SymbolRecommendation(
+            symbol=sym,
+            action=action,
+            confidence=min(1.0, abs(sharpe) / 3.0),
+            rationale=f"Backtest total return {total_return:.2%} with Sharpe {sharpe:.2f}.",
+            evidence=[
+                EvidencePoint(label="total_return", value=total_return),
+                EvidencePoint(label="sharpe", value=sharpe),
+                EvidencePoint(label="max_drawdown", value=float(m.get("max_drawdown") or 0.0)),
+            ],
+            risks=["Stub model output; not an LLM assessment."],
+            next_steps=["Re-run with a live model for a written analysis."],
+        ))
+
+    return AgentReport(
+        run_id=int(inputs.get("run_id", 0)),
+        config_id=int(inputs.get("config_id", 0)),
+        summary=f"Stub report for {len(recs)} symbol(s) using {inputs.get('strategy', 'unknown')}.",
+        recommendations=recs,
+    )
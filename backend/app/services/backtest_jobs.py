@@ -0,0 +1,225 @@
+import json
+import time
+from typing import Any, Callable, Dict
+
+from sqlalchemy.orm import Session
+
+from app.core import jsonio
+from app.core.config import settings
+from app.core.metrics import counter, gauge, histogram
+from app.db import models
+from app.services.backtester import run_backtest_for_symbol, aggregate_metrics
+from app.services.bar_store import encode_frame, snapshot_columns
+from app.services.data_provider import get_data_provider
+from app.services.equity_store import encode_curves
+from app.services.progress import open_channel, get_channel
+from app.services.result_cache import backtest_result_key
+from app.services.run_summary import backtest_summary_columns
+
+# fraction of percent_complete attributed to fetching bars; the rest is the backtest loop
+FETCH_WEIGHT = 0.1
+
+DATA_FETCH_SECONDS = histogram("data_fetch_seconds", "Market data fetch time per symbol")
+PHASE_SECONDS = histogram("backtest_phase_seconds", "Backtest time per phase (fetch, indicators, loop, metrics, db_write)")
+LOOP_BARS_PER_SECOND = gauge("backtest_loop_bars_per_second", "Bars per second of the most recent backtest loop")
+BARS_TOTAL = counter("backtest_bars_total", "Bars processed by backtest loops")
+RUNS_TOTAL = counter("backtest_runs_total", "Finished backtest runs by status")
+
+
+def progress_key(run_id: int) -> str:
+    return f"backtest:{run_id}"
+
+
+def headline(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Aggregate metrics without the per-symbol list (for progress events)."""
+    return {k: v for k, v in metrics.items() if k != "symbols"}
+
+
+def create_backtest_run(db: Session, cfg: models.Config, user_id: int, status: str = "running") -> models.BacktestRun:
+    """
+    Insert the run row up front so clients can follow its progress. status="queued"
+    leaves it to a job worker (app.services.job_queue); such a run gets no channel
+    here, since the worker publishes in its own process and /events polls the row.
+    """
+    run = models.BacktestRun(
+        user_id=user_id,
+        config_id=cfg.id,
+        status=status,
+        metrics_json="{}",
+        equity_json="{}",
+    )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    if status != "queued":
+        open_channel(progress_key(run.id)).publish({"type": "status", "run_id": run.id, "status": status})
+    return run
+
+
+def execute_backtest_run(db: Session, run_id: int) -> models.BacktestRun:
+    """
+    Fetch, (dedupe,) backtest and persist a run created by create_backtest_run.
+    Publishes progress events; marks the run failed (and re-raises) on error.
+    """
+    ch = get_channel(progress_key(run_id)) or open_channel(progress_key(run_id))
+    publish: Callable[[Dict[str, Any]], None] = ch.publish
+
+    run = db.query(models.BacktestRun).filter(models.BacktestRun.id == run_id).first()
+    try:
+        _execute(db, run, publish)
+    except Exception as e:
+        db.rollback()
+        run.status = "failed"
+        run.error = str(e)
+        db.commit()
+        RUNS_TOTAL.inc(status="failed")
+        publish({"type": "failed", "run_id": run_id, "error": str(e)})
+        raise
+    RUNS_TOTAL.inc(status="deduplicated" if run.source_run_id else "completed")
+
+    publish({
+        "type": "completed",
+        "run_id": run.id,
+        "percent": 100.0,
+        "result": {
+            "id": run.id,
+            "status": run.status,
+            "config_id": run.config_id,
+            "metrics": jsonio.loads(run.metrics_json),
+            "source_run_id": run.source_run_id,
+            "timings": jsonio.loads(run.timings_json) if run.timings_json else None,
+        },
+    })
+    return run
+
+
+def _record_timings(run: models.BacktestRun, timings: Dict[str, float]) -> None:
+    """Store the per-run phase timings and feed the /metrics histograms."""
+    for phase in ("fetch", "indicators", "loop", "metrics", "db_write"):
+        if phase in timings:
+            PHASE_SECONDS.observe(timings[phase], phase=phase)
+    bars = int(timings.get("bars", 0))
+    if bars and timings.get("loop"):
+        timings["bars_per_s"] = bars / timings["loop"]
+        LOOP_BARS_PER_SECOND.set(timings["bars_per_s"])
+        BARS_TOTAL.inc(bars)
+    run.timings_json = jsonio.dumps({k: (round(v, 6) if isinstance(v, float) else v) for k, v in timings.items()})
+
+
+def _execute(db: Session, run: models.BacktestRun, publish: Callable[[Dict[str, Any]], None]) -> None:
+    cfg = run.config
+    params = json.loads(cfg.params_json)
+    risk = json.loads(cfg.risk_json)
+    symbols = [s.strip() for s in cfg.symbols_csv.split(",") if s.strip()]
+    n = max(len(symbols), 1)
+
+    provider = get_data_provider()  # settings.data_provider: yfinance | csv | synthetic
+    timings: Dict[str, float] = {"fetch": 0.0}
+
+    bars = {}
+    for k, sym in enumerate(symbols, start=1):
+        t0 = time.perf_counter()
+        md = provider.get_ohlcv(sym, cfg.start_date, cfg.end_date, interval=cfg.interval)
+        dt = time.perf_counter() - t0
+        DATA_FETCH_SECONDS.observe(dt, provider=settings.data_provider)
+        timings["fetch"] += dt
+        bars[sym] = md.df
+        publish({
+            "type": "fetched", "run_id": run.id, "symbol": sym, "rows": int(len(md.df)),
+            "symbols_fetched": k, "symbols_total": len(symbols),
+            "percent": 100.0 * FETCH_WEIGHT * k / n,
+        })
+
+    # identical inputs (incl. the bars themselves) -> reference the earlier result, don't recompute
+    result_key = backtest_result_key(cfg.strategy, params, risk, cfg.market, cfg.interval, symbols, bars)
+    source = (
+        db.query(models.BacktestRun)
+        .filter(
+            models.BacktestRun.user_id == run.user_id,
+            models.BacktestRun.result_key == result_key,
+            models.BacktestRun.status == "completed",
+            models.BacktestRun.source_run_id.is_(None),
+            models.BacktestRun.id != run.id,
+        )
+        .order_by(models.BacktestRun.id.desc())
+        .first()
+    )
+    if source:
+        run.status = "completed"
+        run.metrics_json = source.metrics_json
+        run.avg_total_return = source.avg_total_return
+        run.avg_sharpe = source.avg_sharpe
+        run.avg_max_drawdown = source.avg_max_drawdown
+        run.num_trades = source.num_trades
+        run.result_key = result_key
+        run.source_run_id = source.id
+        _record_timings(run, timings)
+        db.commit()
+        return
+
+    per_symbol_metrics = []
+    all_trades = []
+    curves = {}  # symbol -> curve
+
+    snapshots = {}  # symbol -> (prepared frame, columns to keep)
+
+    for k, sym in enumerate(symbols):
+        raw_columns = list(bars[sym].columns)  # prepare() adds its indicators in place
+
+        def on_prepared(df, sym=sym, raw_columns=raw_columns):
+            snapshots[sym] = (df, snapshot_columns(raw_columns, df))
+
+        def on_bars(done: int, total: int, k=k, sym=sym):
+            frac = (k + (done / total if total else 1.0)) / n
+            publish({
+                "type": "progress", "run_id": run.id, "symbol": sym,
+                "bars_processed": done, "bars_total": total,
+                "percent": 100.0 * (FETCH_WEIGHT + (1.0 - FETCH_WEIGHT) * frac),
+            })
+
+        metrics, trades, curve = run_backtest_for_symbol(
+            sym, bars[sym], cfg.strategy, params, risk, market=cfg.market, interval=cfg.interval,
+            progress=on_bars, on_prepared=on_prepared, timings=timings,
+        )
+        per_symbol_metrics.append(metrics)
+        all_trades.extend(trades)
+        curves[sym] = curve
+        publish({
+            "type": "symbol_done", "run_id": run.id, "symbol": sym,
+            "metrics": metrics,
+            "partial": headline(aggregate_metrics(per_symbol_metrics)),
+            "symbols_done": k + 1, "symbols_total": len(symbols),
+        })
+
+    metrics = aggregate_metrics(per_symbol_metrics)
+
+    t_write = time.perf_counter()
+    run.status = "completed"
+    run.metrics_json = jsonio.dumps(metrics)
+    run.equity_blob = encode_curves(curves)
+    run.result_key = result_key
+    for col, v in backtest_summary_columns(metrics).items():
+        setattr(run, col, v)
+
+    # exact bars + indicators behind the charts, so they never refetch or drift from the run
+    for sym, (df, cols) in snapshots.items():
+        db.add(models.BarSnapshot(run_id=run.id, symbol=sym, n_bars=int(len(df)), blob=encode_frame(df, cols)))
+
+    # store trades
+    for t in all_trades:
+        db.add(models.Trade(
+            run_id=run.id,
+            symbol=t.symbol,
+            timestamp=t.timestamp,
+            side=t.side,
+            qty=t.qty,
+            price=t.price,
+            fee=t.fee,
+            slippage=t.slippage,
+            pnl=t.pnl,
+            decision_trace_json=jsonio.dumps(t.decision_trace),
+        ))
+    db.flush()
+    timings["db_write"] = time.perf_counter() - t_write
+    _record_timings(run, timings)
+    db.commit()
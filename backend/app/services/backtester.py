@@ -1,16 +1,22 @@
 import json
+import time
+from collections import deque
 from dataclasses import dataclass
 import signal
-from typing import Dict, Any, List, Tuple
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import numpy as np
 import pandas as pd
 
-from app.services.strategies import get_strategy
+from app.core.metrics import trace_log, verbose_tracing
+from app.services.indicators import IndicatorCache
+from app.services.online_metrics import EquityAccumulator, TradeAccumulator
+from app.services.strategies import get_strategy, prepare_frame
+from app.services.timeutils import MS_PER_YEAR
 
 @dataclass
 class TradeRecord:
     symbol: str
-    timestamp: str
+    timestamp: int  # epoch ms (UTC)
     side: str
     qty: float
     price: float
@@ -27,6 +33,11 @@ def run_backtest_for_symbol(
     risk: Dict[str, Any],
     market: str,
     interval: str,
+    progress: Optional[Callable[[int, int], None]] = None,
+    on_prepared: Optional[Callable[[pd.DataFrame], None]] = None,
+    curve_points: Optional[int] = None,
+    indicators: Optional[IndicatorCache] = None,
+    timings: Optional[Dict[str, float]] = None,
 ) -> Tuple[Dict[str, Any], List[TradeRecord], List[Dict[str, Any]]]:
     """
     Very simple, single-position, long-only backtest.
@@ -35,32 +46,69 @@ def run_backtest_for_symbol(
       - risk_fraction (fraction of equity to allocate on entry)
       - fee_bps
       - slippage_bps
+      - stop_loss_bps / take_profit_bps (from the entry price) and trailing_stop_bps
+        (from the highest high since entry): exits filled intrabar against low/high,
+        at the bar's open when it gaps through the level
+    progress: optional callback(bars_processed, bars_total), called ~20 times per symbol
+    on_prepared: optional callback receiving the frame after prepare_frame (bars + indicators,
+    including higher-timeframe ones)
+    curve_points: None returns the full equity curve; N keeps only its last N points
+    (metrics are accumulated online either way)
+    indicators: indicator cache over the same bars shared with other runs (see prepare_frame)
+    timings: optional dict; seconds spent in "indicators" / "loop" / "metrics" and the
+    "bars" processed are added to it
     """
+    t0 = time.perf_counter()
     strat = get_strategy(strategy_name)
-    df = strat.prepare(df, params)
+    df = prepare_frame(strat, df, params, interval, indicators)
+    t_prepared = time.perf_counter()
+    if on_prepared is not None:
+        on_prepared(df)
 
-    print("* Data after strategy preparation:")
-    print(df[['timestamp','close','sma_fast','sma_slow']].tail(5))
+    # per-bar tracing is decided once per run, so the loop pays nothing while it is off
+    trace = verbose_tracing()
+    if trace:
+        trace_log.debug("%s prepared %d bars, columns=%s\n%s", symbol, len(df), list(df.columns), df.tail(5))
 
     initial_cash = float(risk.get("initial_cash", 10_000))
     risk_fraction = float(risk.get("risk_fraction", 1.0))
     fee_bps = float(risk.get("fee_bps", 1.0))        # 1 bp = 0.01%
     slippage_bps = float(risk.get("slippage_bps", 2.0))
+    exits = ExitRules.from_risk(risk)
 
     cash = initial_cash
     qty = 0.0
     entry_price = None
     trades: List[TradeRecord] = []
-    equity_curve = []
+    equity_curve: Any = [] if curve_points is None else deque(maxlen=max(curve_points, 0))
+
+    rf_annual = float(risk.get("risk_free_rate_annual", 0.0) or 0.0)
+    ann = annualization_factor(market, interval)
+    eq_acc = EquityAccumulator(annualization=ann, risk_free_rate_annual=rf_annual)
+    tr_acc = TradeAccumulator()
+    equity = initial_cash
 
     state: Dict[str, Any] = {"position_qty": 0.0, "prev_sma_fast": None, "prev_sma_slow": None}
 
     cross_up = 0
     cross_down = 0
 
-    for i, row in df.iterrows():
+    # timestamps are int64 epoch ms from the provider; no per-bar parsing
+    ts_arr = df["timestamp"].to_numpy(dtype=np.int64)
+    n_bars = len(df)
+    if exits.active:
+        close_arr = df["close"].to_numpy(dtype=np.float64)
+        bars = {c: df[c].to_numpy(dtype=np.float64) if c in df.columns else close_arr for c in ("open", "high", "low")}
+    pending_exit: Optional[Tuple[int, float, Dict[str, Any]]] = None  # (bar, price, trigger) of the open position
+    progress_every = max(1, n_bars // 20)
+
+    t_loop = time.perf_counter()
+    for pos, (i, row) in enumerate(df.iterrows()):
         price = float(row["close"])
-        ts = str(pd.to_datetime(row["timestamp"]).isoformat())
+        ts = int(ts_arr[pos])
+
+        if progress is not None and pos % progress_every == 0:
+            progress(pos, n_bars)
 
         # # pull current values first
         # cur_fast = row.get("sma_fast", None)
@@ -69,8 +117,9 @@ def run_backtest_for_symbol(
         # Decide (keep as-is)
         signal = strat.decide(row, state, params)
 
-        if i % 50 == 0:
-            print(i, signal.action, state.get("prev_sma_fast"), state.get("prev_sma_slow"), row["sma_fast"], row["sma_slow"])
+        if trace and pos % 50 == 0:
+            trace_log.debug("%s bar %d %s prev_fast=%s prev_slow=%s", symbol, pos, signal.action,
+                            state.get("prev_sma_fast"), state.get("prev_sma_slow"))
 
         # Update SMA cross memory for next bar (SAFE)
         sma_fast = row.get("sma_fast", None)
@@ -83,12 +132,31 @@ def run_backtest_for_symbol(
         slip = 0.0
         pnl = 0.0
 
+        if pending_exit is not None and pending_exit[0] == pos and qty > 0:
+            # intrabar stop / take-profit: fills before this bar's close signal
+            slip = pending_exit[1] * (slippage_bps / 10_000.0)
+            exec_price = pending_exit[1] - slip
+            fee = (qty * exec_price) * (fee_bps / 10_000.0)
+            cash += qty * exec_price - fee
+            pnl = (exec_price - entry_price) * qty - fee
+            trades.append(TradeRecord(
+                symbol=symbol, timestamp=ts, side="SELL", qty=qty, price=exec_price,
+                fee=fee, slippage=slip, pnl=pnl,
+                decision_trace={"action": "SELL", **pending_exit[2], "entry_price": entry_price,
+                                "exec_price": exec_price, "fee": fee, "slippage": slip, "pnl": pnl},
+            ))
+            tr_acc.on_close(pnl)
+            qty = 0.0
+            entry_price = None
+            pending_exit = None
+            fee = slip = pnl = 0.0
+
         action = (signal.action or "").upper().strip()
         if signal.reason.get("crossed_up"): cross_up += 1
         if signal.reason.get("crossed_down"): cross_down += 1
 
-        if action != "HOLD":
-            print("SIGNAL", i, action, ts, signal.reason)
+        if trace and action != "HOLD":
+            trace_log.debug("%s SIGNAL bar %d %s t=%d %s", symbol, pos, action, ts, signal.reason)
 
         # if action == "BUY" and qty <= 0:
         #     alloc = (cash + qty * price) * risk_fraction
@@ -129,10 +197,15 @@ def run_backtest_for_symbol(
                 qty += buy_qty
                 entry_price = exec_price
 
+                levels: Dict[str, Any] = {}
+                if exits.active:
+                    levels = exits.levels(entry_price)
+                    pending_exit = exits.first_exit(bars["open"], bars["high"], bars["low"], pos + 1, entry_price)
+
                 trades.append(TradeRecord(
                     symbol=symbol, timestamp=ts, side="BUY", qty=buy_qty, price=exec_price,
                     fee=fee, slippage=slip, pnl=0.0,
-                    decision_trace={"action": "BUY", **signal.reason, "exec_price": exec_price, "fee": fee, "slippage": slip},
+                    decision_trace={"action": "BUY", **signal.reason, "exec_price": exec_price, "fee": fee, "slippage": slip, **levels},
                 ))
 
         elif action == "SELL" and qty > 0:
@@ -153,16 +226,24 @@ def run_backtest_for_symbol(
                 fee=fee, slippage=slip, pnl=pnl,
                 decision_trace={"action": "SELL", **signal.reason, "exec_price": exec_price, "fee": fee, "slippage": slip, "pnl": pnl},
             ))
+            tr_acc.on_close(pnl)
 
             qty = 0.0
             entry_price = None
+            pending_exit = None
 
         equity = cash + qty * price
         #equity_curve.append(equity)
-        equity_curve.append({"t": ts, "equity": float(equity)})
+        eq_acc.update(ts, float(equity))
+        if curve_points != 0:
+            equity_curve.append({"t": ts, "equity": float(equity)})
         state["position_qty"] = qty
 
-    print("cross_up", cross_up, "cross_down", cross_down, "trades", len(trades))
+    t_loop_end = time.perf_counter()
+    if trace:
+        trace_log.debug("%s cross_up=%d cross_down=%d trades=%d", symbol, cross_up, cross_down, len(trades))
+    if progress is not None:
+        progress(n_bars, n_bars)
 
     # total_return = (equity_curve[-1] / initial_cash - 1.0) if equity_curve else 0.0
     # metrics = {
@@ -174,16 +255,16 @@ def run_backtest_for_symbol(
     # }
     # curve = [{"t": str(pd.to_datetime(df.loc[i, "timestamp"]).date()), "equity": float(e)} for i, e in enumerate(equity_curve)]
     #return metrics, trades, curve
-    final_equity = equity_curve[-1]["equity"] if equity_curve else initial_cash
-    total_return = (final_equity / initial_cash - 1.0) if equity_curve else 0.0
+    final_equity = float(equity) if n_bars else initial_cash
+    total_return = (final_equity / initial_cash - 1.0) if n_bars else 0.0
 
-    rf_annual = float(risk.get("risk_free_rate_annual", 0.0) or 0.0)
-    #ann = annualization_factor(risk.get("market", "crypto"), risk.get("interval", "1h"))
-    ann = annualization_factor(market, interval)
-    rf_annual = float(risk.get("risk_free_rate_annual", 0.0) or 0.0)
-    eq_metrics = compute_equity_metrics(equity_curve, annualization=ann, risk_free_rate_annual=rf_annual)
-    #eq_metrics = compute_equity_metrics(equity_curve, annualization=252, risk_free_rate_annual=rf_annual)
-    tr_metrics = compute_trade_metrics(trades)
+    # accumulated bar by bar / fill by fill above; no second pass over the curve or trades
+    eq_metrics = eq_acc.result()
+    tr_metrics = tr_acc.result()
+    if timings is not None:
+        for k, v in (("indicators", t_prepared - t0), ("loop", t_loop_end - t_loop),
+                     ("metrics", time.perf_counter() - t_loop_end), ("bars", n_bars)):
+            timings[k] = timings.get(k, 0) + v
 
     metrics = {
         "symbol": symbol,
@@ -198,7 +279,84 @@ def run_backtest_for_symbol(
         # trade metrics (SELL legs / round trips)
         **tr_metrics,
     }
-    return metrics, trades, equity_curve
+    return metrics, trades, equity_curve if curve_points is None else list(equity_curve)
+
+
+@dataclass
+class ExitRules:
+    """
+    Stop-loss / take-profit / trailing-stop distances as fractions of price.
+    The exit of a position is found once, at entry, by a vectorized search over the
+    following bars instead of checking levels bar by bar in the loop.
+    """
+    stop_loss: Optional[float] = None
+    take_profit: Optional[float] = None
+    trailing_stop: Optional[float] = None
+
+    SEARCH_BLOCK = 256  # first block of bars searched; doubles while no level is hit
+
+    @classmethod
+    def from_risk(cls, risk: Dict[str, Any]) -> "ExitRules":
+        def frac(key: str) -> Optional[float]:
+            v = risk.get(key)
+            return float(v) / 10_000.0 if v is not None and float(v) > 0 else None
+        return cls(frac("stop_loss_bps"), frac("take_profit_bps"), frac("trailing_stop_bps"))
+
+    @property
+    def active(self) -> bool:
+        return any(v is not None for v in (self.stop_loss, self.take_profit, self.trailing_stop))
+
+    def levels(self, entry_price: float) -> Dict[str, float]:
+        out = {}
+        if self.stop_loss is not None:
+            out["stop_loss_price"] = entry_price * (1.0 - self.stop_loss)
+        if self.take_profit is not None:
+            out["take_profit_price"] = entry_price * (1.0 + self.take_profit)
+        if self.trailing_stop is not None:
+            out["trailing_stop_bps"] = self.trailing_stop * 10_000.0
+        return out
+
+    def first_exit(
+        self, open_: np.ndarray, high: np.ndarray, low: np.ndarray, start: int, entry_price: float
+    ) -> Optional[Tuple[int, float, Dict[str, Any]]]:
+        """
+        First bar >= start where a level is touched -> (bar, fill price, trace fields), or None.
+        The trailing level of a bar uses the highest high of the bars before it (the
+        order of high and low inside a bar is unknown). A bar touching both a stop and
+        the take-profit counts as stopped out; a bar opening beyond a level fills at the open.
+        """
+        n = len(low)
+        stop_fixed = entry_price * (1.0 - self.stop_loss) if self.stop_loss is not None else -np.inf
+        take = entry_price * (1.0 + self.take_profit) if self.take_profit is not None else np.inf
+        peak = entry_price
+        lo, size = start, self.SEARCH_BLOCK
+        while lo < n:
+            hi = min(n, lo + size)
+            if self.trailing_stop is not None:
+                prior_peak = np.maximum.accumulate(np.concatenate(([peak], high[lo:hi - 1])))
+                stop = np.maximum(prior_peak * (1.0 - self.trailing_stop), stop_fixed)
+                peak = max(peak, float(high[lo:hi].max()))
+            else:
+                stop = np.full(hi - lo, stop_fixed)
+            stopped = low[lo:hi] <= stop
+            taken = high[lo:hi] >= take
+            hit = np.flatnonzero(stopped | taken)
+            if hit.size:
+                k = int(hit[0])
+                bar = lo + k
+                if stopped[k]:
+                    level = float(stop[k])
+                    trigger = "trailing_stop" if self.trailing_stop is not None and level > stop_fixed else "stop_loss"
+                    price = min(level, float(open_[bar]))
+                else:
+                    level = take
+                    trigger = "take_profit"
+                    price = max(level, float(open_[bar]))
+                trace = {"trigger": trigger, "trigger_price": level, "bar_open": float(open_[bar]),
+                         "bar_high": float(high[bar]), "bar_low": float(low[bar]), "gap": price != level}
+                return bar, price, trace
+            lo, size = hi, size * 2
+        return None
 
 
 def aggregate_metrics(per_symbol: list[dict]) -> dict:
@@ -247,7 +405,7 @@ def compute_equity_metrics(
     risk_free_rate_annual: float = 0.0,
 ) -> dict:
     """
-    equity_curve: [{"t": iso_timestamp, "equity": float}, ...] in chronological order
+    equity_curve: [{"t": epoch_ms, "equity": float}, ...] in chronological order
     """
     if not equity_curve or len(equity_curve) < 2:
         return {
@@ -290,11 +448,10 @@ def compute_equity_metrics(
     max_dd_abs = abs(max_dd)
 
     # CAGR using timestamps if possible, else fallback to annualization
-    # best-effort parse dates
     try:
-        t0 = pd.to_datetime(equity_curve[0]["t"])
-        t1 = pd.to_datetime(equity_curve[-1]["t"])
-        years = max((t1 - t0).total_seconds() / (365.25 * 24 * 3600), 1e-9)
+        t0 = int(equity_curve[0]["t"])
+        t1 = int(equity_curve[-1]["t"])
+        years = max((t1 - t0) / MS_PER_YEAR, 1e-9)
         cagr = float((eq[-1] / eq[0]) ** (1.0 / years) - 1.0)
     except Exception:
         # fallback: treat length as trading days
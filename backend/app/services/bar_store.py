@@ -0,0 +1,93 @@
+import json
+import struct
+import zlib
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+from app.services.equity_store import shuffle_bytes, unshuffle_bytes
+
+# Snapshot of the prepared frame a backtest consumed for one symbol (bars plus the
+# strategy's indicator columns), stored in BarSnapshot.blob so charts show exactly
+# what the run saw without refetching or recomputing:
+#
+#   b"BRS1" | u32 index length | index (JSON) | chunk data ...
+#
+# Same layout idea as equity_store: rows are cut into chunks of CHUNK; per chunk the
+# delta-encoded int64 timestamps and every float64 column are byte-shuffled and zlib'd
+# separately. The index keeps [t_first, t_last, offset, [nbytes per column], count].
+
+MAGIC = b"BRS1"
+CHUNK = 8192
+BAR_COLUMNS = ("open", "high", "low", "close", "volume")
+_HEADER = struct.Struct("<4sI")
+
+
+def snapshot_columns(raw_columns: List[str], prepared: pd.DataFrame) -> List[str]:
+    """OHLCV plus the numeric columns the strategy added on top of the raw bars."""
+    cols = [c for c in BAR_COLUMNS if c in prepared.columns]
+    for c in prepared.columns:
+        if c == "timestamp" or c in cols or c in raw_columns:
+            continue
+        if prepared[c].dtype.kind in "fiub":
+            cols.append(c)
+    return cols
+
+
+def encode_frame(df: pd.DataFrame, columns: List[str]) -> bytes:
+    """df["timestamp"] (epoch ms) + columns (stored as float64) -> BRS1 bytes."""
+    ts = df["timestamp"].to_numpy(dtype=np.int64)
+    values = [df[c].to_numpy(dtype=np.float64) for c in columns]
+    n = len(ts)
+    chunks = []
+    parts: List[bytes] = []
+    offset = 0
+    for lo in range(0, n, CHUNK):
+        t = ts[lo:lo + CHUNK]
+        bufs = [zlib.compress(shuffle_bytes(np.diff(t, prepend=0)))]
+        bufs += [zlib.compress(shuffle_bytes(v[lo:lo + CHUNK])) for v in values]
+        chunks.append([int(t[0]), int(t[-1]), offset, [len(b) for b in bufs], len(t)])
+        parts += bufs
+        offset += sum(len(b) for b in bufs)
+    index = {"chunk": CHUNK, "n": n, "columns": list(columns), "chunks": chunks}
+    idx = json.dumps(index, separators=(",", ":")).encode()
+    return _HEADER.pack(MAGIC, len(idx)) + idx + b"".join(parts)
+
+
+class FrameBlob:
+    """Lazy reader over BRS1 bytes; only the chunks overlapping the requested range are inflated."""
+    def __init__(self, data: bytes):
+        magic, idx_len = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a bar snapshot")
+        start = _HEADER.size
+        self._index = json.loads(data[start:start + idx_len])
+        self._data = memoryview(data)[start + idx_len:]
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._index["columns"])
+
+    def read(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """{"timestamp": int64, column: float64, ...} restricted to [start_ms, end_ms]."""
+        names = ["timestamp"] + self.columns
+        parts: Dict[str, List[np.ndarray]] = {c: [] for c in names}
+        for t_first, t_last, off, sizes, _count in self._index["chunks"]:
+            if start_ms is not None and t_last < start_ms:
+                continue
+            if end_ms is not None and t_first > end_ms:
+                break
+            for c, size in zip(names, sizes):
+                buf = zlib.decompress(self._data[off:off + size])
+                off += size
+                if c == "timestamp":
+                    parts[c].append(np.cumsum(unshuffle_bytes(buf, np.int64)))
+                else:
+                    parts[c].append(unshuffle_bytes(buf, np.float64))
+        if not parts["timestamp"]:
+            return {c: np.empty(0, dtype=np.int64 if c == "timestamp" else np.float64) for c in names}
+        out = {c: np.concatenate(p) for c, p in parts.items()}
+        ts = out["timestamp"]
+        lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+        hi = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="right"))
+        return {c: v[lo:hi] for c, v in out.items()}
@@ -0,0 +1,100 @@
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+# Server-side run comparison: every run's equity is reduced to one portfolio curve,
+# the curves are as-of joined onto a common time axis (the union of their timestamps
+# over the period all runs cover), and the derived series are bucketed down to a
+# requested number of points.
+
+Curve = Tuple[np.ndarray, np.ndarray]  # (epoch ms int64, equity float64)
+
+
+def asof(ts: np.ndarray, values: np.ndarray, axis: np.ndarray) -> np.ndarray:
+    """Last value at or before each axis point (NaN before the first one)."""
+    idx = np.searchsorted(ts, axis, side="right") - 1
+    out = values[np.clip(idx, 0, None)].astype(np.float64)
+    out[idx < 0] = np.nan
+    return out
+
+
+def portfolio_curve(curves: Dict[str, Curve]) -> Curve:
+    """Sum of a run's per-symbol equity curves on the union of their timestamps."""
+    curves = {s: c for s, c in curves.items() if len(c[0])}
+    if not curves:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    if len(curves) == 1:
+        return next(iter(curves.values()))
+    axis = np.unique(np.concatenate([ts for ts, _ in curves.values()]))
+    total = np.zeros(len(axis), dtype=np.float64)
+    for ts, eq in curves.values():
+        v = asof(ts, eq, axis)
+        # a symbol that starts later contributes its starting capital until its first bar
+        v[np.isnan(v)] = eq[0]
+        total += v
+    return axis, total
+
+
+def _bucket_edges(n: int, points: int) -> np.ndarray:
+    if n <= points:
+        return np.arange(n + 1)
+    return np.unique(np.linspace(0, n, points + 1).astype(np.int64))
+
+
+def align_runs(curves: Dict[int, Curve], baseline: int, points: int) -> Dict[str, Any]:
+    """
+    {run_id: portfolio curve} -> common-axis series, bucketed to at most `points`:
+      t                  bucket end timestamps (epoch ms)
+      return[id]         equity / first equity - 1
+      spread[id]         return[id] - return[baseline]
+      drawdown[id]       equity / running peak - 1 (bucket minimum, so troughs survive)
+    """
+    empty = {"t": np.empty(0, dtype=np.int64), "return": {}, "spread": {}, "drawdown": {}}
+    live = [c for c in curves.values() if len(c[0])]
+    if not live:
+        return empty
+    lo = max(int(ts[0]) for ts, _ in live)
+    hi = min(int(ts[-1]) for ts, _ in live)
+    axis = np.unique(np.concatenate([ts[(ts >= lo) & (ts <= hi)] for ts, _ in live]))
+    if not len(axis):
+        return empty  # the runs do not overlap in time
+
+    ids = list(curves)
+    rets = np.full((len(ids), len(axis)), np.nan)
+    dds = np.full((len(ids), len(axis)), np.nan)
+    for i, rid in enumerate(ids):
+        ts, eq = curves[rid]
+        if not len(ts):
+            continue
+        v = asof(ts, eq, axis)
+        rets[i] = v / v[0] - 1.0
+        dds[i] = v / np.fmax.accumulate(v) - 1.0
+    spreads = rets - rets[ids.index(baseline)]
+
+    edges = _bucket_edges(len(axis), points)
+    last = edges[1:] - 1
+    dd_min = np.fmin.reduceat(dds, edges[:-1], axis=1)
+    return {
+        "t": axis[last],
+        "return": {rid: rets[i, last] for i, rid in enumerate(ids)},
+        "spread": {rid: spreads[i, last] for i, rid in enumerate(ids)},
+        "drawdown": {rid: dd_min[i] for i, rid in enumerate(ids)},
+    }
+
+
+def metrics_diff(metrics: Dict[int, Dict[str, Any]], baseline: int) -> List[Dict[str, Any]]:
+    """One row per numeric headline metric: value per run and difference to the baseline run."""
+    keys: List[str] = []
+    for m in metrics.values():
+        keys += [k for k, v in m.items() if isinstance(v, (int, float)) and not isinstance(v, bool) and k not in keys]
+    rows = []
+    base = metrics.get(baseline, {})
+    for k in keys:
+        b: Optional[float] = base.get(k)
+        values = {rid: m.get(k) for rid, m in metrics.items()}
+        rows.append({
+            "metric": k,
+            "values": values,
+            "diff": {rid: (v - b if isinstance(v, (int, float)) and isinstance(b, (int, float)) else None)
+                     for rid, v in values.items()},
+        })
+    return rows
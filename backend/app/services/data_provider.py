@@ -1,27 +1,198 @@
+import json
+import os
+import zlib
 from dataclasses import dataclass
+from typing import Dict
+import numpy as np
 import pandas as pd
 
+from app.core.config import settings
+from app.services.timeutils import to_epoch_ms, date_to_epoch_ms, interval_to_ms, MS_PER_DAY, MS_PER_YEAR
+
 @dataclass
 class MarketData:
     df: pd.DataFrame
     # expected columns: ["timestamp","open","high","low","close","volume"]
+    # timestamp is int64 epoch ms (UTC), sorted ascending
 
 class DataProvider:
-    def get_ohlcv(self, symbol: str, start_date: str, end_date: str) -> MarketData:
+    def get_ohlcv(self, symbol: str, start_date: str, end_date: str, interval: str = "1d") -> MarketData:
         raise NotImplementedError
 
+BAR_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
 class CsvDataProvider(DataProvider):
     """
     MVP provider: expects CSV at data/{symbol}.csv with columns:
     timestamp,open,high,low,close,volume
+
+    Each CSV is converted once into a sorted columnar cache at
+    data/.bars/{symbol}/{column}.npy (one memory-mapped array per column, timestamp
+    is the index). Range reads are a binary search on the timestamp column plus a
+    slice of each mapped column. The cache is rebuilt when the CSV's mtime/size changes.
     """
     def __init__(self, base_path: str = "data"):
         self.base_path = base_path
 
-    def get_ohlcv(self, symbol: str, start_date: str, end_date: str) -> MarketData:
-        path = f"{self.base_path}/{symbol}.csv"
-        df = pd.read_csv(path)
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df = df.sort_values("timestamp")
-        df = df[(df["timestamp"] >= start_date) & (df["timestamp"] <= end_date)].copy()
-        return MarketData(df=df.reset_index(drop=True))
\ No newline at end of file
+    def get_ohlcv(self, symbol: str, start_date: str, end_date: str, interval: str = "1d") -> MarketData:
+        # interval is fixed by the recorded file
+        cols = self._load_columns(symbol)
+        ts = cols["timestamp"]
+        t0, t1 = date_to_epoch_ms(start_date), date_to_epoch_ms(end_date)
+        lo = int(np.searchsorted(ts, t0, side="left"))
+        hi = int(np.searchsorted(ts, t1, side="right"))
+        # slices of the memmaps are views; only the window is materialized into the frame
+        df = pd.DataFrame({c: cols[c][lo:hi] for c in BAR_COLUMNS})
+        return MarketData(df=df)
+
+    # ---- binary cache ----
+
+    def _cache_dir(self, symbol: str) -> str:
+        return os.path.join(self.base_path, ".bars", symbol)
+
+    def _load_columns(self, symbol: str) -> Dict[str, np.ndarray]:
+        csv_path = os.path.join(self.base_path, f"{symbol}.csv")
+        st = os.stat(csv_path)
+        source = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+        cache_dir = self._cache_dir(symbol)
+        meta_path = os.path.join(cache_dir, "meta.json")
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+
+        if not meta or meta.get("source") != source:
+            self._build_cache(csv_path, cache_dir, source)
+
+        return {c: np.load(os.path.join(cache_dir, f"{c}.npy"), mmap_mode="r") for c in BAR_COLUMNS}
+
+    def _build_cache(self, csv_path: str, cache_dir: str, source: Dict[str, int]) -> None:
+        df = pd.read_csv(csv_path)
+        df = df.dropna(subset=["timestamp"])
+        df["timestamp"] = to_epoch_ms(df["timestamp"])
+        df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+        if "volume" not in df.columns:
+            df["volume"] = 0.0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        pid = os.getpid()
+        for c in BAR_COLUMNS:
+            dtype = np.int64 if c == "timestamp" else np.float64
+            final = os.path.join(cache_dir, f"{c}.npy")
+            tmp = f"{final}.{pid}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, df[c].to_numpy(dtype=dtype))
+            os.replace(tmp, final)
+
+        # meta last: a half-written cache never matches the source and gets rebuilt
+        meta_path = os.path.join(cache_dir, "meta.json")
+        tmp = f"{meta_path}.{pid}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"source": source, "rows": int(len(df))}, f)
+        os.replace(tmp, meta_path)
+
+class SyntheticDataProvider(DataProvider):
+    """
+    Offline provider: deterministic geometric-Brownian-motion bars.
+    Each (seed, symbol, interval) is one fixed series on an epoch-aligned bar grid and
+    every request is a slice of it: a bar has the same prices whatever the requested
+    start and end, so backtests, charts and load tests are reproducible without
+    network access and agree wherever their ranges overlap.
+
+    The series is generated in chunks of CHUNK_BARS bars, each from its own seed with
+    all of its per-bar randoms drawn as one block. Chunk-boundary prices are a random
+    walk from ANCHOR_MS (drawn LEVEL_BLOCK chunks at a time) and the bars in between
+    are a Brownian bridge, so a range costs its own chunks plus one normal per chunk
+    back to the anchor.
+    """
+    CHUNK_BARS = 1024
+    LEVEL_BLOCK = 4096
+    ANCHOR_MS = 946684800000  # 2000-01-01: the series is at its base price here
+    _INDEX_OFFSET = 1 << 32   # chunk/block indices before the epoch are negative; seeds must not be
+
+    def __init__(self, seed: int = 42, start_price: float = 100.0, drift_annual: float = 0.05, vol_annual: float = 0.4):
+        self.seed = seed
+        self.start_price = start_price
+        self.drift_annual = drift_annual
+        self.vol_annual = vol_annual
+
+    def get_ohlcv(self, symbol: str, start_date: str, end_date: str, interval: str = "1d") -> MarketData:
+        step = interval_to_ms(interval)
+        t0 = date_to_epoch_ms(start_date)
+        t1 = date_to_epoch_ms(end_date) + MS_PER_DAY  # inclusive end date, like the yfinance provider
+        i0, i1 = -(-t0 // step), -(-t1 // step)  # bar i starts at i * step
+        if i1 <= i0:
+            raise ValueError(f"No data for {symbol} in range {start_date}..{end_date} (interval={interval}).")
+
+        key = zlib.crc32(f"{self.seed}:{symbol}:{interval}".encode())
+        C = self.CHUNK_BARS
+        k0, k1 = i0 // C, (i1 - 1) // C
+        levels, moves = self._chunk_levels(key, step, k0, k1)
+
+        dt = step / MS_PER_YEAR
+        sigma = self.vol_annual * np.sqrt(dt)
+        frac = np.arange(1, C + 1) / C
+        log_px, wick, vol_z = [], [], []
+        for k in range(k0, k1 + 1):
+            r = np.random.default_rng([key, 0, k + self._INDEX_OFFSET]).standard_normal((C, 4))
+            walk = sigma * np.cumsum(r[:, 0])
+            bridge = walk - frac * walk[-1]
+            # log close of the chunk's bars, pinned to the next chunk's level at its last bar
+            log_px.append(levels[k - k0] + frac * moves[k - k0] + bridge)
+            wick.append(r[:, 1:3])
+            vol_z.append(r[:, 3])
+
+        lo, hi = i0 - k0 * C, i1 - k0 * C
+        # open = previous close; the first bar of a chunk opens at the chunk's level
+        log_close = np.concatenate(log_px)
+        log_open = np.concatenate([np.concatenate(([levels[j]], p[:-1])) for j, p in enumerate(log_px)])
+        close = np.exp(log_close[lo:hi])
+        open_ = np.exp(log_open[lo:hi])
+        w = np.abs(np.concatenate(wick)[lo:hi]) * sigma * 0.5
+        high = np.maximum(open_, close) * (1.0 + w[:, 0])
+        low = np.minimum(open_, close) * (1.0 - w[:, 1])
+        volume = np.round(np.exp(12.0 + 0.5 * np.concatenate(vol_z)[lo:hi]))
+
+        df = pd.DataFrame({
+            "timestamp": np.arange(i0, i1, dtype=np.int64) * step,
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+        })
+        return MarketData(df=df)
+
+    def _chunk_levels(self, key: int, step: int, k0: int, k1: int):
+        """Log price at the start of chunks k0..k1 and each chunk's total log move."""
+        C, B = self.CHUNK_BARS, self.LEVEL_BLOCK
+        dt = step / MS_PER_YEAR
+        mu = (self.drift_annual - 0.5 * self.vol_annual ** 2) * dt * C
+        sigma = self.vol_annual * np.sqrt(dt * C)
+        anchor = (self.ANCHOR_MS // step) // C
+        lo, hi = min(k0, anchor), max(k1, anchor)  # moves of chunks lo..hi
+        blocks = [
+            np.random.default_rng([key, 1, b + self._INDEX_OFFSET]).standard_normal(B)
+            for b in range(lo // B, hi // B + 1)
+        ]
+        g = np.concatenate(blocks)[lo - (lo // B) * B: hi - (lo // B) * B + 1]
+        moves = mu + sigma * g
+        start = np.concatenate(([0.0], np.cumsum(moves)))  # start[j]: level of chunk lo + j, relative to chunk lo
+        base = np.log(self.start_price * (1.0 + (key % 100) / 100.0))
+        levels = base + start - start[anchor - lo]
+        return levels[k0 - lo: k1 - lo + 1], moves[k0 - lo: k1 - lo + 1]
+
+def get_data_provider() -> DataProvider:
+    """Provider selected by settings.data_provider."""
+    name = (settings.data_provider or "").lower()
+    if name == "yfinance":
+        # imported lazily: yfinance is not needed for offline providers
+        from app.services.yfinance_provider import YFinanceDataProvider
+        return YFinanceDataProvider()
+    if name == "csv":
+        return CsvDataProvider(base_path=settings.data_path)
+    if name == "synthetic":
+        return SyntheticDataProvider(seed=settings.synthetic_seed)
+    raise ValueError(f"Unknown data provider: {settings.data_provider}")
@@ -0,0 +1,125 @@
+import json
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+from app.core import jsonio
+from app.services.timeutils import to_epoch_ms
+
+# Binary equity-curve container stored in BacktestRun.equity_blob:
+#
+#   b"EQB1" | u32 index length | index (JSON) | chunk data ...
+#
+# Each symbol's curve is cut into chunks of CHUNK points; every chunk holds
+# zlib(byte-shuffled delta-encoded int64 epoch ms) and zlib(byte-shuffled float64
+# equity). The index keeps [t_first, t_last, offset, t_nbytes, v_nbytes, count] per
+# chunk, so reading one symbol or a time slice only decompresses the chunks it needs.
+
+MAGIC = b"EQB1"
+CHUNK = 8192
+_HEADER = struct.Struct("<4sI")
+
+
+def shuffle_bytes(arr: np.ndarray) -> bytes:
+    # group the k-th byte of every value together: long runs compress far better
+    return np.ascontiguousarray(arr).view(np.uint8).reshape(-1, 8).T.tobytes()
+
+
+def unshuffle_bytes(buf: bytes, dtype) -> np.ndarray:
+    raw = np.frombuffer(buf, dtype=np.uint8).reshape(8, -1).T
+    return np.ascontiguousarray(raw).view(dtype).ravel()
+
+
+def encode_curves(curves: Dict[str, List[Dict[str, Any]]]) -> bytes:
+    """{symbol: [{"t": epoch_ms, "equity": float}, ...]} -> EQB1 bytes."""
+    index: Dict[str, Any] = {"chunk": CHUNK, "symbols": {}}
+    parts: List[bytes] = []
+    offset = 0
+    for sym, curve in curves.items():
+        n = len(curve)
+        ts = np.fromiter((p["t"] for p in curve), dtype=np.int64, count=n)
+        eq = np.fromiter((p["equity"] for p in curve), dtype=np.float64, count=n)
+        chunks = []
+        for lo in range(0, n, CHUNK):
+            t = ts[lo:lo + CHUNK]
+            v = eq[lo:lo + CHUNK]
+            t_bytes = zlib.compress(shuffle_bytes(np.diff(t, prepend=0)))
+            v_bytes = zlib.compress(shuffle_bytes(v))
+            chunks.append([int(t[0]), int(t[-1]), offset, len(t_bytes), len(v_bytes), len(t)])
+            parts += [t_bytes, v_bytes]
+            offset += len(t_bytes) + len(v_bytes)
+        index["symbols"][sym] = {"n": n, "chunks": chunks}
+    idx = json.dumps(index, separators=(",", ":")).encode()
+    return _HEADER.pack(MAGIC, len(idx)) + idx + b"".join(parts)
+
+
+class EquityBlob:
+    """Lazy reader over EQB1 bytes; only the index is parsed up front."""
+    def __init__(self, data: bytes):
+        magic, idx_len = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an equity blob")
+        start = _HEADER.size
+        self._index = json.loads(data[start:start + idx_len])
+        self._data = memoryview(data)[start + idx_len:]
+
+    def symbols(self) -> List[str]:
+        return list(self._index["symbols"])
+
+    def read(self, symbol: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        meta = self._index["symbols"].get(symbol)
+        if meta is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        ts_parts, eq_parts = [], []
+        for t_first, t_last, off, t_n, v_n, _count in meta["chunks"]:
+            if start_ms is not None and t_last < start_ms:
+                continue
+            if end_ms is not None and t_first > end_ms:
+                break
+            t_buf = zlib.decompress(self._data[off:off + t_n])
+            v_buf = zlib.decompress(self._data[off + t_n:off + t_n + v_n])
+            ts_parts.append(np.cumsum(unshuffle_bytes(t_buf, np.int64)))
+            eq_parts.append(unshuffle_bytes(v_buf, np.float64))
+        if not ts_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        ts = np.concatenate(ts_parts)
+        eq = np.concatenate(eq_parts)
+        lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+        hi = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="right"))
+        return ts[lo:hi], eq[lo:hi]
+
+
+def read_run_curves(
+    equity_blob: Optional[bytes],
+    equity_json: Optional[str],
+    symbols: Optional[List[str]] = None,
+    start_ms: Optional[int] = None,
+    end_ms: Optional[int] = None,
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    {symbol: (epoch_ms int64, equity float64)} for a run, from the binary blob when
+    present, else from the legacy equity_json text (whose timestamps may be ISO strings).
+    """
+    out: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    if equity_blob:
+        blob = EquityBlob(equity_blob)
+        available = blob.symbols()
+        for sym in available:
+            if not symbols or sym in symbols:
+                out[sym] = blob.read(sym, start_ms, end_ms)
+        return out
+
+    curves = jsonio.loads(equity_json) if equity_json else {}
+    if not isinstance(curves, dict):
+        return out
+    for sym, curve in curves.items():
+        if symbols and sym not in symbols:
+            continue
+        raw_t = [p["t"] for p in curve]
+        ts = to_epoch_ms(raw_t) if any(isinstance(t, str) for t in raw_t) else np.asarray(raw_t, dtype=np.int64)
+        eq = np.array([p["equity"] for p in curve], dtype=np.float64)
+        lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+        hi = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="right"))
+        out[sym] = (ts[lo:hi], eq[lo:hi])
+    return out
@@ -1,3 +1,8 @@
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Tuple
+import numpy as np
 import pandas as pd
 
 def sma(series: pd.Series, window: int) -> pd.Series:
@@ -10,4 +15,98 @@ def rsi(close: pd.Series, window: int = 14) -> pd.Series:
     avg_gain = gain.rolling(window).mean()
     avg_loss = loss.rolling(window).mean()
     rs = avg_gain / (avg_loss.replace(0, 1e-12))
-    return 100 - (100 / (1 + rs))
\ No newline at end of file
+    return 100 - (100 / (1 + rs))
+
+
+# ---- declared indicators ----
+# Strategies declare what they need as IndicatorSpecs ("sma(close, 10)"); a computation
+# plan deduplicates them and an IndicatorCache computes each distinct one once per bar
+# frame, shared read-only by every strategy / parameter set running over those bars.
+
+INDICATORS: Dict[str, Callable[..., pd.Series]] = {}
+
+def register_indicator(name: str):
+    """Decorator: fn(series, *args) -> Series becomes available to IndicatorSpec(name, ...)."""
+    def deco(fn):
+        INDICATORS[name] = fn
+        return fn
+    return deco
+
+register_indicator("sma")(sma)
+register_indicator("rsi")(rsi)
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    fn: str                  # registered indicator name
+    source: str = "close"    # input column
+    args: Tuple[Any, ...] = ()
+
+    def __str__(self) -> str:
+        return f"{self.fn}({', '.join([self.source, *map(str, self.args)])})"
+
+    def compute(self, df: pd.DataFrame) -> np.ndarray:
+        try:
+            fn = INDICATORS[self.fn]
+        except KeyError:
+            raise ValueError(f"Unknown indicator: {self.fn}")
+        return np.asarray(fn(df[self.source], *self.args), dtype=np.float64)
+
+def ind(fn: str, source: str = "close", *args: Any) -> IndicatorSpec:
+    """ind("sma", "close", 10) == sma(close, 10)."""
+    return IndicatorSpec(fn, source, tuple(args))
+
+
+def build_plan(declared: Iterable[Dict[str, IndicatorSpec]]) -> Tuple[IndicatorSpec, ...]:
+    """Distinct specs over any number of {column: spec} declarations, in first-seen order."""
+    return tuple(dict.fromkeys(spec for d in declared for spec in d.values()))
+
+
+class IndicatorCache:
+    """
+    Computed indicators for one bar frame, keyed by spec. Values are read-only arrays
+    shared by every caller; thread-safe, each spec is computed once. Distinct specs
+    compute concurrently; a caller that asks for one being computed waits for it.
+    """
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+        self._values: Dict[IndicatorSpec, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, spec: IndicatorSpec) -> np.ndarray:
+        with self._lock:
+            fut = self._values.get(spec)
+            owner = fut is None
+            if owner:
+                self.misses += 1
+                fut = self._values[spec] = Future()
+            else:
+                self.hits += 1
+        if not owner:
+            return fut.result()
+        try:
+            v = spec.compute(self._df)
+        except BaseException as e:
+            # like ToolMemo: waiters get the error, later callers retry
+            with self._lock:
+                del self._values[spec]
+            fut.set_exception(e)
+            raise
+        v.flags.writeable = False
+        fut.set_result(v)
+        return v
+
+    def compute(self, plan: Iterable[IndicatorSpec]) -> None:
+        """Compute every spec of a plan (see build_plan) that is not cached yet."""
+        for spec in plan:
+            self.get(spec)
+
+    def apply(self, df: pd.DataFrame, declared: Dict[str, IndicatorSpec]) -> pd.DataFrame:
+        """Add the declared columns to df (a frame over the same bars as the cache)."""
+        if len(df) != len(self._df):
+            raise ValueError("IndicatorCache is bound to a different bar frame")
+        for col, spec in declared.items():
+            df[col] = self.get(spec)
+        return df
@@ -0,0 +1,247 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import and_, event, func, or_, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models, models_agent
+from app.db.session import SessionLocal
+
+# Database-backed job queue. With JOB_QUEUE=db the API creates background runs with
+# status="queued" and any number of worker processes (scripts/worker.py), on any number
+# of hosts sharing the database, drain them:
+#
+# - claim: pick the oldest claimable row (SELECT ... FOR UPDATE SKIP LOCKED where the
+#   database has row locks; SQLite drops the clause and serializes writers) and take it
+#   with a conditional UPDATE, so two workers never both win the same row.
+# - lease: the claim sets lease_owner / lease_expires_at; a heartbeat renews it while
+#   the job runs. A row whose lease expired (crashed or stalled worker) is claimable
+#   again, until it has used settings.job_max_attempts claims and is marked failed.
+# - fence: every commit of the job's session first renews the lease in the same
+#   transaction, so a worker that lost its job to another one cannot write a result.
+
+log = logging.getLogger("app.jobs")
+
+
+class LeaseLost(RuntimeError):
+    """The job was reclaimed by another worker; this worker's writes are discarded."""
+
+
+def enabled() -> bool:
+    return (settings.job_queue or "").lower() == "db"
+
+
+def _execute_backtest(db: Session, run_id: int) -> None:
+    from app.services.backtest_jobs import execute_backtest_run
+    execute_backtest_run(db, run_id)
+
+
+def _execute_agent(db: Session, run_id: int) -> None:
+    from app.services.agent_jobs import execute_agent_run
+    execute_agent_run(db, run_id)
+
+
+# kind -> (model, execute(db, run_id)); executors import their modules on first use,
+# so a backtest-only worker never loads the agent stack
+JOB_KINDS: Dict[str, Tuple[type, Callable[[Session, int], None]]] = {
+    "backtest": (models.BacktestRun, _execute_backtest),
+    "agent": (models_agent.AgentRun, _execute_agent),
+}
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _now() -> datetime:
+    # naive UTC like the other DateTime columns; worker clocks must agree to well within a lease
+    return datetime.utcnow()
+
+
+def _expired(model, now: datetime):
+    cond = and_(model.status == "running", model.lease_owner.isnot(None), model.lease_expires_at < now)
+    if model is models.BacktestRun:
+        # paper-trading runs hold a lease as well (app.services.paper) but are not queue jobs
+        cond = and_(cond, model.run_type.is_(None))
+    return cond
+
+
+def _claimable(model, now: datetime, max_attempts: int):
+    return or_(
+        model.status == "queued",
+        and_(_expired(model, now), func.coalesce(model.attempts, 0) < max_attempts),
+    )
+
+
+def claim(db: Session, kind: str, owner: str, lease_seconds: float, max_attempts: int, retries: int = 3) -> Optional[int]:
+    """Lease the oldest claimable job of a kind to owner; its id, or None if there is none."""
+    model, _ = JOB_KINDS[kind]
+    for _ in range(retries):
+        now = _now()
+        cond = _claimable(model, now, max_attempts)
+        row = db.query(model.id).filter(cond).order_by(model.id).with_for_update(skip_locked=True).first()
+        if row is None:
+            db.rollback()
+            return None
+        taken = db.execute(
+            update(model)
+            .where(model.id == row.id, cond)
+            .values(
+                status="running",
+                lease_owner=owner,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                attempts=func.coalesce(model.attempts, 0) + 1,
+            )
+        ).rowcount
+        db.commit()
+        if taken == 1:
+            return row.id
+        # another worker took it between the read and the write (no row locks, e.g. SQLite)
+    return None
+
+
+def renew(db: Session, kind: str, run_id: int, owner: str, lease_seconds: float) -> bool:
+    """Extend owner's lease (caller commits); False if the job is no longer leased to owner."""
+    model, _ = JOB_KINDS[kind]
+    return db.execute(
+        update(model)
+        .where(model.id == run_id, model.lease_owner == owner)
+        .values(lease_expires_at=_now() + timedelta(seconds=lease_seconds))
+    ).rowcount == 1
+
+
+def reap(db: Session, kind: str, max_attempts: int) -> int:
+    """Mark failed the expired jobs that already used all their claims (caller commits)."""
+    model, _ = JOB_KINDS[kind]
+    return db.execute(
+        update(model)
+        .where(_expired(model, _now()), func.coalesce(model.attempts, 0) >= max_attempts)
+        .values(status="failed", error=f"Job abandoned: its worker stopped {max_attempts} times")
+    ).rowcount
+
+
+class JobWorker:
+    """
+    Claims and runs queued jobs on `concurrency` threads until stop() (or, with
+    drain=True, until the queue is empty); jobs in flight finish first. A heartbeat
+    thread renews their leases and fails jobs that ran out of attempts.
+    """
+    def __init__(
+        self,
+        kinds: Iterable[str] = ("backtest", "agent"),
+        concurrency: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        poll_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        name: Optional[str] = None,
+    ):
+        self.kinds = tuple(kinds)
+        for kind in self.kinds:
+            if kind not in JOB_KINDS:
+                raise ValueError(f"Unknown job kind: {kind}")
+        self.concurrency = concurrency or settings.backtest_workers
+        self.lease_seconds = lease_seconds or settings.job_lease_seconds
+        self.poll_seconds = poll_seconds or settings.job_poll_seconds
+        self.max_attempts = max_attempts or settings.job_max_attempts
+        self.name = name or worker_name()
+        self.completed = 0
+        self.failed = 0
+        self._held: Set[Tuple[str, int]] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._done = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self, drain: bool = False) -> None:
+        threads = [
+            threading.Thread(target=self._loop, args=(drain,), name=f"job-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self._done.set()
+        heartbeat.join()
+
+    def run_once(self) -> bool:
+        """Claim and run one job; False if none was claimable."""
+        for kind in self.kinds:
+            with SessionLocal() as db:
+                run_id = claim(db, kind, self.name, self.lease_seconds, self.max_attempts)
+            if run_id is not None:
+                self._run(kind, run_id)
+                return True
+        return False
+
+    def _loop(self, drain: bool) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except OperationalError as e:
+                # e.g. SQLite "database is locked" with many writers: back off and retry
+                log.warning("claim failed: %s", e)
+            if drain:
+                return
+            self._stop.wait(self.poll_seconds)
+
+    def _run(self, kind: str, run_id: int) -> None:
+        _, execute = JOB_KINDS[kind]
+        with self._lock:
+            self._held.add((kind, run_id))
+        t0 = time.perf_counter()
+        outcome = "completed"
+        try:
+            with SessionLocal() as db:
+                event.listen(db, "before_commit", self._fence(kind, run_id))
+                execute(db, run_id)
+        except LeaseLost:
+            outcome = "lease lost, result discarded"
+        except Exception:
+            outcome = "failed"  # recorded on the run by execute
+        finally:
+            with self._lock:
+                self._held.discard((kind, run_id))
+        with self._lock:
+            if outcome == "completed":
+                self.completed += 1
+            else:
+                self.failed += 1
+        log.info("%s %d: %s in %.2fs", kind, run_id, outcome, time.perf_counter() - t0)
+
+    def _fence(self, kind: str, run_id: int) -> Callable[[Session], None]:
+        def check(db: Session) -> None:
+            if not renew(db, kind, run_id, self.name, self.lease_seconds):
+                raise LeaseLost(f"{kind} {run_id} is no longer leased to {self.name}")
+        return check
+
+    def _heartbeat(self) -> None:
+        while not self._done.wait(self.lease_seconds / 3):
+            with self._lock:
+                held = list(self._held)
+            try:
+                with SessionLocal() as db:
+                    for kind, run_id in held:
+                        if not renew(db, kind, run_id, self.name, self.lease_seconds):
+                            log.warning("%s %d: lease lost to another worker", kind, run_id)
+                    reaped = {kind: reap(db, kind, self.max_attempts) for kind in self.kinds}
+                    db.commit()
+            except OperationalError as e:
+                log.warning("heartbeat failed: %s", e)
+                continue
+            for kind, n in reaped.items():
+                if n:
+                    log.warning("%d %s job(s) failed after %d expired leases", n, kind, self.max_attempts)
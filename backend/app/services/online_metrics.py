@@ -0,0 +1,140 @@
+import math
+from typing import Any, Dict, Optional
+
+from app.services.timeutils import MS_PER_YEAR
+
+# Streaming counterparts of backtester.compute_equity_metrics / compute_trade_metrics:
+# updated once per bar / per fill inside the backtest loop, so the metrics need no
+# second pass and no materialized equity list. Results match the batch functions
+# (same fill rules for non-positive equity, same ddof=1 deviations) up to float rounding.
+
+
+class _Welford:
+    """Running mean / sample variance."""
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+
+class EquityAccumulator:
+    """
+    Feed (t, equity) per bar. Non-positive / non-finite equity repeats the previous
+    valid value (leading ones take the first valid value), like the batch ffill/bfill.
+    """
+    def __init__(self, annualization: int = 252, risk_free_rate_annual: float = 0.0):
+        self.annualization = annualization
+        self.rf_annual = float(risk_free_rate_annual or 0.0)
+        self.rf_per_period = (1.0 + self.rf_annual) ** (1.0 / annualization) - 1.0 if annualization > 0 else 0.0
+        self.n = 0
+        self.t_first: Optional[int] = None
+        self.t_last: Optional[int] = None
+        self.first: Optional[float] = None   # first valid equity
+        self.prev: Optional[float] = None    # last valid equity
+        self.peak = 0.0
+        self.max_dd = 0.0                    # most negative eq / peak - 1
+        self._leading = 0                    # invalid points before the first valid one
+        self._rets = _Welford()
+        self._down = _Welford()              # negative excess returns only
+
+    def _ret(self, r: float) -> None:
+        if not math.isfinite(r):
+            r = 0.0
+        self._rets.add(r)
+        excess = r - self.rf_per_period
+        if excess < 0:
+            self._down.add(excess)
+
+    def update(self, t: int, equity: float) -> None:
+        self.n += 1
+        if self.t_first is None:
+            self.t_first = t
+        self.t_last = t
+
+        valid = equity is not None and math.isfinite(equity) and equity > 0
+        if self.prev is None:
+            if not valid:
+                self._leading += 1
+                return
+            self.first = self.peak = equity
+            for _ in range(self._leading):  # back-filled points: flat returns
+                self._ret(0.0)
+            self.prev = equity
+            return
+
+        e = equity if valid else self.prev
+        self._ret(e / self.prev - 1.0)
+        self.prev = e
+        if e > self.peak:
+            self.peak = e
+        dd = e / self.peak - 1.0
+        if dd < self.max_dd:
+            self.max_dd = dd
+
+    def result(self) -> Dict[str, Any]:
+        if self.n < 2:
+            return {"cagr": 0.0, "volatility": 0.0, "sharpe": 0.0, "sortino": 0.0, "max_drawdown": 0.0}
+        if self.prev is None:  # no valid point at all
+            nan = float("nan")
+            return {"cagr": nan, "volatility": 0.0, "sharpe": 0.0, "sortino": 0.0, "max_drawdown": nan,
+                    "risk_free_rate_annual": self.rf_annual}
+
+        sq = math.sqrt(self.annualization)
+        mean_excess = self._rets.mean - self.rf_per_period
+        std_ret = self._rets.std()
+        downside_std = self._down.std()
+        years = max((self.t_last - self.t_first) / MS_PER_YEAR, 1e-9)
+        return {
+            "cagr": float((self.prev / self.first) ** (1.0 / years) - 1.0),
+            "volatility": std_ret * sq if std_ret > 0 else 0.0,
+            "sharpe": (mean_excess / std_ret) * sq if std_ret > 0 else 0.0,
+            "sortino": (mean_excess / downside_std) * sq if downside_std > 0 else 0.0,
+            "max_drawdown": abs(self.max_dd),
+            "risk_free_rate_annual": self.rf_annual,
+        }
+
+
+class TradeAccumulator:
+    """Feed the realized pnl of every SELL (closed round trip)."""
+    def __init__(self):
+        self.round_trips = 0
+        self.wins = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.total = 0.0
+
+    def on_close(self, pnl: float) -> None:
+        pnl = float(pnl or 0.0)
+        self.round_trips += 1
+        self.total += pnl
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+        elif pnl < 0:
+            self.gross_loss -= pnl
+
+    def result(self) -> Dict[str, Any]:
+        if self.round_trips == 0:
+            return {"round_trips": 0, "win_rate": 0.0, "profit_factor": 0.0, "avg_trade_pnl": 0.0, "total_realized_pnl": 0.0}
+        if self.gross_loss > 0:
+            profit_factor = self.gross_profit / self.gross_loss
+        else:
+            profit_factor = float("inf") if self.gross_profit > 0 else 0.0
+        return {
+            "round_trips": self.round_trips,
+            "win_rate": self.wins / self.round_trips,
+            "profit_factor": profit_factor,
+            "avg_trade_pnl": self.total / self.round_trips,
+            "total_realized_pnl": self.total,
+        }
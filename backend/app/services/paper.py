@@ -0,0 +1,614 @@
+import asyncio
+import bisect
+import logging
+import math
+import time
+import uuid
+from array import array
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import or_
+
+from app.core import jsonio, metrics
+from app.core.config import settings
+from app.db import models
+from app.db.session import SessionLocal
+from app.services.backtester import ExitRules, TradeRecord, aggregate_metrics, annualization_factor
+from app.services.equity_store import encode_curves
+from app.services.indicators import IndicatorSpec
+from app.services.job_queue import worker_name
+from app.services.online_metrics import EquityAccumulator, TradeAccumulator
+from app.services.run_summary import backtest_summary_columns
+from app.services.strategies import Strategy, get_strategy
+
+# Paper trading: strategies consume bars one at a time from an async feed (a replay of
+# stored bars at a chosen speed, or a queue a local producer fills) instead of a
+# prepared frame. Indicators are updated incrementally, once per bar per series no
+# matter how many configs read them; every (config, symbol) stream keeps its own book
+# with the same execution model as run_backtest_for_symbol (close fills, fee/slippage
+# in bps, intrabar exits against high/low). Fills are stored as Trade rows of a
+# BacktestRun with run_type="paper", one run per config.
+#
+# A session lives in the memory of the process that started it. Its runs record the
+# session id and hold a lease (lease_owner / lease_expires_at) that the session renews
+# while it runs; running paper runs whose lease lapsed lost their process and are
+# marked failed (fail_orphaned_runs, at startup and from every live session).
+
+RUN_TYPE = "paper"
+
+log = logging.getLogger("app.paper")
+
+
+class Bar(NamedTuple):
+    series: Tuple[str, ...]  # (symbol, interval[, start_date, end_date]), see PaperSession.add_config
+    timestamp: int           # epoch ms, bar open
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+# ---- feeds ----
+
+class ReplayFeed:
+    """
+    Stored bars of several series merged into one timeline. speed=N plays N x real
+    time (sleeping between timestamps); speed=0 replays as fast as the consumer goes.
+    Yields every bar sharing a timestamp as one tick.
+    """
+    def __init__(self, bars: Dict[Tuple[str, str], pd.DataFrame], speed: float = 0.0):
+        self.speed = speed
+        keys = list(bars)
+        cols = {c: np.concatenate([bars[k][c].to_numpy(dtype=np.float64) for k in keys]) if keys else np.empty(0)
+                for c in ("open", "high", "low", "close", "volume")}
+        ts = np.concatenate([bars[k]["timestamp"].to_numpy(dtype=np.int64) for k in keys]) if keys else np.empty(0, np.int64)
+        owner = np.concatenate([np.full(len(bars[k]), i) for i, k in enumerate(keys)]) if keys else np.empty(0, int)
+        order = np.argsort(ts, kind="stable")
+        self._keys = keys
+        self._ts = ts[order]
+        self._owner = owner[order]
+        self._cols = {c: v[order] for c, v in cols.items()}
+        self.total = len(self._ts)
+
+    async def __aiter__(self) -> AsyncIterator[List[Bar]]:
+        if self.total == 0:
+            return
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(self._ts)) + 1, [self.total]))
+        o, h, l, c, v = (self._cols[k].tolist() for k in ("open", "high", "low", "close", "volume"))
+        ts, owner = self._ts.tolist(), self._owner.tolist()
+        prev = None
+        for lo, hi in zip(starts[:-1].tolist(), starts[1:].tolist()):
+            if self.speed > 0 and prev is not None:
+                await asyncio.sleep((ts[lo] - prev) / 1000.0 / self.speed)
+            else:
+                await asyncio.sleep(0)  # let requests and other sessions run between ticks
+            prev = ts[lo]
+            yield [Bar(self._keys[owner[i]], ts[i], o[i], h[i], l[i], c[i], v[i]) for i in range(lo, hi)]
+
+
+class QueueFeed:
+    """Local stand-in for a live feed: a producer put()s bars and close()s it at the end."""
+    def __init__(self, maxsize: int = 0):
+        self._queue: "asyncio.Queue[Optional[Bar]]" = asyncio.Queue(maxsize)
+        self.total: Optional[int] = None
+
+    async def put(self, bar: Bar) -> None:
+        await self._queue.put(bar)
+
+    async def close(self) -> None:
+        await self._queue.put(None)
+
+    async def __aiter__(self) -> AsyncIterator[List[Bar]]:
+        while True:
+            bar = await self._queue.get()
+            if bar is None:
+                return
+            yield [bar]
+
+
+# ---- incremental indicators (match the rolling versions in app.services.indicators) ----
+
+class _StreamingSma:
+    def __init__(self, window: int):
+        self.window = int(window)
+        self._buf: deque = deque()
+        self._sum = 0.0
+
+    def update(self, x: float) -> float:
+        self._buf.append(x)
+        self._sum += x
+        if len(self._buf) > self.window:
+            self._sum -= self._buf.popleft()
+        return self._sum / self.window if len(self._buf) == self.window else math.nan
+
+
+class _StreamingRsi:
+    def __init__(self, window: int = 14):
+        self._gain = _StreamingSma(window)
+        self._loss = _StreamingSma(window)
+        self._prev: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        prev, self._prev = self._prev, x
+        d = 0.0 if prev is None else x - prev
+        g = self._gain.update(d if d > 0 else 0.0)
+        loss = self._loss.update(-d if d < 0 else 0.0)
+        if math.isnan(g):
+            return math.nan
+        rs = g / (loss if loss != 0 else 1e-12)
+        return 100 - (100 / (1 + rs))
+
+STREAMING_INDICATORS = {"sma": _StreamingSma, "rsi": _StreamingRsi}
+
+
+def _streaming(spec: IndicatorSpec):
+    try:
+        return STREAMING_INDICATORS[spec.fn](*spec.args)
+    except KeyError:
+        raise ValueError(f"Indicator {spec.fn} has no incremental version for paper trading")
+
+
+# ---- decision latency ----
+
+class LatencyStats:
+    """Per-bar decision latency: count / mean / max plus a bucketed histogram for quantiles."""
+    BOUNDS_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * (len(self.BOUNDS_US) + 1)
+
+    def add(self, ns: int) -> None:
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.buckets[bisect.bisect_left(self.BOUNDS_US, ns / 1000.0)] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound (µs) of the bucket holding the q-quantile."""
+        if not self.count:
+            return None
+        need = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= need:
+                return float(self.BOUNDS_US[i]) if i < len(self.BOUNDS_US) else self.max_ns / 1000.0
+        return self.max_ns / 1000.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "decisions": self.count,
+            "mean_us": self.total_ns / self.count / 1000.0 if self.count else None,
+            "p50_us": self.quantile(0.5),
+            "p99_us": self.quantile(0.99),
+            "max_us": self.max_ns / 1000.0 if self.count else None,
+            "histogram_us": {
+                **{f"le_{b}": n for b, n in zip(self.BOUNDS_US, self.buckets)},
+                "inf": self.buckets[-1],
+            },
+        }
+
+
+# ---- streams ----
+
+class _Stream:
+    """One (config, symbol): strategy state plus its own cash/position book."""
+    def __init__(self, run_id: int, symbol: str, strat: Strategy, params: Dict[str, Any],
+                 columns: Dict[str, IndicatorSpec], risk: Dict[str, Any], market: str, interval: str):
+        self.run_id = run_id
+        self.symbol = symbol
+        self.strat = strat
+        self.params = params
+        self.columns = columns
+        self.initial_cash = float(risk.get("initial_cash", 10_000))
+        self.risk_fraction = float(risk.get("risk_fraction", 1.0))
+        self.fee_rate = float(risk.get("fee_bps", 1.0)) / 10_000.0
+        self.slip_rate = float(risk.get("slippage_bps", 2.0)) / 10_000.0
+        self.exits = ExitRules.from_risk(risk)
+        self.cash = self.initial_cash
+        self.qty = 0.0
+        self.entry_price: Optional[float] = None
+        self.equity = self.initial_cash
+        self.peak = 0.0          # highest high since entry (trailing stop)
+        self.state: Dict[str, Any] = {"position_qty": 0.0, "prev_sma_fast": None, "prev_sma_slow": None}
+        self.eq_acc = EquityAccumulator(
+            annualization=annualization_factor(market, interval),
+            risk_free_rate_annual=float(risk.get("risk_free_rate_annual", 0.0) or 0.0),
+        )
+        self.tr_acc = TradeAccumulator()
+        self.num_trades = 0
+        self.curve_t = array("q")
+        self.curve_eq = array("d")
+
+    def _sell(self, ts: int, price: float, trace: Dict[str, Any]) -> TradeRecord:
+        slip = price * self.slip_rate
+        exec_price = price - slip
+        fee = (self.qty * exec_price) * self.fee_rate
+        self.cash += self.qty * exec_price - fee
+        pnl = (exec_price - self.entry_price) * self.qty - fee if self.entry_price is not None else 0.0
+        rec = TradeRecord(
+            symbol=self.symbol, timestamp=ts, side="SELL", qty=self.qty, price=exec_price,
+            fee=fee, slippage=slip, pnl=pnl,
+            decision_trace={"action": "SELL", **trace, "exec_price": exec_price, "fee": fee, "slippage": slip, "pnl": pnl},
+        )
+        self.tr_acc.on_close(pnl)
+        self.qty = 0.0
+        self.entry_price = None
+        return rec
+
+    def _intrabar_exit(self, bar: Bar) -> Optional[TradeRecord]:
+        # same rules as ExitRules.first_exit, checked bar by bar as they arrive
+        e = self.entry_price
+        stop_fixed = e * (1.0 - self.exits.stop_loss) if self.exits.stop_loss is not None else -math.inf
+        stop = stop_fixed
+        if self.exits.trailing_stop is not None:
+            stop = max(stop, self.peak * (1.0 - self.exits.trailing_stop))
+        take = e * (1.0 + self.exits.take_profit) if self.exits.take_profit is not None else math.inf
+        self.peak = max(self.peak, bar.high)
+        if bar.low <= stop:
+            level, price = stop, min(stop, bar.open)
+            trigger = "trailing_stop" if self.exits.trailing_stop is not None and stop > stop_fixed else "stop_loss"
+        elif bar.high >= take:
+            level, price, trigger = take, max(take, bar.open), "take_profit"
+        else:
+            return None
+        return self._sell(bar.timestamp, price, {
+            "trigger": trigger, "trigger_price": level, "bar_open": bar.open, "bar_high": bar.high,
+            "bar_low": bar.low, "gap": price != level, "entry_price": e,
+        })
+
+    def on_bar(self, bar: Bar, values: Dict[IndicatorSpec, float]) -> List[TradeRecord]:
+        fills: List[TradeRecord] = []
+        if self.qty > 0 and self.exits.active:
+            rec = self._intrabar_exit(bar)
+            if rec is not None:
+                fills.append(rec)
+
+        row: Dict[str, Any] = {"timestamp": bar.timestamp, "open": bar.open, "high": bar.high,
+                               "low": bar.low, "close": bar.close, "volume": bar.volume}
+        for col, spec in self.columns.items():
+            row[col] = values[spec]
+        signal = self.strat.decide(row, self.state, self.params)
+        sma_fast, sma_slow = row.get("sma_fast"), row.get("sma_slow")
+        self.state["prev_sma_fast"] = None if sma_fast is None or math.isnan(sma_fast) else float(sma_fast)
+        self.state["prev_sma_slow"] = None if sma_slow is None or math.isnan(sma_slow) else float(sma_slow)
+
+        price = bar.close
+        action = (signal.action or "").upper().strip()
+        if action == "BUY" and self.qty <= 0:
+            alloc = (self.cash + self.qty * price) * self.risk_fraction
+            slip = price * self.slip_rate
+            exec_price = price + slip
+            buy_qty = alloc / (exec_price * (1.0 + self.fee_rate)) if exec_price > 0 else 0.0
+            fee = (buy_qty * exec_price) * self.fee_rate
+            cost = buy_qty * exec_price + fee
+            if cost <= self.cash and buy_qty > 0:
+                self.cash -= cost
+                self.qty += buy_qty
+                self.entry_price = self.peak = exec_price
+                levels = self.exits.levels(exec_price) if self.exits.active else {}
+                fills.append(TradeRecord(
+                    symbol=self.symbol, timestamp=bar.timestamp, side="BUY", qty=buy_qty, price=exec_price,
+                    fee=fee, slippage=slip, pnl=0.0,
+                    decision_trace={"action": "BUY", **signal.reason, "exec_price": exec_price, "fee": fee, "slippage": slip, **levels},
+                ))
+        elif action == "SELL" and self.qty > 0:
+            fills.append(self._sell(bar.timestamp, price, signal.reason))
+
+        self.equity = self.cash + self.qty * price
+        self.eq_acc.update(bar.timestamp, self.equity)
+        self.curve_t.append(bar.timestamp)
+        self.curve_eq.append(self.equity)
+        self.state["position_qty"] = self.qty
+        self.num_trades += len(fills)
+        return fills
+
+    def metrics(self) -> Dict[str, Any]:
+        n = len(self.curve_t)
+        return {
+            "symbol": self.symbol,
+            "initial_cash": self.initial_cash,
+            "final_equity": float(self.equity),
+            "total_return": (self.equity / self.initial_cash - 1.0) if n else 0.0,
+            "num_trades": self.num_trades,
+            **self.eq_acc.result(),
+            **self.tr_acc.result(),
+        }
+
+
+class _Series:
+    """Incremental indicators of one bar series, shared by every stream reading it."""
+    def __init__(self):
+        self.indicators: Dict[IndicatorSpec, Any] = {}
+        self.streams: List[_Stream] = []
+
+    def add(self, stream: _Stream) -> None:
+        for spec in stream.columns.values():
+            if spec not in self.indicators:
+                self.indicators[spec] = _streaming(spec)
+        self.streams.append(stream)
+
+    def update(self, bar: Bar) -> Dict[IndicatorSpec, float]:
+        src = bar._asdict()
+        return {spec: float(ind.update(src[spec.source])) for spec, ind in self.indicators.items()}
+
+
+def series_key(symbol: str, cfg: models.Config) -> Tuple[str, str, str, str]:
+    return (symbol, cfg.interval, cfg.start_date, cfg.end_date)
+
+
+def check_config(cfg: models.Config) -> Tuple[Strategy, Dict[str, Any], Dict[str, IndicatorSpec]]:
+    """Raises ValueError for configs paper trading cannot run incrementally."""
+    strat = get_strategy(cfg.strategy)
+    params = jsonio.loads(cfg.params_json)
+    if strat.higher_timeframe(params):
+        raise ValueError("Higher-timeframe strategies are not supported in paper trading")
+    columns = strat.indicators(params)
+    for spec in columns.values():
+        if spec.fn not in STREAMING_INDICATORS:
+            raise ValueError(f"Indicator {spec} has no incremental version for paper trading")
+    return strat, params, columns
+
+
+# ---- sessions ----
+
+_sessions: Dict[str, "PaperSession"] = {}
+KEEP_FINISHED = 100  # finished sessions kept for inspection (their runs stay in the DB)
+OWNER = worker_name()  # lease owner of this process's paper runs
+ORPHANED_ERROR = "Paper session lost: the process running it stopped"
+
+
+class PaperSession:
+    """Many configs x symbols driven by one feed on the event loop."""
+    FLUSH_EVERY = 500  # ticks between trade writes
+
+    def __init__(self, user_id: int, feed, record: bool = True):
+        """record=False keeps fills and metrics in memory only (benchmarks)."""
+        self.id = uuid.uuid4().hex[:16]  # unique across worker processes
+        self.user_id = user_id
+        self.feed = feed
+        self.record = record
+        self.series: Dict[Tuple[str, str], _Series] = {}
+        self.runs: Dict[int, List[_Stream]] = {}  # run id -> its streams
+        self.status = "created"
+        self.error: Optional[str] = None
+        self.ticks = 0
+        self.bars = 0
+        self.last_timestamp: Optional[int] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.latency = LatencyStats()
+        self._pending: List[Tuple[int, TradeRecord]] = []
+        self._stop = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        _prune()
+        _sessions[self.id] = self
+
+    def add_config(self, run_id: int, cfg: models.Config, replay: bool = True) -> None:
+        """
+        Streams of every symbol of cfg. replay: they read the series (symbol, interval,
+        start_date, end_date), i.e. the bars a batch backtest of cfg would use; otherwise
+        (symbol, interval) of an open-ended feed.
+        """
+        strat, params, columns = check_config(cfg)
+        risk = jsonio.loads(cfg.risk_json)
+        streams = []
+        for sym in (s.strip() for s in cfg.symbols_csv.split(",")):
+            if not sym:
+                continue
+            stream = _Stream(run_id, sym, strat, params, columns, risk, cfg.market, cfg.interval)
+            key = series_key(sym, cfg) if replay else (sym, cfg.interval)
+            self.series.setdefault(key, _Series()).add(stream)
+            streams.append(stream)
+        self.runs[run_id] = streams
+
+    @property
+    def streams(self) -> int:
+        return sum(len(s) for s in self.runs.values())
+
+    def start(self) -> asyncio.Task:
+        self.task = asyncio.get_running_loop().create_task(self.run())
+        return self.task
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def run(self) -> None:
+        self.status = "running"
+        self.started_at = time.time()
+        keepalive = asyncio.get_running_loop().create_task(self._keepalive()) if self.record else None
+        try:
+            async for tick in self.feed:
+                for bar in tick:
+                    series = self.series.get(bar.series)
+                    if series is None:
+                        continue
+                    values = series.update(bar)
+                    for stream in series.streams:
+                        t0 = time.perf_counter_ns()
+                        fills = stream.on_bar(bar, values)
+                        self.latency.add(time.perf_counter_ns() - t0)
+                        if fills:
+                            self._pending.extend((stream.run_id, f) for f in fills)
+                    self.bars += 1
+                    self.last_timestamp = bar.timestamp
+                self.ticks += 1
+                if self.ticks % self.FLUSH_EVERY == 0 and self._pending:
+                    await self._flush()
+                if self._stop.is_set():
+                    break
+            await self._flush()
+            await asyncio.to_thread(self._finish, "stopped" if self._stop.is_set() else "completed", None)
+        except Exception as e:
+            self.error = str(e)
+            await asyncio.to_thread(self._finish, "failed", str(e))
+            raise
+        finally:
+            if keepalive is not None:
+                keepalive.cancel()
+            self.finished_at = time.time()
+
+    async def _keepalive(self) -> None:
+        lease = settings.job_lease_seconds
+        while True:
+            await asyncio.sleep(lease / 3)
+            try:
+                await asyncio.to_thread(_renew_leases, list(self.runs), lease)
+            except Exception as e:  # retried next period; the lease outlasts a couple of misses
+                log.warning("paper session %s: lease renewal failed: %s", self.id, e)
+
+    async def _flush(self) -> None:
+        pending, self._pending = self._pending, []
+        if pending and self.record:
+            await asyncio.to_thread(_store_trades, pending)
+
+    def _finish(self, status: str, error: Optional[str]) -> None:
+        if not self.record:
+            self.status = status
+            return
+        with SessionLocal() as db:
+            for run_id, streams in self.runs.items():
+                run = db.get(models.BacktestRun, run_id)
+                if run is None:
+                    continue
+                run_metrics = aggregate_metrics([s.metrics() for s in streams])
+                run_metrics["paper"] = {"status": status, "latency": self.latency.summary()}
+                run.status = "failed" if error else "completed"
+                run.error = error
+                run.metrics_json = jsonio.dumps(run_metrics)
+                run.equity_blob = encode_curves({
+                    s.symbol: [{"t": t, "equity": e} for t, e in zip(s.curve_t, s.curve_eq)] for s in streams
+                })
+                for col, v in backtest_summary_columns(run_metrics).items():
+                    setattr(run, col, v)
+            db.commit()
+        self.status = status  # only once the runs are readable
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            "id": self.id,
+            "status": self.status,
+            "owner": OWNER,
+            "error": self.error,
+            "run_ids": list(self.runs),
+            "streams": self.streams,
+            "series": len(self.series),
+            "ticks": self.ticks,
+            "bars": self.bars,
+            "bars_total": getattr(self.feed, "total", None),
+            "last_timestamp": self.last_timestamp,
+            "elapsed_s": elapsed,
+            "bars_per_s": self.bars / elapsed if elapsed > 0 else None,
+            "latency": self.latency.summary(),
+            "equity": {
+                run_id: {s.symbol: s.equity for s in streams} for run_id, streams in self.runs.items()
+            },
+        }
+
+
+def _store_trades(pending: List[Tuple[int, TradeRecord]]) -> None:
+    with SessionLocal() as db:
+        db.add_all([
+            models.Trade(
+                run_id=run_id, symbol=t.symbol, timestamp=t.timestamp, side=t.side, qty=t.qty,
+                price=t.price, fee=t.fee, slippage=t.slippage, pnl=t.pnl,
+                decision_trace_json=jsonio.dumps(t.decision_trace),
+            )
+            for run_id, t in pending
+        ])
+        db.commit()
+
+
+def create_paper_run(db, cfg: models.Config, user_id: int, session_id: str) -> models.BacktestRun:
+    run = models.BacktestRun(
+        user_id=user_id, config_id=cfg.id, status="running", run_type=RUN_TYPE,
+        metrics_json="{}", equity_json="{}", paper_session_id=session_id,
+        lease_owner=OWNER, lease_expires_at=datetime.utcnow() + timedelta(seconds=settings.job_lease_seconds),
+    )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def _renew_leases(run_ids: List[int], lease_seconds: float) -> None:
+    R = models.BacktestRun
+    with SessionLocal() as db:
+        db.query(R).filter(R.id.in_(run_ids), R.lease_owner == OWNER, R.status == "running").update(
+            {R.lease_expires_at: datetime.utcnow() + timedelta(seconds=lease_seconds)}, synchronize_session=False,
+        )
+        fail_orphaned_runs(db)
+        db.commit()
+
+
+def fail_orphaned_runs(db) -> int:
+    """Mark failed the running paper runs whose session's process stopped renewing them (caller commits)."""
+    R = models.BacktestRun
+    return db.query(R).filter(
+        R.run_type == RUN_TYPE,
+        R.status == "running",
+        or_(R.lease_expires_at.is_(None), R.lease_expires_at < datetime.utcnow()),
+    ).update({R.status: "failed", R.error: ORPHANED_ERROR}, synchronize_session=False)
+
+
+def stored_session_summary(db, session_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+    """What the DB knows of a session held by another process (or one that is gone)."""
+    R = models.BacktestRun
+    runs = (
+        db.query(R.id, R.status, R.error, R.lease_owner)
+        .filter(R.paper_session_id == session_id, R.user_id == user_id)
+        .order_by(R.id)
+        .all()
+    )
+    if not runs:
+        return None
+    statuses = {r.status for r in runs}
+    status = "running" if "running" in statuses else ("failed" if statuses == {"failed"} else "completed")
+    return {
+        "id": session_id,
+        "status": status,
+        "owner": runs[0].lease_owner,
+        "error": next((r.error for r in runs if r.error), None),
+        "run_ids": [r.id for r in runs],
+        "runs": [{"id": r.id, "status": r.status} for r in runs],
+    }
+
+
+def _prune() -> None:
+    finished = [sid for sid, s in _sessions.items() if s.finished_at is not None]
+    for sid in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+        del _sessions[sid]
+
+
+_running = metrics.gauge("paper_sessions_running", "Paper-trading sessions currently running")
+_decisions = metrics.gauge("paper_decisions", "Decisions made by the paper sessions kept in memory")
+
+@metrics.register_collector
+def _collect() -> None:
+    _running.set(sum(1 for s in _sessions.values() if s.status == "running"))
+    _decisions.set(sum(s.latency.count for s in _sessions.values()))
+
+
+async def shutdown_sessions() -> None:
+    """Stop every running session and wait for its runs to be finalized (app shutdown)."""
+    tasks = [s.task for s in _sessions.values() if s.task is not None and not s.task.done()]
+    for s in _sessions.values():
+        s.stop()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def get_session(session_id: str) -> Optional[PaperSession]:
+    return _sessions.get(session_id)
+
+
+def list_sessions(user_id: int) -> List[PaperSession]:
+    return [s for s in _sessions.values() if s.user_id == user_id]
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core import jsonio
+
+# In-process progress channels for long runs. Producers (backtest/agent work on the
+# executor threads) publish event dicts; SSE endpoints replay the history and then
+# follow live events on the event loop. Finished channels are kept for a while so a
+# client that connects late still gets the full sequence.
+
+TERMINAL_EVENTS = ("completed", "failed")
+FINISHED_RETENTION_SECONDS = 600.0
+
+
+class ProgressChannel:
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self.events.append(event)
+            if event.get("type") in TERMINAL_EVENTS:
+                self.finished_at = time.monotonic()
+            waiters = list(self._waiters)
+        for loop, ev in waiters:
+            loop.call_soon_threadsafe(ev.set)
+
+    async def follow(self, heartbeat_seconds: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield every event from the start; None is a heartbeat tick. Ends after a terminal event."""
+        loop = asyncio.get_running_loop()
+        ev = asyncio.Event()
+        with self._lock:
+            self._waiters.append((loop, ev))
+        i = 0
+        try:
+            while True:
+                ev.clear()
+                with self._lock:
+                    batch = self.events[i:]
+                    finished = self.finished_at is not None
+                i += len(batch)
+                for e in batch:
+                    yield e
+                if finished:
+                    with self._lock:
+                        if i == len(self.events):
+                            return
+                    continue
+                try:
+                    await asyncio.wait_for(ev.wait(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._waiters.remove((loop, ev))
+
+
+_channels: Dict[str, ProgressChannel] = {}
+_channels_lock = threading.Lock()
+
+
+def open_channel(key: str) -> ProgressChannel:
+    now = time.monotonic()
+    with _channels_lock:
+        for k in [k for k, c in _channels.items() if c.finished_at and now - c.finished_at > FINISHED_RETENTION_SECONDS]:
+            del _channels[k]
+        ch = ProgressChannel()
+        _channels[key] = ch
+        return ch
+
+
+def get_channel(key: str) -> Optional[ProgressChannel]:
+    with _channels_lock:
+        return _channels.get(key)
+
+
+def sse_format(event: Optional[Dict[str, Any]]) -> bytes:
+    if event is None:
+        return b": keep-alive\n\n"
+    return b"event: " + str(event.get("type", "message")).encode() + b"\ndata: " + jsonio.dumps_bytes(event) + b"\n\n"
+
+
+async def stream_events(
+    key: str,
+    poll_final: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    poll_seconds: float = 1.0,
+) -> AsyncIterator[bytes]:
+    """
+    SSE byte stream for a run. Runs owned by this process stream live from their
+    channel; otherwise (another worker, or a restart) poll_final() is polled until it
+    returns the terminal event.
+    """
+    ch = get_channel(key)
+    if ch is not None:
+        async for e in ch.follow():
+            yield sse_format(e)
+        return
+    while True:
+        final = await poll_final()
+        if final is not None:
+            yield sse_format(final)
+            return
+        yield sse_format(None)
+        await asyncio.sleep(poll_seconds)
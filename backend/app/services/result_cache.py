@@ -0,0 +1,55 @@
+import hashlib
+import json
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+
+FINGERPRINT_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+def bars_fingerprint(df: pd.DataFrame) -> str:
+    """
+    sha256 over the raw column bytes of the input bars (timestamps as int64, prices as float64).
+    Any revision of the data (new bars, corrected prices) changes the fingerprint.
+    """
+    h = hashlib.sha256()
+    h.update(str(len(df)).encode())
+    for c in FINGERPRINT_COLUMNS:
+        if c not in df.columns:
+            continue
+        dtype = np.int64 if c == "timestamp" else np.float64
+        h.update(c.encode())
+        h.update(np.ascontiguousarray(df[c].to_numpy(dtype=dtype)).tobytes())
+    return h.hexdigest()
+
+def backtest_result_key(
+    strategy: str,
+    params: Dict[str, Any],
+    risk: Dict[str, Any],
+    market: str,
+    interval: str,
+    symbols: List[str],
+    bars: Dict[str, pd.DataFrame],
+) -> str:
+    """Content address of a backtest: identical inputs -> identical key -> identical results."""
+    doc = {
+        "strategy": strategy,
+        "params": params,
+        "risk": risk,
+        "market": market,
+        "interval": interval,
+        "symbols": symbols,
+        "bars": {sym: bars_fingerprint(bars[sym]) for sym in symbols},
+    }
+    canonical = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def report_cache_key(payload: Dict[str, Any], model: str, provider: str) -> str:
+    """
+    Content address of an agent report request. The run/config ids in payload["inputs"]
+    are excluded: they only label the report and are patched onto a cached one.
+    """
+    inputs = {k: v for k, v in payload.get("inputs", {}).items() if k not in ("run_id", "config_id")}
+    doc = {"provider": provider, "model": model, "payload": {**payload, "inputs": inputs}}
+    canonical = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
@@ -0,0 +1,217 @@
+import base64
+import gzip
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core import jsonio
+from app.core.config import settings
+from app.db import models, models_agent
+from app.services.equity_store import read_run_curves
+
+# Retention: per user, a run stays in full detail while it is among the newest
+# keep_runs runs OR newer than keep_days. Older runs keep their row (status, metrics,
+# summary columns, so listings and sorting are unchanged) but their bulky detail --
+# trades with decision traces, equity curves and bar snapshots, or an agent run's output/trace --
+# moves to one gzip'd JSON file per run under settings.archive_path, read back on demand.
+
+ARCHIVE_VERSION = 2  # 2: adds "snapshots" (base64 BarSnapshot blobs); version 1 files have none
+TRADE_COLUMNS = ("id", "symbol", "timestamp", "side", "qty", "price", "fee", "slippage", "pnl", "decision_trace_json")
+
+
+def _archive_file(kind: str, run_id: int) -> str:
+    return os.path.join(settings.archive_path, kind, f"{run_id}.json.gz")
+
+
+def _write_archive(path: str, doc: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wb", compresslevel=6) as f:
+        f.write(jsonio.dumps_bytes(doc))
+    os.replace(tmp, path)
+
+
+def _read_archive(path: str) -> Dict[str, Any]:
+    try:
+        with gzip.open(path, "rb") as f:
+            return jsonio.loads(f.read())
+    except FileNotFoundError:
+        raise LookupError(f"Archive file missing: {path}")
+
+
+# ---- reading archived detail ----
+
+def archived_trades(run_id: int) -> List[Dict[str, Any]]:
+    """Trade rows (TRADE_COLUMNS as keys) of an archived backtest run, in id order."""
+    return jsonio.columns_to_records(_read_archive(_archive_file("backtests", run_id))["trades"])
+
+
+def archived_curves(
+    run_id: int,
+    symbols: Optional[List[str]] = None,
+    start_ms: Optional[int] = None,
+    end_ms: Optional[int] = None,
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Same shape as equity_store.read_run_curves, from an archived backtest run."""
+    out: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    for sym, cols in _read_archive(_archive_file("backtests", run_id))["equity"].items():
+        if symbols and sym not in symbols:
+            continue
+        ts = np.asarray(cols["t"], dtype=np.int64)
+        eq = np.asarray(cols["equity"], dtype=np.float64)  # null (NaN) -> nan
+        lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+        hi = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="right"))
+        out[sym] = (ts[lo:hi], eq[lo:hi])
+    return out
+
+
+def archived_snapshot(run_id: int, symbol: str) -> Optional[bytes]:
+    """BarSnapshot blob of an archived backtest run for one symbol, or None if it had none."""
+    encoded = _read_archive(_archive_file("backtests", run_id)).get("snapshots", {}).get(symbol)
+    return base64.b64decode(encoded) if encoded is not None else None
+
+
+def archived_agent_detail(agent_run_id: int) -> Dict[str, Any]:
+    """{"output": ..., "trace": ...} of an archived agent run."""
+    return _read_archive(_archive_file("agent", agent_run_id))
+
+
+# ---- archiving ----
+
+def archive_backtest_run(db: Session, run: models.BacktestRun) -> None:
+    """Move a run's trades, equity curves and bar snapshots to its archive file and drop them from the DB."""
+    if run.source_run_id is None:
+        T = models.Trade
+        rows = db.query(*(getattr(T, c) for c in TRADE_COLUMNS)).filter(T.run_id == run.id).order_by(T.id.asc()).all()
+        trades = {c: [getattr(r, c) for r in rows] for c in TRADE_COLUMNS}
+        curves = read_run_curves(run.equity_blob, run.equity_json)
+        S = models.BarSnapshot
+        snapshots = db.query(S.symbol, S.blob).filter(S.run_id == run.id).all()
+        _write_archive(_archive_file("backtests", run.id), {
+            "version": ARCHIVE_VERSION,
+            "run_id": run.id,
+            "trades": trades,
+            "equity": {sym: {"t": ts.tolist(), "equity": eq.tolist()} for sym, (ts, eq) in curves.items()},
+            # already compressed frames; base64 keeps the archive a single JSON document
+            "snapshots": {s.symbol: base64.b64encode(s.blob).decode("ascii") for s in snapshots},
+        })
+        db.query(T).filter(T.run_id == run.id).delete(synchronize_session=False)
+        db.query(S).filter(S.run_id == run.id).delete(synchronize_session=False)
+        run.equity_blob = None
+        run.equity_json = "{}"
+    # runs that reuse another run's result have no detail of their own; just mark them
+    run.archived_at = datetime.utcnow()
+    db.commit()
+
+
+def archive_agent_run(db: Session, agent_run: models_agent.AgentRun) -> None:
+    """Move an agent run's report and trace to its archive file (the summary column stays)."""
+    _write_archive(_archive_file("agent", agent_run.id), {
+        "version": ARCHIVE_VERSION,
+        "agent_run_id": agent_run.id,
+        "output": jsonio.loads(agent_run.output_json) if agent_run.output_json else None,
+        "trace": jsonio.loads(agent_run.trace_json) if agent_run.trace_json else None,
+    })
+    agent_run.output_json = None
+    agent_run.trace_json = None
+    agent_run.archived_at = datetime.utcnow()
+    db.commit()
+
+
+def _expired(db: Session, model, user_id: int, keep_runs: int, keep_days: int, now: datetime) -> List[Any]:
+    """Finished, not yet archived runs of a user outside both the keep_runs and keep_days windows."""
+    keep_ids = [
+        r.id for r in
+        db.query(model.id).filter(model.user_id == user_id).order_by(model.id.desc()).limit(keep_runs).all()
+    ] if keep_runs > 0 else []
+    q = db.query(model).filter(
+        model.user_id == user_id,
+        model.archived_at.is_(None),
+        model.status.notin_(("queued", "running")),
+        model.created_at < now - timedelta(days=keep_days),
+    )
+    if keep_ids:
+        q = q.filter(model.id.notin_(keep_ids))
+    return q.order_by(model.id.asc()).all()
+
+
+def effective_policy(user: models.User, keep_runs: Optional[int] = None, keep_days: Optional[int] = None) -> Tuple[int, int]:
+    """(keep_runs, keep_days): explicit override > the user's own policy > settings."""
+    def pick(override, own, default):
+        return override if override is not None else (own if own is not None else default)
+    return (
+        pick(keep_runs, user.retention_keep_runs, settings.retention_keep_runs),
+        pick(keep_days, user.retention_keep_days, settings.retention_keep_days),
+    )
+
+
+def apply_retention(
+    db: Session,
+    user_id: Optional[int] = None,
+    keep_runs: Optional[int] = None,
+    keep_days: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Archive expired backtest and agent runs for one user (or all users). keep_runs /
+    keep_days override the per-user policy, which falls back to settings.
+    """
+    now = datetime.utcnow()
+    users = db.query(models.User)
+    if user_id is not None:
+        users = users.filter(models.User.id == user_id)
+    stats = {"users": 0, "backtest_runs": 0, "agent_runs": 0, "trades": 0}
+
+    for u in users.order_by(models.User.id.asc()).all():
+        n, d = effective_policy(u, keep_runs, keep_days)
+        stats["users"] += 1
+
+        R = models.BacktestRun
+        runs = _expired(db, R, u.id, n, d, now)
+        expired_ids = {r.id for r in runs}
+        # a run that stays in full detail may reuse an older run's trades/equity: keep that source live
+        protected: Set[int] = {
+            r.source_run_id for r in
+            db.query(R.id, R.source_run_id)
+            .filter(R.user_id == u.id, R.source_run_id.isnot(None), R.archived_at.is_(None))
+            .all()
+            if r.id not in expired_ids
+        }
+        for run in runs:
+            if run.id in protected:
+                continue
+            if run.source_run_id is None:
+                stats["trades"] += db.query(models.Trade).filter(models.Trade.run_id == run.id).count()
+            archive_backtest_run(db, run)
+            stats["backtest_runs"] += 1
+
+        for agent_run in _expired(db, models_agent.AgentRun, u.id, n, d, now):
+            archive_agent_run(db, agent_run)
+            stats["agent_runs"] += 1
+
+    return stats
+
+
+def compact_database(bind: Engine) -> Dict[str, Any]:
+    """
+    Return free pages to the filesystem. SQLite only: the first call switches the file
+    to auto_vacuum=INCREMENTAL (this needs one full VACUUM); later calls only run the
+    cheap PRAGMA incremental_vacuum. Other databases vacuum themselves.
+    """
+    if bind.dialect.name != "sqlite":
+        return {"skipped": True, "dialect": bind.dialect.name}
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        free_before = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        mode = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        if mode != 2:
+            conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+            full = True
+        else:
+            conn.exec_driver_sql("PRAGMA incremental_vacuum")
+            full = False
+        free_after = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+    return {"skipped": False, "full_vacuum": full, "freed_pages": int(free_before) - int(free_after)}
@@ -0,0 +1,89 @@
+from typing import Dict
+import numpy as np
+
+from app.services.timeutils import MS_PER_DAY
+
+# Rolling risk series over an equity curve, all O(N) and vectorized:
+# mean/variance of returns from cumulative-sum windows, the rolling peak with the
+# van Herk / Gil-Werman block prefix/suffix maxima, and underwater duration from the
+# index of the last all-time high.
+
+
+def _window_sums(x: np.ndarray, window: int) -> np.ndarray:
+    """Sum of every length-`window` slice ending at i (for i >= window - 1)."""
+    c = np.concatenate(([0.0], np.cumsum(x)))
+    return c[window:] - c[:-window]
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    """max(x[i-window+1 : i+1]) for every i >= window - 1 (length n - window + 1)."""
+    n = len(x)
+    if window <= 1:
+        return x.copy()
+    k = -(-n // window)
+    padded = np.full(k * window, -np.inf)
+    padded[:n] = x
+    blocks = padded.reshape(k, window)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    i = np.arange(window - 1, n)
+    return np.maximum(suffix[i - window + 1], prefix[i])
+
+
+def rolling_risk(
+    ts: np.ndarray,
+    eq: np.ndarray,
+    window: int,
+    annualization: int,
+    risk_free_rate_annual: float = 0.0,
+) -> Dict[str, np.ndarray]:
+    """
+    Per point of the curve (NaN until a full window is available):
+      sharpe, volatility  over the last `window` returns, annualized like compute_equity_metrics
+      drawdown            equity / max equity of the last `window` points - 1
+      underwater_days     time since the last all-time high (0 at a new high)
+    """
+    n = len(eq)
+    out = {k: np.full(n, np.nan) for k in ("sharpe", "volatility", "drawdown")}
+    if n == 0:
+        out["underwater_days"] = np.empty(0)
+        return out
+
+    eq = np.where(np.isfinite(eq) & (eq > 0), eq, np.nan)
+    valid = ~np.isnan(eq)
+    if valid.any():  # same fill rule as compute_equity_metrics: ffill, then bfill
+        idx = np.maximum.accumulate(np.where(valid, np.arange(n), 0))
+        eq = eq[idx]
+        eq[np.isnan(eq)] = eq[valid.argmax()]
+
+    # underwater duration: distance to the most recent point at the running peak
+    at_peak = eq >= np.fmax.accumulate(eq)
+    last_peak = np.maximum.accumulate(np.where(at_peak, np.arange(n), 0))
+    out["underwater_days"] = (ts - ts[last_peak]) / MS_PER_DAY
+
+    if window < 2 or n <= window:
+        return out
+
+    rets = eq[1:] / eq[:-1] - 1.0
+    rets = np.where(np.isfinite(rets), rets, 0.0)
+    # centre before squaring so the cumulative sums do not cancel catastrophically
+    centred = rets - rets.mean()
+    s1 = _window_sums(centred, window)
+    s2 = _window_sums(centred * centred, window)
+    var = np.maximum((s2 - s1 * s1 / window) / (window - 1), 0.0)
+    # windows without a single non-zero return (flat, no position) are exactly 0, not
+    # the rounding residue of the running sums
+    var[_window_sums((rets != 0).astype(np.float64), window) == 0] = 0.0
+    std = np.sqrt(var)
+    mean = s1 / window + rets.mean()
+
+    rf_per_period = (1.0 + float(risk_free_rate_annual or 0.0)) ** (1.0 / annualization) - 1.0 if annualization > 0 else 0.0
+    sq = np.sqrt(annualization)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # zero-variance windows -> 0.0 as in compute_equity_metrics; NaN stays for the warm-up only
+        sharpe = np.where(std > 0, (mean - rf_per_period) / std * sq, 0.0)
+    # the window of returns ending at point i covers points i-window .. i
+    out["volatility"][window:] = std * sq
+    out["sharpe"][window:] = sharpe
+    out["drawdown"][window - 1:] = eq[window - 1:] / rolling_max(eq, window) - 1.0
+    return out
@@ -0,0 +1,59 @@
+import math
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core import jsonio
+from app.db import models, models_agent
+
+SUMMARY_SORT_COLUMNS = ("id", "avg_total_return", "avg_sharpe", "avg_max_drawdown", "num_trades")
+
+def _finite_or_none(x: Any) -> Optional[float]:
+    try:
+        v = float(x)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) else None
+
+def backtest_summary_columns(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Headline metrics from aggregate_metrics() -> BacktestRun summary columns."""
+    num_trades = metrics.get("num_trades")
+    return {
+        "avg_total_return": _finite_or_none(metrics.get("avg_total_return")),
+        "avg_sharpe": _finite_or_none(metrics.get("avg_sharpe")),
+        "avg_max_drawdown": _finite_or_none(metrics.get("avg_max_drawdown")),
+        "num_trades": int(num_trades) if num_trades is not None else None,
+    }
+
+def backfill_summaries(db: Session) -> None:
+    """
+    One-time fill of summary columns for runs stored before they existed. Only completed
+    runs carry metrics / a report; queued, running and failed ones never match, so later
+    startups find nothing to do.
+    """
+    R = models.BacktestRun
+    runs = (
+        db.query(R)
+        .filter(R.status == "completed", R.num_trades.is_(None), R.metrics_json.isnot(None))
+        .all()
+    )
+    for r in runs:
+        try:
+            cols = backtest_summary_columns(jsonio.loads(r.metrics_json))
+        except ValueError:
+            continue
+        for k, v in cols.items():
+            setattr(r, k, v)
+
+    A = models_agent.AgentRun
+    agent_runs = (
+        db.query(A)
+        .filter(A.status == "completed", A.summary.is_(None), A.output_json.isnot(None))
+        .all()
+    )
+    for r in agent_runs:
+        try:
+            r.summary = jsonio.loads(r.output_json).get("summary") or ""
+        except (ValueError, AttributeError):
+            r.summary = ""
+    db.commit()
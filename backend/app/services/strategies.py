@@ -1,7 +1,11 @@
+import importlib
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Type
 import pandas as pd
-from app.services.indicators import sma, rsi
+
+from app.core.config import settings
+from app.services.indicators import IndicatorCache, IndicatorSpec, ind
+from app.services.timeframes import add_higher_timeframe
 
 @dataclass
 class SignalRow:
@@ -10,20 +14,54 @@ class SignalRow:
 
 class Strategy:
     name: str
+    def indicators(self, params: Dict[str, Any]) -> Dict[str, IndicatorSpec]:
+        """Columns the strategy reads, as {column: spec}; computed by prepare_frame through an IndicatorCache."""
+        return {}
     def prepare(self, df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
+        """Extra columns that are not plain indicators; runs after the declared ones are added."""
         return df
     def decide(self, row: pd.Series, state: Dict[str, Any], params: Dict[str, Any]) -> SignalRow:
         raise NotImplementedError
 
+    # ---- optional higher timeframe (see prepare_frame) ----
+
+    def higher_timeframe(self, params: Dict[str, Any]) -> Optional[str]:
+        """Interval of a second, longer timeframe the strategy reads; None = base bars only."""
+        return params.get("trend_interval") or None
+
+    def higher_indicators(self, params: Dict[str, Any]) -> Dict[str, IndicatorSpec]:
+        """Indicators on the higher-timeframe bars; they reach decide() as htf_<column>."""
+        return {"sma_trend": ind("sma", "close", int(params.get("trend_sma", 50)))}
+
+    def trend_allows_entry(self, row: pd.Series, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Trend gate for entries: None when no higher timeframe is configured, otherwise
+        {"trend_ok": bool, ...} (close above the higher-timeframe SMA; closed during its warmup).
+        """
+        if not self.higher_timeframe(params):
+            return None
+        trend = row.get("htf_sma_trend")
+        ok = trend is not None and not pd.isna(trend) and float(row["close"]) > float(trend)
+        return {"trend_ok": bool(ok), "htf_sma_trend": None if trend is None or pd.isna(trend) else float(trend)}
+
+# ---- registry ----
+
+STRATEGIES: Dict[str, Type[Strategy]] = {}
+
+def register_strategy(cls: Type[Strategy]) -> Type[Strategy]:
+    """Class decorator: makes the strategy available to get_strategy under cls.name."""
+    STRATEGIES[cls.name] = cls
+    return cls
+
+@register_strategy
 class SmaCrossoverStrategy(Strategy):
     name = "sma_crossover"
 
-    def prepare(self, df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
-        fast = int(params.get("fast", 10))
-        slow = int(params.get("slow", 30))
-        df["sma_fast"] = sma(df["close"], fast)
-        df["sma_slow"] = sma(df["close"], slow)
-        return df
+    def indicators(self, params: Dict[str, Any]) -> Dict[str, IndicatorSpec]:
+        return {
+            "sma_fast": ind("sma", "close", int(params.get("fast", 10))),
+            "sma_slow": ind("sma", "close", int(params.get("slow", 30))),
+        }
 
     def decide(self, row: pd.Series, state: Dict[str, Any], params: Dict[str, Any]) -> SignalRow:
         pos = state.get("position_qty", 0.0)
@@ -49,19 +87,24 @@ class SmaCrossoverStrategy(Strategy):
             "position_qty": float(pos),
         }
 
+        trend = self.trend_allows_entry(row, params)
+        if trend is not None:
+            reason.update(trend)
+
         if pos <= 0 and crossed_up:
+            if trend is not None and not trend["trend_ok"]:
+                return SignalRow("HOLD", {**reason, "blocked_by": "trend_filter"})
             return SignalRow("BUY", {**reason, "trigger": "fast_cross_above_slow"})
         if pos > 0 and crossed_down:
             return SignalRow("SELL", {**reason, "trigger": "fast_cross_below_slow"})
         return SignalRow("HOLD", reason)
 
+@register_strategy
 class RsiMeanReversionStrategy(Strategy):
     name = "rsi_mean_reversion"
 
-    def prepare(self, df: pd.DataFrame, params: Dict[str, Any]) -> pd.DataFrame:
-        window = int(params.get("window", 14))
-        df["rsi"] = rsi(df["close"], window)
-        return df
+    def indicators(self, params: Dict[str, Any]) -> Dict[str, IndicatorSpec]:
+        return {"rsi": ind("rsi", "close", int(params.get("window", 14)))}
 
     def decide(self, row: pd.Series, state: Dict[str, Any], params: Dict[str, Any]) -> SignalRow:
         pos = state.get("position_qty", 0.0)
@@ -80,15 +123,55 @@ class RsiMeanReversionStrategy(Strategy):
             "position_qty": float(pos),
         }
 
+        trend = self.trend_allows_entry(row, params)
+        if trend is not None:
+            reason.update(trend)
+
         if pos <= 0 and rsi_val < low:
+            if trend is not None and not trend["trend_ok"]:
+                return SignalRow("HOLD", {**reason, "blocked_by": "trend_filter"})
             return SignalRow("BUY", {**reason, "trigger": "rsi_oversold"})
         if pos > 0 and rsi_val > high:
             return SignalRow("SELL", {**reason, "trigger": "rsi_overbought"})
         return SignalRow("HOLD", reason)
 
+_plugins_loaded = False
+
+def _load_plugins() -> None:
+    # modules listed in STRATEGY_PLUGINS register their strategies on import
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+    for mod in (m.strip() for m in settings.strategy_plugins.split(",")):
+        if mod:
+            importlib.import_module(mod)
+
 def get_strategy(name: str) -> Strategy:
-    if name == SmaCrossoverStrategy.name:
-        return SmaCrossoverStrategy()
-    if name == RsiMeanReversionStrategy.name:
-        return RsiMeanReversionStrategy()
-    raise ValueError(f"Unknown strategy: {name}")
\ No newline at end of file
+    _load_plugins()
+    cls = STRATEGIES.get(name)
+    if cls is None:
+        raise ValueError(f"Unknown strategy: {name}")
+    return cls()
+
+def prepare_frame(
+    strat: Strategy,
+    df: pd.DataFrame,
+    params: Dict[str, Any],
+    interval: str,
+    indicators: Optional[IndicatorCache] = None,
+) -> pd.DataFrame:
+    """
+    Adds the strategy's declared indicators, then strat.prepare. indicators: cache over
+    the same bars shared with other strategies / parameter sets, so each distinct
+    indicator is computed once (default: a private one).
+    When the strategy declares a higher timeframe, its bars are derived from df by
+    resampling, their indicators computed once, then as-of joined onto df (no lookahead).
+    """
+    htf = strat.higher_timeframe(params)
+    if htf:
+        add_higher_timeframe(df, interval, htf, lambda bars: IndicatorCache(bars).apply(bars, strat.higher_indicators(params)))
+    declared = strat.indicators(params)
+    if declared:
+        (indicators or IndicatorCache(df)).apply(df, declared)
+    return strat.prepare(df, params)
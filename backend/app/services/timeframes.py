@@ -0,0 +1,90 @@
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+from app.services.timeutils import interval_to_ms, MS_PER_DAY
+
+# Second (higher) timeframe for a strategy: the base bars are bucketed into the higher
+# interval, the strategy computes its indicators once on those few bars, and the values
+# are joined back onto the base bars with a backward as-of join on bar *close* times,
+# so a base bar only sees higher-timeframe bars that had closed by its own close.
+
+# 1970-01-01 was a Thursday; weekly buckets start on Monday like the providers' weekly bars
+_WEEK_OFFSET_MS = 4 * MS_PER_DAY
+
+
+def bucket_bounds(ts: np.ndarray, interval: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(start, end) epoch ms of the `interval` bucket each timestamp falls in."""
+    itv = (interval or "").strip().lower()
+    if itv.endswith("mo"):
+        n = int(itv[:-2] or 1)
+        months = ts.astype("datetime64[ms]").astype("datetime64[M]").astype(np.int64)
+        months -= months % n
+        start = months.astype("datetime64[M]").astype("datetime64[ms]").astype(np.int64)
+        end = (months + n).astype("datetime64[M]").astype("datetime64[ms]").astype(np.int64)
+        return start, end
+    ms = interval_to_ms(itv)
+    off = _WEEK_OFFSET_MS if itv.endswith("wk") else 0
+    start = (ts - off) // ms * ms + off
+    return start, start + ms
+
+
+def resample_bars(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    OHLCV bars (sorted, epoch ms timestamps) -> bars of a higher interval. "timestamp"
+    is the bucket start and "close_time" its end; a partial last bucket is kept.
+    """
+    ts = df["timestamp"].to_numpy(dtype=np.int64)
+    if len(ts) == 0:
+        return pd.DataFrame({c: [] for c in ("timestamp", "close_time", "open", "high", "low", "close", "volume")})
+    start, end = bucket_bounds(ts, interval)
+    first = np.concatenate(([0], np.flatnonzero(np.diff(start)) + 1))
+    last = np.concatenate((first[1:] - 1, [len(ts) - 1]))
+    out = {"timestamp": start[first], "close_time": end[first]}
+    if "open" in df.columns:
+        out["open"] = df["open"].to_numpy(dtype=np.float64)[first]
+    if "high" in df.columns:
+        out["high"] = np.maximum.reduceat(df["high"].to_numpy(dtype=np.float64), first)
+    if "low" in df.columns:
+        out["low"] = np.minimum.reduceat(df["low"].to_numpy(dtype=np.float64), first)
+    out["close"] = df["close"].to_numpy(dtype=np.float64)[last]
+    if "volume" in df.columns:
+        out["volume"] = np.add.reduceat(df["volume"].to_numpy(dtype=np.float64), first)
+    return pd.DataFrame(out)
+
+
+def asof_align(base_close: np.ndarray, htf_close: np.ndarray, values: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Backward as-of join: for every base bar, the values of the last higher-timeframe
+    bar with close_time <= the base bar's close (NaN before the first one).
+    """
+    idx = np.searchsorted(htf_close, base_close, side="right") - 1
+    ok = idx >= 0
+    safe = np.where(ok, idx, 0)
+    out = {}
+    for name, v in values.items():
+        v = np.asarray(v, dtype=np.float64)
+        out[name] = np.where(ok, v[safe], np.nan) if len(v) else np.full(len(base_close), np.nan)
+    return out
+
+
+def add_higher_timeframe(
+    df: pd.DataFrame, base_interval: str, interval: str, prepare, prefix: str = "htf_"
+) -> List[str]:
+    """
+    Derive `interval` bars from df, run prepare(htf_bars) -> frame with indicator
+    columns, and add those columns to df as prefix + name. Returns the new column names.
+    """
+    base_ms = interval_to_ms(base_interval)
+    if interval_to_ms(interval) <= base_ms:
+        raise ValueError(f"Higher timeframe {interval} must be longer than the base interval {base_interval}")
+    htf = resample_bars(df, interval)
+    raw = set(htf.columns)
+    htf = prepare(htf)
+    added = [c for c in htf.columns if c not in raw]
+
+    base_close = df["timestamp"].to_numpy(dtype=np.int64) + base_ms
+    aligned = asof_align(base_close, htf["close_time"].to_numpy(dtype=np.int64), {c: htf[c].to_numpy() for c in added})
+    for c in added:
+        df[prefix + c] = aligned[c]
+    return [prefix + c for c in added]
@@ -0,0 +1,53 @@
+from typing import Any, Iterable, List
+import numpy as np
+import pandas as pd
+
+# Internal time axis: int64 epoch milliseconds (UTC).
+# Bars, trades and equity points carry this; ISO strings only exist at the API boundary.
+
+MS_PER_YEAR = 365.25 * 24 * 3600 * 1000
+MS_PER_DAY = 24 * 3600 * 1000
+
+_INTERVAL_UNIT_MS = {"m": 60 * 1000, "h": 3600 * 1000, "d": MS_PER_DAY, "wk": 7 * MS_PER_DAY, "mo": 30 * MS_PER_DAY}
+
+def to_epoch_ms(values: Any) -> np.ndarray:
+    """
+    Vectorized datetime-like -> int64 epoch ms. Naive timestamps are treated as UTC.
+    """
+    ts = pd.to_datetime(pd.Series(values), utc=True)
+    arr = ts.dt.tz_localize(None).to_numpy().astype("datetime64[ms]")
+    return arr.astype(np.int64)
+
+def date_to_epoch_ms(date_str: str) -> int:
+    """'YYYY-MM-DD' (or any parseable datetime) -> epoch ms, UTC."""
+    return int(to_epoch_ms([date_str])[0])
+
+def interval_to_ms(interval: str) -> int:
+    """yfinance-style interval ("1m", "60m", "1h", "1d", "1wk", "1mo") -> bar length in ms."""
+    itv = (interval or "1d").strip().lower()
+    for unit in ("wk", "mo", "m", "h", "d"):
+        if itv.endswith(unit) and itv[: -len(unit)].isdigit():
+            return int(itv[: -len(unit)]) * _INTERVAL_UNIT_MS[unit]
+    raise ValueError(f"Unknown interval: {interval}")
+
+def epoch_ms_to_iso(values: Iterable[int]) -> List[str]:
+    """
+    Bulk int64 epoch ms -> ISO-8601 UTC strings ("2024-01-02T14:30:00Z").
+    """
+    arr = np.asarray(values, dtype=np.int64)
+    if arr.size == 0:
+        return []
+    return np.datetime_as_string(arr.astype("datetime64[ms]"), unit="s", timezone="UTC").tolist()
+
+def format_timestamps(values: List[Any]) -> List[Any]:
+    """
+    Like epoch_ms_to_iso but tolerant of legacy rows that were stored as ISO strings.
+    """
+    idx = [i for i, v in enumerate(values) if v is not None and not isinstance(v, str)]
+    if not idx:
+        return list(values)
+    out = list(values)
+    iso = epoch_ms_to_iso([int(values[i]) for i in idx])
+    for i, s in zip(idx, iso):
+        out[i] = s
+    return out
@@ -2,6 +2,9 @@ from dataclasses import dataclass
 import pandas as pd
 import yfinance as yf
 
+from app.core.metrics import trace_log, verbose_tracing
+from app.services.timeutils import to_epoch_ms
+
 @dataclass
 class MarketData:
     df: pd.DataFrame
@@ -64,8 +67,8 @@ class YFinanceDataProvider:
         if missing:
             raise ValueError(f"Missing required columns: {missing}. Columns={list(df.columns)}")
 
-        print("Data fetched from yfinance:")
-        print(df.head(5))
+        if verbose_tracing():
+            trace_log.debug("yfinance %s %s: fetched %d rows\n%s", symbol, interval, len(df), df.head(5))
 
         df = df[required].copy()
         df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
@@ -77,7 +80,10 @@ class YFinanceDataProvider:
                 f"Columns after normalize ok, but timestamps invalid."
             )
 
-        print("Data cleaned from yfinance:")
-        print(df.head(5))
+        if verbose_tracing():
+            trace_log.debug("yfinance %s %s: %d rows after cleaning\n%s", symbol, interval, len(df), df.head(5))
+
+        # int64 epoch ms from here on; ISO conversion happens only at the API boundary
+        df["timestamp"] = to_epoch_ms(df["timestamp"])
 
         return MarketData(df=df)
\ No newline at end of file
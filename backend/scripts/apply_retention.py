@@ -0,0 +1,37 @@
+"""
+Archive expired runs and compact the database (for cron / a scheduled job).
+
+    python scripts/apply_retention.py                  # every user, their own policy
+    python scripts/apply_retention.py --user-id 3 --keep-runs 50 --keep-days 30
+    python scripts/apply_retention.py --no-vacuum
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import jsonio  # noqa: E402
+from app.db.session import SessionLocal, engine, ensure_schema  # noqa: E402
+from app.db import models, models_agent  # noqa: E402,F401  (register tables)
+from app.services.retention import apply_retention, compact_database  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--user-id", type=int, default=None)
+    ap.add_argument("--keep-runs", type=int, default=None, help="override every user's policy")
+    ap.add_argument("--keep-days", type=int, default=None, help="override every user's policy")
+    ap.add_argument("--no-vacuum", action="store_true")
+    args = ap.parse_args()
+
+    ensure_schema()
+    with SessionLocal() as db:
+        out = {"archived": apply_retention(db, user_id=args.user_id, keep_runs=args.keep_runs, keep_days=args.keep_days)}
+    if not args.no_vacuum:
+        out["vacuum"] = compact_database(engine)
+    print(jsonio.dumps(out))
+
+
+if __name__ == "__main__":
+    main()
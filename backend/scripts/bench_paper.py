@@ -0,0 +1,72 @@
+"""
+Benchmark: paper-trading decision latency with many (config, symbol) streams.
+
+    python scripts/bench_paper.py --symbols 200 --configs 10 --bars 500
+
+Every config trades every symbol, so streams = symbols x configs. Bars come from the
+synthetic provider through a QueueFeed (the local stand-in for a live feed); nothing
+is written to the database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db import models  # noqa: E402
+from app.services.data_provider import SyntheticDataProvider  # noqa: E402
+from app.services.paper import Bar, PaperSession, QueueFeed  # noqa: E402
+
+
+def make_configs(n: int, symbols):
+    out = []
+    for i in range(n):
+        if i % 2 == 0:
+            strategy, params = "sma_crossover", {"fast": 5 + i % 7, "slow": 20 + 5 * (i % 4)}
+        else:
+            strategy, params = "rsi_mean_reversion", {"window": 10 + i % 5}
+        out.append(models.Config(
+            id=i + 1, strategy=strategy, params_json=json.dumps(params),
+            risk_json='{"stop_loss_bps": 150}', symbols_csv=",".join(symbols),
+            start_date="2024-01-01", end_date="2024-12-31", market="crypto", interval="1h",
+        ))
+    return out
+
+
+async def main(args):
+    symbols = [f"S{i:04d}" for i in range(args.symbols)]
+    provider = SyntheticDataProvider()
+    frames = {s: provider.get_ohlcv(s, "2024-01-01", "2024-12-31", interval="1h").df.head(args.bars) for s in symbols}
+
+    feed = QueueFeed(maxsize=10_000)
+    session = PaperSession(user_id=0, feed=feed, record=False)
+    for i, cfg in enumerate(make_configs(args.configs, symbols)):
+        session.add_config(i + 1, cfg, replay=False)
+
+    async def produce():
+        cols = {s: {c: df[c].tolist() for c in ("timestamp", "open", "high", "low", "close", "volume")} for s, df in frames.items()}
+        for k in range(args.bars):
+            for s in symbols:
+                c = cols[s]
+                if k < len(c["timestamp"]):
+                    await feed.put(Bar((s, "1h"), c["timestamp"][k], c["open"][k], c["high"][k], c["low"][k], c["close"][k], c["volume"][k]))
+        await feed.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(produce(), session.run())
+    dt = time.perf_counter() - t0
+    s = session.summary()
+    lat = s["latency"]
+    print(f"streams={s['streams']} series={s['series']} bars={s['bars']} decisions={lat['decisions']} in {dt:.2f}s")
+    print(f"decisions/s={lat['decisions'] / dt:,.0f}  mean={lat['mean_us']:.1f}us  p50<={lat['p50_us']}us  p99<={lat['p99_us']}us  max={lat['max_us']:.0f}us")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--symbols", type=int, default=200)
+    ap.add_argument("--configs", type=int, default=10)
+    ap.add_argument("--bars", type=int, default=500)
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,91 @@
+"""
+Benchmark: previous OHLCV/equity serialization path vs app.core.jsonio.
+
+    python scripts/bench_serialization.py --rows 200000
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import jsonio  # noqa: E402
+from app.services.timeutils import epoch_ms_to_iso  # noqa: E402
+
+
+# ---- previous path (routers/backtests._json_safe / _records_json_safe) ----
+
+def _json_safe(v):
+    if isinstance(v, (np.generic,)):
+        v = v.item()
+    if isinstance(v, float):
+        if math.isnan(v) or math.isinf(v):
+            return None
+    return v
+
+def old_ohlcv(df: pd.DataFrame) -> bytes:
+    out = df.copy()
+    out["timestamp"] = out["timestamp"].apply(lambda x: pd.to_datetime(x, unit="ms").isoformat())
+    records = [{k: _json_safe(v) for k, v in r.items()} for r in out.to_dict(orient="records")]
+    return json.dumps({"ohlcv": records}).encode()
+
+def new_ohlcv(df: pd.DataFrame, columnar: bool) -> bytes:
+    columns = {"timestamp": epoch_ms_to_iso(df["timestamp"].to_numpy())}
+    columns.update(jsonio.frame_columns(df.drop(columns=["timestamp"])))
+    payload = columns if columnar else jsonio.columns_to_records(columns)
+    return jsonio.dumps_bytes({"ohlcv": payload})
+
+def old_equity(curve: list) -> str:
+    return json.dumps({"AAA": curve})
+
+def new_equity(curve: list) -> str:
+    return jsonio.dumps({"AAA": curve})
+
+
+def bench(label: str, fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    size = len(out) / 1e6
+    print(f"{label:<34}{best * 1000:>10.1f} ms{size:>10.2f} MB")
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    n = args.rows
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.standard_normal(n))
+    df = pd.DataFrame({
+        "timestamp": np.arange(n, dtype=np.int64) * 3_600_000 + 1_700_000_000_000,
+        "open": close, "high": close + 1, "low": close - 1, "close": close,
+        "volume": rng.lognormal(12, 0.5, n),
+        "sma_fast": pd.Series(close).rolling(10).mean().to_numpy(),
+        "sma_slow": pd.Series(close).rolling(30).mean().to_numpy(),
+    })
+    curve = [{"t": int(t), "equity": float(e)} for t, e in zip(df["timestamp"], close * 100)]
+
+    print(f"backend: {'orjson' if jsonio.orjson else 'stdlib json'}, rows={n}")
+    base = bench("ohlcv  old (per-cell + json)", lambda: old_ohlcv(df), args.repeat)
+    rec = bench("ohlcv  new records", lambda: new_ohlcv(df, columnar=False), args.repeat)
+    col = bench("ohlcv  new columns", lambda: new_ohlcv(df, columnar=True), args.repeat)
+    print(f"  speedup records x{base / rec:.1f}, columns x{base / col:.1f}")
+    e0 = bench("equity old json.dumps", lambda: old_equity(curve), args.repeat)
+    e1 = bench("equity new jsonio.dumps", lambda: new_equity(curve), args.repeat)
+    print(f"  speedup x{e0 / e1:.1f}")
+
+
+if __name__ == "__main__":
+    main()
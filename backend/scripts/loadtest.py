@@ -0,0 +1,168 @@
+"""
+Offline HTTP load test for the API.
+
+Drives /auth/login, /configs, /backtests/run, /backtests/{id}/trades and /agent/run
+with many concurrent simulated users and reports p50/p95/p99 latency and throughput
+per endpoint.
+
+The server must run with the offline data provider and stub report model:
+
+    DATA_PROVIDER=synthetic LLM_PROVIDER=stub uvicorn app.main:app --port 8000
+    python scripts/loadtest.py --base-url http://127.0.0.1:8000 --users 50
+
+or let the harness start one against a throwaway SQLite file:
+
+    python scripts/loadtest.py --spawn --users 50 --iterations 3
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kw) -> httpx.Response:
+        t0 = time.perf_counter()
+        try:
+            r = await client.request(method, url, **kw)
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            raise
+        self.latencies[name].append(time.perf_counter() - t0)
+        if r.status_code >= 400:
+            self.errors[name] += 1
+        return r
+
+    def report(self, wall_s: float) -> str:
+        lines = [f"{'endpoint':<28}{'n':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"]
+        for name in sorted(self.latencies):
+            lat = np.asarray(self.latencies[name]) * 1000.0
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+            lines.append(
+                f"{name:<28}{len(lat):>7}{self.errors[name]:>6}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{len(lat) / wall_s:>10.1f}"
+            )
+        total = sum(len(v) for v in self.latencies.values())
+        lines.append(f"total {total} requests in {wall_s:.1f}s ({total / wall_s:.1f} req/s)")
+        return "\n".join(lines)
+
+
+async def simulated_user(client: httpx.AsyncClient, rec: Recorder, args, uid: int):
+    email = f"load-{uuid.uuid4().hex[:12]}-{uid}@example.com"
+    password = "loadtest-password"
+
+    r = await rec.call(client, "POST /auth/register", "POST", "/auth/register", json={"email": email, "password": password})
+    r.raise_for_status()
+
+    for _ in range(args.iterations):
+        r = await rec.call(client, "POST /auth/login", "POST", "/auth/login", json={"email": email, "password": password})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        r = await rec.call(client, "POST /configs", "POST", "/configs", headers=headers, json={
+            "name": f"load {uid}",
+            "market": args.market,
+            "interval": args.interval,
+            "strategy": args.strategy,
+            "params": {"fast": 10, "slow": 30},
+            "risk": {},
+            "symbols": args.symbols.split(","),
+            "start_date": args.start,
+            "end_date": args.end,
+        })
+        r.raise_for_status()
+        config_id = r.json()["id"]
+
+        await rec.call(client, "GET /configs", "GET", "/configs", headers=headers)
+
+        r = await rec.call(client, "POST /backtests/run", "POST", "/backtests/run", headers=headers, params={"config_id": config_id})
+        if r.status_code < 400:
+            run_id = r.json()["id"]
+            await rec.call(client, "GET /backtests/{id}/trades", "GET", f"/backtests/{run_id}/trades", headers=headers)
+
+        if not args.skip_agent:
+            await rec.call(client, "POST /agent/run", "POST", "/agent/run", headers=headers, params={"config_id": config_id})
+
+
+async def run(args) -> Recorder:
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        results = await asyncio.gather(
+            *(simulated_user(client, rec, args, i) for i in range(args.users)),
+            return_exceptions=True,
+        )
+    failed = [r for r in results if isinstance(r, Exception)]
+    if failed:
+        print(f"{len(failed)} simulated users aborted, first error: {failed[0]!r}", file=sys.stderr)
+    return rec
+
+
+def spawn_server(args) -> subprocess.Popen:
+    db_path = os.path.join(tempfile.mkdtemp(prefix="loadtest-"), "loadtest.db")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "DATA_PROVIDER": "synthetic",
+        "LLM_PROVIDER": "stub",
+    }
+    port = args.base_url.rsplit(":", 1)[-1].strip("/")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", port, "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{args.base_url}/docs", timeout=1.0)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not start")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8765")
+    ap.add_argument("--spawn", action="store_true", help="start a synthetic/stub server on --base-url's port")
+    ap.add_argument("--users", type=int, default=20)
+    ap.add_argument("--iterations", type=int, default=2)
+    ap.add_argument("--symbols", default="AAA,BBB")
+    ap.add_argument("--market", default="crypto")
+    ap.add_argument("--interval", default="1h")
+    ap.add_argument("--strategy", default="sma_crossover")
+    ap.add_argument("--start", default="2024-01-01")
+    ap.add_argument("--end", default="2024-03-01")
+    ap.add_argument("--timeout", type=float, default=300.0)
+    ap.add_argument("--skip-agent", action="store_true")
+    args = ap.parse_args()
+
+    proc = spawn_server(args) if args.spawn else None
+    try:
+        t0 = time.perf_counter()
+        rec = asyncio.run(run(args))
+        print(rec.report(time.perf_counter() - t0))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Job worker: runs the backtest / agent runs an API started with JOB_QUEUE=db queues.
+Start any number of them, on this host or on others sharing DATABASE_URL; crashed
+workers' jobs are picked up again once their lease (JOB_LEASE_SECONDS) expires.
+
+    python scripts/worker.py                             # every job kind, BACKTEST_WORKERS threads
+    python scripts/worker.py --processes 8 --threads 1   # one CPU-bound backtest per core
+    python scripts/worker.py --kinds backtest            # never loads the agent stack
+    python scripts/worker.py --drain                     # exit once the queue is empty
+
+SIGINT / SIGTERM stop claiming and let the jobs in flight finish; a second one exits.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import jsonio  # noqa: E402
+from app.db.session import ensure_schema  # noqa: E402
+from app.services.job_queue import JOB_KINDS, JobWorker  # noqa: E402
+
+
+def serve(kinds, threads, drain):
+    worker = JobWorker(kinds=kinds, concurrency=threads)
+
+    def on_signal(signum, frame):
+        signal.signal(signum, signal.SIG_DFL)
+        worker.stop()
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+    logging.getLogger("app.jobs").info("worker %s: %s, %d thread(s)", worker.name, ",".join(kinds), worker.concurrency)
+    worker.run(drain=drain)
+    print(jsonio.dumps({"worker": worker.name, "completed": worker.completed, "failed": worker.failed}))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kinds", default=",".join(JOB_KINDS), help="comma-separated: " + ", ".join(JOB_KINDS))
+    ap.add_argument("--processes", type=int, default=1)
+    ap.add_argument("--threads", type=int, default=None, help="jobs run concurrently per process")
+    ap.add_argument("--drain", action="store_true", help="exit once no job is claimable")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(message)s")
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+    ensure_schema()
+    if args.processes <= 1:
+        serve(kinds, args.threads, args.drain)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(target=serve, args=(kinds, args.threads, args.drain), name=f"worker-{i}")
+        for i in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    # children get terminal SIGINTs themselves; forward SIGTERM
+    signal.signal(signal.SIGTERM, lambda signum, frame: [p.terminate() for p in procs if p.is_alive()])
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
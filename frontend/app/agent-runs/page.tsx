@@ -3,6 +3,7 @@
 import { useEffect, useState } from "react";
 import { api } from "@/lib/api";
 import { requireMe } from "@/lib/session";
+import { RunProgress } from "@/components/RunProgress";
 
 function Badge({ status }: { status: string }) {
   const bg =
@@ -66,6 +67,10 @@ export default function AgentRunsPage() {
               config_id: <b>{r.config_id}</b>
             </div>
 
+            {r.events_url && (
+              <RunProgress url={r.events_url} onDone={() => load().catch((e) => setMsg(e.message))} />
+            )}
+
             {r.summary && (
               <div style={{ marginTop: 6, color: "#333" }}>
                 <span style={{ color: "#666" }}>Summary:</span> {r.summary}
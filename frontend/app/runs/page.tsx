@@ -3,18 +3,21 @@
 import { useEffect, useState } from "react";
 import { api } from "@/lib/api";
 import { requireMe } from "@/lib/session";
+import { RunProgress } from "@/components/RunProgress";
 
 export default function RunsPage() {
   const [runs, setRuns] = useState<any[]>([]);
   const [msg, setMsg] = useState("");
 
+  async function load() {
+    const m = await requireMe();
+    if (!m) return;
+    const rs = await api.listRuns();
+    setRuns(rs);
+  }
+
   useEffect(() => {
-    (async () => {
-      const m = await requireMe();
-      if (!m) return;
-      const rs = await api.listRuns();
-      setRuns(rs);
-    })().catch(e => setMsg(e.message));
+    load().catch(e => setMsg(e.message));
   }, []);
 
   return (
@@ -40,6 +43,9 @@ export default function RunsPage() {
                     {"avg_max_drawdown" in r.metrics && <span>mdd: {Number(r.metrics.avg_max_drawdown).toFixed(3)}</span>}
                     {"num_trades" in r.metrics && <span>trades: {r.metrics.num_trades}</span>}
                   </div>
+                  {r.events_url && (
+                    <RunProgress url={r.events_url} onDone={() => load().catch(e => setMsg(e.message))} />
+                  )}
                 </div>
 
                 <div style={{ display: "flex", gap: 10, alignItems: "center" }}>
@@ -0,0 +1,76 @@
+"use client";
+
+import React, { useEffect, useState } from "react";
+
+type Partial = {
+  avg_total_return?: number;
+  avg_sharpe?: number;
+  avg_max_drawdown?: number;
+  num_trades?: number;
+};
+
+type Props = {
+  url: string;           // events_url of the run listing
+  onDone?: () => void;   // called once when the stream ends (completed / failed / error)
+};
+
+// Live progress of a queued / running backtest or agent run. The listing's events_url
+// already points at the API host the list came from and carries a short-lived token
+// for that stream only (EventSource cannot send an Authorization header).
+export function RunProgress({ url, onDone }: Props) {
+  const [percent, setPercent] = useState<number | null>(null);
+  const [step, setStep] = useState("");
+  const [partial, setPartial] = useState<Partial | null>(null);
+
+  useEffect(() => {
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    const es = new EventSource(url);
+
+    const onEvent = (e: MessageEvent) => {
+      const ev = JSON.parse(e.data);
+      if (typeof ev.percent === "number") setPercent(ev.percent);
+      if (ev.partial) setPartial(ev.partial);
+      if (ev.type === "fetched") setStep(`fetched ${ev.symbol}`);
+      else if (ev.type === "progress") setStep(`${ev.symbol}: ${ev.bars_processed}/${ev.bars_total} bars`);
+      else if (ev.type === "tool") setStep(`${ev.tool} ${ev.symbol}`);
+      else if (ev.type === "symbol_done") setStep(`${ev.symbol} done (${ev.symbols_done}/${ev.symbols_total})`);
+      else if (ev.type === "report") setStep("writing report");
+      else if (ev.type === "status") setStep(ev.status);
+    };
+    const onEnd = () => {
+      es.close();
+      onDone?.();
+    };
+
+    for (const t of ["status", "fetched", "progress", "tool", "symbol_done", "report"]) {
+      es.addEventListener(t, onEvent as EventListener);
+    }
+    es.addEventListener("completed", onEnd);
+    es.addEventListener("failed", onEnd);
+    // 401 (expired token) / 404 or a dropped connection: don't let EventSource retry the
+    // stale URL; reloading the list gives the run's current status and a fresh events_url
+    es.onerror = () => {
+      es.close();
+      timer = setTimeout(() => onDone?.(), 2000);
+    };
+    return () => {
+      es.close();
+      clearTimeout(timer);
+    };
+  }, [url]);
+
+  return (
+    <div style={{ marginTop: 6, display: "grid", gap: 4 }}>
+      <div style={{ height: 6, background: "#f0f0f0", borderRadius: 3, overflow: "hidden" }}>
+        <div style={{ width: `${percent ?? 0}%`, height: "100%", background: "#ffb84d", transition: "width 0.3s" }} />
+      </div>
+      <div style={{ color: "#666", fontSize: 12, display: "flex", gap: 14, flexWrap: "wrap" }}>
+        <span>{percent === null ? "waiting…" : `${percent.toFixed(0)}%`} {step}</span>
+        {partial?.avg_total_return !== undefined && <span>ret: {Number(partial.avg_total_return).toFixed(4)}</span>}
+        {partial?.avg_sharpe !== undefined && <span>sharpe: {Number(partial.avg_sharpe).toFixed(3)}</span>}
+        {partial?.avg_max_drawdown !== undefined && <span>mdd: {Number(partial.avg_max_drawdown).toFixed(3)}</span>}
+        {partial?.num_trades !== undefined && <span>trades: {partial.num_trades}</span>}
+      </div>
+    </div>
+  );
+}